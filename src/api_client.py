@@ -0,0 +1,111 @@
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses with these status codes are temporary, e.g. the model container is still starting or overloaded
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+class ApiClient:
+    """
+    HTTP client for the model containers (OpenPose, MaskAnyone) that is shared by all videos of an estimator.
+    It keeps the connections alive in a pool, limits the number of requests in flight, applies timeouts and retries
+    failed requests with exponential backoff. The client is thread-safe, every thread that runs a video of the
+    estimator can send requests at the same time.
+    """
+    def __init__(
+        self,
+        name: str,
+        max_inflight_requests: int = 1,
+        connect_timeout: float = 10,
+        read_timeout: Optional[float] = 3600,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+    ):
+        """
+        Args:
+            name (str): Name used in log messages (e.g. the estimator name).
+            max_inflight_requests (int): Maximum number of requests sent at the same time, further requests wait.
+            connect_timeout (float): Seconds to wait for a connection to the container.
+            read_timeout (Optional[float]): Seconds to wait for the response, None to wait forever. Processing a long
+                video can take a long time, so the default is generous.
+            max_retries (int): Number of retries after connection errors, timeouts and temporary errors (see RETRY_STATUS_CODES).
+            retry_backoff (float): Delay in seconds before the first retry, doubled for every further retry.
+        """
+        if max_inflight_requests < 1:
+            raise ValueError(f"max_inflight_requests must be at least 1, got {max_inflight_requests}")
+        self.name = name
+        self.max_inflight_requests = max_inflight_requests
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._inflight_requests = threading.BoundedSemaphore(max_inflight_requests)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_inflight_requests)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_config(cls, name: str, config: dict, default_max_inflight_requests: int = 1) -> 'ApiClient':
+        """Create a client from the optional estimator config keys "max_inflight_requests", "connect_timeout", "read_timeout", "max_retries" and "retry_backoff"."""
+        return cls(
+            name,
+            max_inflight_requests=config.get("max_inflight_requests", default_max_inflight_requests),
+            connect_timeout=config.get("connect_timeout", 10),
+            read_timeout=config.get("read_timeout", 3600),
+            max_retries=config.get("max_retries", 3),
+            retry_backoff=config.get("retry_backoff", 1.0),
+        )
+
+    def post(self, url: str, files: Optional[dict] = None, data: Optional[dict] = None) -> requests.Response:
+        """
+        Send a POST request, retrying connection errors, timeouts and temporary errors.
+        Uploaded files are rewound before every retry.
+
+        Args:
+            url (str): The URL of the endpoint.
+            files (Optional[dict]): Files to upload as multipart form data, like in `requests.post`. Values are
+                (filename, file object, mime type) tuples.
+            data (Optional[dict]): Form fields.
+
+        Returns:
+            requests.Response: The response of the last attempt. Responses with an error status code that is not
+                retried (or still fails after all retries) are returned, so the caller can report them.
+
+        Raises:
+            requests.exceptions.RequestException: If the last attempt failed with a connection error or timeout.
+        """
+        file_positions = {key: value[1].tell() for key, value in (files or {}).items()}
+
+        for attempt in range(self.max_retries + 1):
+            for key, position in file_positions.items():
+                files[key][1].seek(position)
+
+            try:
+                with self._inflight_requests:
+                    response = self.session.post(url, files=files, data=data, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                self._wait_before_retry(attempt, f"{type(e).__name__}: {e}")
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+            self._wait_before_retry(attempt, f"status code {response.status_code}")
+            response.close()
+
+    def close(self):
+        self.session.close()
+
+    def _wait_before_retry(self, attempt: int, reason: str):
+        delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.0)  # jitter, so that waiting videos do not retry at once
+        print(f"Warning: {self.name} request failed ({reason}), retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+        logging.warning(f"{self.name} request failed ({reason}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        time.sleep(delay)
@@ -1,15 +1,20 @@
 import os
 import json
 import datetime
+import hashlib
+import threading
 import shutil
 import subprocess
 import numpy as np
 import logging
 import cv2 as cv
-from typing import Dict, Optional
-from filelock import FileLock
+from typing import Dict, List, Optional
 
-from inference.pose_result import VideoPoseResult
+from inference.pose_result import LazyVideoPoseResult, VideoPoseResult, compute_file_sha256, get_npy_meta_path
+from inference.pose_loader import load_pose_files
+
+POSE_FILE_FORMATS = ["json", "npy"]
+POSE_FILE_SUFFIXES = {"json": "_poses.json", "npy": "_poses.npy"}
 
 class NumpyEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -22,15 +27,29 @@ class NumpyEncoder(json.JSONEncoder):
         return super().default(obj)
 
 class Checkpointer:
-    def __init__(self, dataset_name: str, checkpoint_name: Optional[str] = None):
+    def __init__(self, dataset_name: str, checkpoint_name: Optional[str] = None, pose_file_format: str = "json", lazy_loading: bool = True, loading_workers: Optional[int] = None, inference_time_history_checkpoints: Optional[List[str]] = None):
         """
         Initialize the Checkpointer.
         
         Args:
             dataset_name (str): Name of the dataset being processed
             load_checkpoint (Optional[str]): Name of checkpoint to load (format: datasetname-date-time)
+            pose_file_format (str): Format in which pose results are saved. Either "json" (human-readable) or "npy"
+                (binary pose array with a small metadata header, memory-mapped when loading). Loading detects both formats.
+            lazy_loading (bool): Whether pose results loaded from a checkpoint are only parsed when they are first accessed.
+            loading_workers (Optional[int]): Number of processes used to parse pose files if lazy loading is disabled.
+                Defaults to the number of CPU cores.
+            inference_time_history_checkpoints (Optional[List[str]]): Names of further checkpoints whose inference times
+                are used to predict the inference time of videos (see `load_inference_time_history`).
         """
+        if pose_file_format not in POSE_FILE_FORMATS:
+            raise ValueError(f"Invalid pose file format: {pose_file_format}. Valid options are: {POSE_FILE_FORMATS}")
+
         self.dataset_name = dataset_name
+        self.pose_file_format = pose_file_format
+        self.lazy_loading = lazy_loading
+        self.loading_workers = loading_workers
+        self.inference_time_history_checkpoints = inference_time_history_checkpoints or []
         self.base_output_path = "/output"
         
         if checkpoint_name != None: # load existing checkpoint
@@ -48,6 +67,11 @@ class Checkpointer:
         self.poses_dir = os.path.join(self.checkpoint_dir, "poses")
         self.plots_dir = os.path.join(self.checkpoint_dir, "plots")
         self.renderings_dir = os.path.join(self.checkpoint_dir, "renderings")
+        self.manifest_path = os.path.join(self.checkpoint_dir, "poses_manifest.jsonl")
+        self.inference_times_log_path = os.path.join(self.checkpoint_dir, "inference_times.jsonl")
+
+        self._manifest_lock = threading.Lock()
+        self._manifest = self._read_manifest()
         
     def save_rendered_video(self, video_name: str, estimator_name: str, video_writer: cv.VideoWriter) -> str:
         """
@@ -101,37 +125,183 @@ class Checkpointer:
         estimator_dir = os.path.join(self.poses_dir, estimator_name)
         os.makedirs(estimator_dir, exist_ok=True)
         
-        output_path = os.path.join(estimator_dir, f"{video_pose_result.video_name}_poses.json")
-        
-        with open(output_path, "w+") as f:
-            json.dump(video_pose_result.to_json(), f, indent=2, cls=NumpyEncoder)
+        output_path = os.path.join(estimator_dir, f"{video_pose_result.video_name}{POSE_FILE_SUFFIXES[self.pose_file_format]}")
+        sha256 = self._write_pose_file(video_pose_result, output_path, self.pose_file_format)
+        self._add_manifest_entry(estimator_name, video_pose_result, output_path, self.pose_file_format, sha256)
             
         return output_path
 
-    def save_inference_time(self, estimator_name: str, video_name: str, inference_time: float) -> str:
+    def _read_manifest(self) -> Dict[str, Dict[str, dict]]:
+        """Read the manifest, later entries of the same estimator and video replace earlier ones."""
+        manifest = {}
+        if not os.path.exists(self.manifest_path):
+            return manifest
+        with open(self.manifest_path, "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping corrupt line {line_number} in {self.manifest_path}")
+                    continue
+                manifest.setdefault(entry["estimator"], {})[entry["video"]] = entry
+        return manifest
+
+    def _add_manifest_entry(self, estimator_name: str, video_pose_result: VideoPoseResult, pose_file_path: str, pose_file_format: str, sha256: str):
+        """
+        Record a pose file in the manifest next to the poses folder.
+        The manifest stores everything needed to create lazy pose results without opening the pose files. Like the
+        inference time log, every entry is appended as one JSON line, so saving a pose file never rewrites the manifest.
+        The SHA-256 of the file content is verified when a lazy pose result first loads the file.
+        """
+        entry = {
+            "estimator": estimator_name,
+            "video": video_pose_result.video_name,
+            "file": os.path.relpath(pose_file_path, self.checkpoint_dir),
+            "format": pose_file_format,
+            "num_frames": video_pose_result.num_frames,
+            "fps": video_pose_result.fps,
+            "frame_width": video_pose_result.frame_width,
+            "frame_height": video_pose_result.frame_height,
+            "file_size": os.path.getsize(pose_file_path),
+            "sha256": sha256,
+        }
+        import utils  # imported here, utils imports the inference package, which imports the checkpointer
+
+        with self._manifest_lock:
+            self._manifest.setdefault(estimator_name, {})[video_pose_result.video_name] = entry
+        utils.append_json_line(self.manifest_path, entry, cls=NumpyEncoder)
+
+    def _get_manifest_entry(self, estimator_name: str, video_name: str, pose_file_path: str) -> Optional[dict]:
+        """
+        Returns the manifest entry of a pose file if it may still describe the file on disk. Only the file size is
+        checked here, the content hash is verified when the file is loaded (see `LazyVideoPoseResult`).
+        """
+        entry = self._manifest.get(estimator_name, {}).get(video_name)
+        if entry is None or os.path.join(self.checkpoint_dir, entry["file"]) != pose_file_path:
+            return None
+        if os.path.getsize(pose_file_path) != entry.get("file_size"):
+            return None
+        return entry
+
+    def _write_pose_file(self, video_pose_result: VideoPoseResult, output_path: str, pose_file_format: str) -> str:
+        """Write a pose file and return the SHA-256 of its content."""
+        if pose_file_format == "npy":
+            video_pose_result.to_npy(output_path)
+            return compute_file_sha256(output_path)  # just written, read from the page cache
+
+        content = json.dumps(video_pose_result.to_json(), indent=2, cls=NumpyEncoder).encode("utf-8")
+        with open(output_path, "wb") as f:
+            f.write(content)
+        return hashlib.sha256(content).hexdigest()
+
+    def _list_pose_files(self, estimator_dir: str) -> Dict[str, str]:
+        """
+        Find the pose files of all videos in an estimator directory.
+        If a video has pose files in both formats, the binary one is preferred.
+
+        Returns:
+            Dict[str, str]: Dictionary mapping video names to pose file paths.
+        """
+        pose_files = {}
+        for pose_file in sorted(os.listdir(estimator_dir)):
+            for pose_file_format in POSE_FILE_FORMATS:
+                suffix = POSE_FILE_SUFFIXES[pose_file_format]
+                if not pose_file.endswith(suffix):
+                    continue
+                video_name = pose_file[:-len(suffix)]
+                if video_name not in pose_files or pose_file_format == "npy":
+                    pose_files[video_name] = os.path.join(estimator_dir, pose_file)
+        return pose_files
+
+    @staticmethod
+    def load_pose_file(pose_file_path: str, video_name: str = None) -> VideoPoseResult:
+        """Load a pose file in either format, the format is detected from the file name."""
+        return VideoPoseResult.from_file(pose_file_path, video_name)
+
+    def convert_pose_files(self, target_format: str, remove_source: bool = False) -> int:
+        """
+        Convert all pose files of the checkpoint to the given format.
+
+        Args:
+            target_format (str): Either "json" or "npy".
+            remove_source (bool): Whether to delete the original files after conversion.
+
+        Returns:
+            int: Number of converted files.
+        """
+        if target_format not in POSE_FILE_FORMATS:
+            raise ValueError(f"Invalid pose file format: {target_format}. Valid options are: {POSE_FILE_FORMATS}")
+        if not os.path.exists(self.poses_dir):
+            return 0
+
+        num_converted = 0
+        for estimator_name in sorted(os.listdir(self.poses_dir)):
+            estimator_dir = os.path.join(self.poses_dir, estimator_name)
+            if not os.path.isdir(estimator_dir):
+                continue
+
+            for video_name, pose_file_path in self._list_pose_files(estimator_dir).items():
+                if pose_file_path.endswith(POSE_FILE_SUFFIXES[target_format]):
+                    continue
+                video_pose_result = self.load_pose_file(pose_file_path, video_name)
+                output_path = os.path.join(estimator_dir, f"{video_name}{POSE_FILE_SUFFIXES[target_format]}")
+                sha256 = self._write_pose_file(video_pose_result, output_path, target_format)
+                if target_format == "npy" or remove_source: # the converted file is the one that will be loaded
+                    self._add_manifest_entry(estimator_name, video_pose_result, output_path, target_format, sha256)
+                num_converted += 1
+
+                if remove_source:
+                    os.remove(pose_file_path)
+                    if pose_file_path.endswith(POSE_FILE_SUFFIXES["npy"]):
+                        os.remove(get_npy_meta_path(pose_file_path))
+
+        return num_converted
+
+    def save_inference_time(
+        self,
+        estimator_name: str,
+        video_name: str,
+        inference_time: float,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        num_frames: Optional[int] = None,
+        worker_id: Optional[str] = None,
+        estimator_config: Optional[str] = None,
+    ):
         """
         Save the inference time for a specific estimator and video.
+        Every call appends one JSON line to the inference time log. The line is written with a single append, so
+        concurrent estimator threads and processes never need to lock or rewrite the file.
+
+        Args:
+            estimator_name (str): Name of the pose estimator.
+            video_name (str): Name of the processed video.
+            inference_time (float): Inference time in seconds.
+            start_time (Optional[float]): Unix timestamp at which the inference started.
+            end_time (Optional[float]): Unix timestamp at which the inference finished.
+            num_frames (Optional[int]): Number of processed frames, used to compute the achieved fps.
+            worker_id (Optional[str]): Identifier of the worker that processed the video.
+            estimator_config (Optional[str]): Key of the estimator configuration (see `inference.scheduler.estimator_config_key`),
+                so that inference times of differently configured estimators with the same name are not pooled.
         """
-        inference_file_path = os.path.join(self.checkpoint_dir, "inference_times.json")
-        lock = FileLock(inference_file_path + ".lock")  # to prevent concurrent access
-        
-        # Load existing inference times or create new dict if file doesn't exist
-        with lock:
-            if os.path.exists(inference_file_path):
-                with open(inference_file_path, 'r') as f:
-                    inference_times = json.load(f)
-            else:
-                inference_times = {}
-
-            if estimator_name not in inference_times:
-                inference_times[estimator_name] = {}
-                
-            inference_times[estimator_name][video_name] = inference_time # add new inference time
-            
-            with open(inference_file_path, 'w') as f:
-                json.dump(inference_times, f, indent=4)
-                
-            print(f"Inference time for {estimator_name} on {video_name}: {inference_time:.3f}s")
+        record = {
+            "estimator": estimator_name,
+            "video": video_name,
+            "inference_time": inference_time,
+            "start_time": start_time,
+            "end_time": end_time,
+            "num_frames": num_frames,
+            "fps": num_frames / inference_time if num_frames and inference_time > 0 else None,
+            "worker_id": worker_id,
+            "estimator_config": estimator_config,
+        }
+        import utils  # imported here, utils imports the inference package, which imports the checkpointer
+
+        utils.append_json_line(self.inference_times_log_path, record, cls=NumpyEncoder)
+
+        print(f"Inference time for {estimator_name} on {video_name}: {inference_time:.3f}s")
 
     def save_config(self, config_file_path: str):
         """
@@ -143,6 +313,8 @@ class Checkpointer:
     def load_pose_results(self, pose_estimator_names: list[str]) -> Dict[str, Dict[str, VideoPoseResult]]:
         """
         Load all pose results from the checkpoint.
+        If lazy loading is enabled, `LazyVideoPoseResult` proxies are returned, which only parse their pose file when
+        the poses are first accessed. Frame count and video metadata are taken from the manifest if available.
         
         Returns:
             Dict[str, Dict[str, VideoPoseResult]]: Dictionary mapping estimator names to dictionaries
@@ -154,9 +326,11 @@ class Checkpointer:
             return {}
             
         results = {}
+        pose_files = {}  # (estimator, video) -> (pose file path, video name), loaded in parallel if not lazy
+        available_estimators = set(os.listdir(self.poses_dir))
         
         for estimator_name in pose_estimator_names:
-            if estimator_name not in os.listdir(self.poses_dir):
+            if estimator_name not in available_estimators:
                 print(f"No pose results found for estimator {estimator_name} in checkpoint {self.checkpoint_dir}. Will run model again.")
                 logging.error(f"No pose results found for estimator {estimator_name} in checkpoint {self.checkpoint_dir}. Will run model again.")
                 continue
@@ -164,32 +338,103 @@ class Checkpointer:
             estimator_dir = os.path.join(self.poses_dir, estimator_name)
             results[estimator_name] = {}
             
-            for pose_file in os.listdir(estimator_dir):
-                if not pose_file.endswith("_poses.json"):
-                    continue
-                    
-                video_name = pose_file.replace("_poses.json", "")
-                json_path = os.path.join(estimator_dir, pose_file)
-                video_pose_result = VideoPoseResult.from_json(json_path, video_name)
+            for video_name, pose_file_path in self._list_pose_files(estimator_dir).items():
+                if self.lazy_loading:
+                    results[estimator_name][video_name] = self._create_lazy_pose_result(estimator_name, video_name, pose_file_path)
+                else:
+                    pose_files[(estimator_name, video_name)] = (pose_file_path, video_name)
+
+        if pose_files:
+            loaded_pose_results = load_pose_files(pose_files, self.loading_workers, description="checkpoint pose files")
+            for (estimator_name, video_name), video_pose_result in loaded_pose_results.items():
                 results[estimator_name][video_name] = video_pose_result
                     
         return results 
 
+    def _create_lazy_pose_result(self, estimator_name: str, video_name: str, pose_file_path: str) -> LazyVideoPoseResult:
+        entry = self._get_manifest_entry(estimator_name, video_name, pose_file_path) or {}
+        return LazyVideoPoseResult(
+            pose_file_path,
+            video_name,
+            fps=entry.get("fps"),
+            frame_width=entry.get("frame_width"),
+            frame_height=entry.get("frame_height"),
+            num_frames=entry.get("num_frames"),
+            sha256=entry.get("sha256"),
+        )
+
+    def load_inference_time_records(self) -> List[dict]:
+        """
+        Load all records of the inference time log in the order in which they were written.
+        Lines that cannot be parsed (e.g. a line cut off by a crash) are skipped.
+
+        Returns:
+            List[dict]: Records with the fields written by `save_inference_time`.
+        """
+        return self._read_inference_time_log(self.inference_times_log_path)
+
+    @staticmethod
+    def _read_inference_time_log(log_path: str) -> List[dict]:
+        if not os.path.exists(log_path):
+            return []
+
+        records = []
+        with open(log_path, "r") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logging.warning(f"Skipping corrupt line {line_number} in {log_path}")
+        return records
+
+    def load_inference_time_history(self) -> List[dict]:
+        """
+        Load the inference times of the current checkpoint and of the checkpoints in `inference_time_history_checkpoints`.
+        Used to estimate the inference time of videos before they are processed. Other checkpoints in the output
+        directory are not read, they may stem from other datasets, hardware or estimator configurations.
+
+        Returns:
+            List[dict]: Records with at least the fields "estimator", "video", "inference_time" and "num_frames".
+        """
+        checkpoint_dirs = [self.checkpoint_dir]
+        for checkpoint_name in self.inference_time_history_checkpoints:
+            checkpoint_dir = os.path.join(self.base_output_path, checkpoint_name)
+            if not os.path.isdir(checkpoint_dir):
+                print(f"Warning: Inference time history checkpoint {checkpoint_dir} does not exist")
+                logging.warning(f"Inference time history checkpoint {checkpoint_dir} does not exist")
+                continue
+            if checkpoint_dir not in checkpoint_dirs:
+                checkpoint_dirs.append(checkpoint_dir)
+
+        records = []
+        for checkpoint_dir in checkpoint_dirs:
+            records.extend(self._read_inference_time_log(os.path.join(checkpoint_dir, "inference_times.jsonl")))
+        return records
+
     def load_inference_times(self) -> Dict[str, Dict[str, float]]:
         """
         Load all inference times from the checkpoint.
+        The inference time log is compacted into a dictionary, later records of the same estimator and video
+        replace earlier ones. Inference times of older checkpoints (inference_times.json) are included as well.
         
         Returns:
             Dict[str, Dict[str, float]]: Dictionary mapping estimator names to
             video names to their inference times in seconds.
         """
-        inference_file_path = os.path.join(self.checkpoint_dir, "inference_times.json")
+        legacy_inference_file_path = os.path.join(self.checkpoint_dir, "inference_times.json")
         
-        if not os.path.exists(inference_file_path):
+        if not os.path.exists(self.inference_times_log_path) and not os.path.exists(legacy_inference_file_path):
             print(f"No inference times found in checkpoint {self.checkpoint_dir}. Skipping inference time plot.")
             return {}
-            
-        with open(inference_file_path, 'r') as f:
-            inference_times = json.load(f)
+
+        inference_times = {}
+        if os.path.exists(legacy_inference_file_path):
+            with open(legacy_inference_file_path, 'r') as f:
+                inference_times = json.load(f)
+
+        for record in self.load_inference_time_records():
+            inference_times.setdefault(record["estimator"], {})[record["video"]] = record["inference_time"]
             
         return inference_times
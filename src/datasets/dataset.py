@@ -1,13 +1,26 @@
 import math
 import os
+import time
+import logging
 from abc import ABC
-from typing import Dict, List
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
 
+import utils
 from .video_sample import VideoSample
-from inference import VideoPoseResult
+from inference import VideoPoseResult, load_pose_files
 from keypoint_pairs import COCO_KEYPOINT_PAIRS
 
 
+def _read_video_header_or_none(video_path: str) -> Optional[dict]:
+    try:
+        return utils.read_video_header(video_path)
+    except Exception as e:
+        logging.warning(f"Could not read the metadata of video {video_path}: {e}")
+        return None
+
+
 class Dataset(ABC):
     def __init__(self, name: str, video_folder: str, gt_folder: str = None, config: dict = None):
         self.name = name
@@ -15,6 +28,7 @@ class Dataset(ABC):
         self.video_folder = video_folder
         self.gt_folder = gt_folder  # Optional - None if dataset has no ground truth
         self.video_samples = self.load_videos()
+        self.summary = None  # set by prescan
 
     def load_videos(self) -> List[VideoSample]:
         """
@@ -34,6 +48,75 @@ class Dataset(ABC):
 
         return samples
 
+    def prescan(self, max_workers: Optional[int] = None) -> dict:
+        """
+        Probe the metadata of all videos in parallel and attach it to the video samples (`VideoSample.metadata`).
+        Exact metadata from the video metadata cache is used where available. The remaining videos are read from the
+        container header in a process pool, which does not decode the videos. The metadata contains the additional key
+        "frame_count_exact", which is False for frame counts read from the container header.
+        Videos that cannot be read keep `metadata=None`.
+
+        Args:
+            max_workers (int, optional): Number of worker processes. Defaults to the number of CPU cores.
+
+        Returns:
+            dict: The dataset summary (see `summarize`), which is also stored in `self.summary`.
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+
+        start_time = time.time()
+        header_samples = []
+        for sample in self.video_samples:
+            cached_metadata = utils.video_metadata_cache.peek(sample.path)
+            if cached_metadata is not None:
+                sample.metadata = {**cached_metadata, "frame_count_exact": True}
+            else:
+                header_samples.append(sample)
+
+        header_paths = [sample.path for sample in header_samples]
+        if max_workers <= 1 or len(header_paths) <= 1:
+            header_metadata = [_read_video_header_or_none(video_path) for video_path in header_paths]
+        else:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(header_paths))) as executor:
+                header_metadata = list(executor.map(_read_video_header_or_none, header_paths, chunksize=8))
+
+        for sample, metadata in zip(header_samples, header_metadata):
+            sample.metadata = {**metadata, "frame_count_exact": False} if metadata is not None else None
+
+        message = f"Pre-scanned {len(self.video_samples)} videos in {time.time() - start_time:.2f}s ({len(self.video_samples) - len(header_samples)} from the metadata cache)"
+        print(message)
+        logging.info(message)
+        return self.summarize()
+
+    def summarize(self) -> dict:
+        """
+        Summarize the metadata of the video samples: number of videos, total frames, total duration in seconds and
+        a histogram of the resolutions ("widthxheight" -> number of videos). Call `prescan` first.
+        The summary is printed, logged and stored in `self.summary`.
+        """
+        probed_samples = [sample for sample in self.video_samples if sample.metadata]
+        resolution_histogram = Counter(f"{sample.metadata['width']}x{sample.metadata['height']}" for sample in probed_samples)
+
+        self.summary = {
+            "num_videos": len(self.video_samples),
+            "num_unreadable_videos": len(self.video_samples) - len(probed_samples),
+            "total_frames": sum(sample.metadata["frame_count"] for sample in probed_samples),
+            "total_duration": sum(sample.metadata["duration"] for sample in probed_samples),
+            "resolution_histogram": dict(resolution_histogram.most_common()),
+        }
+
+        resolutions = ", ".join(f"{resolution}: {count}" for resolution, count in self.summary["resolution_histogram"].items())
+        message = (
+            f"Dataset {self.name}: {self.summary['num_videos']} videos, {self.summary['total_frames']} frames, "
+            f"{self.summary['total_duration'] / 60:.1f} min total duration, resolutions: {resolutions or 'none'}"
+        )
+        if self.summary["num_unreadable_videos"]:
+            message += f", {self.summary['num_unreadable_videos']} unreadable videos"
+        print(message)
+        logging.info(message)
+        return self.summary
+
     def get_gt_pose_results(self) -> Dict[str, VideoPoseResult]:
         """
         Default implementation to load ground truth pose results from the gt_folder.
@@ -42,21 +125,24 @@ class Dataset(ABC):
         this method in a subclass and implement your own logic to load the ground truth data.
         The returned dictionary should map video names to ground truth `VideoPoseResult` objects.
         Returns empty dict if no gt_folder is specified or doesn't exist.
+        The files are parsed in parallel, the number of worker processes can be set with the dataset config
+        parameter "loading_workers" (defaults to the number of CPU cores).
         """
         if self.gt_folder is None or not os.path.exists(self.gt_folder):
             return {}
 
-        gt_pose_results = {}
+        gt_pose_files = {}
         for sample in self.video_samples:
-            video_name = os.path.splitext(os.path.basename(sample.video_path))[0]
+            video_name = sample.get_filename()
             json_path = os.path.join(self.gt_folder, f"{video_name}.json")
 
             if not os.path.exists(json_path):
                 raise ValueError(f"Ground truth JSON file missing for video `{video_name}`.")
             
-            gt_pose_results[video_name] = VideoPoseResult.from_json(json_path, video_name)
+            gt_pose_files[video_name] = (json_path, video_name)
 
-        return gt_pose_results
+        loading_workers = self.config.get("loading_workers", None) if self.config else None
+        return load_pose_files(gt_pose_files, loading_workers, description="ground truth pose files")
 
     def get_gt_keypoint_pairs(self) -> None | List[tuple]:
         """
@@ -0,0 +1,93 @@
+import os
+import json
+import logging
+from typing import Optional
+
+from inference import VideoPoseResult
+from inference.pose_result import get_npy_meta_path
+
+# Increase to invalidate all cache entries, e.g. when the conversion of the ground truth files changes
+GT_CACHE_VERSION = 1
+
+
+class GtPoseCache:
+    """
+    Persistent cache for ground truth poses that are stored as many small files per video (e.g. one OpenPose JSON file
+    per frame in Tragic Talkers). Every source folder is compacted once into a binary pose file (see
+    `VideoPoseResult.to_npy`), which is memory-mapped when it is loaded.
+    Entries are only valid as long as the modification time of the source folder does not change, which happens when
+    files are added, removed or renamed. Files that are edited in place are not detected, delete the cache folder then.
+    """
+    def __init__(self, cache_dir: Optional[str]):
+        """
+        Args:
+            cache_dir (Optional[str]): Folder of the cache files. If None, nothing is cached.
+        """
+        self.cache_dir = cache_dir
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cache_dir)
+
+    def get_pose_file_path(self, video_name: str) -> str:
+        return os.path.join(self.cache_dir, f"{video_name}.npy")
+
+    def get_source_file_path(self, video_name: str) -> str:
+        return os.path.join(self.cache_dir, f"{video_name}.source.json")
+
+    def is_valid(self, video_name: str, source_folder: str) -> bool:
+        """Whether the cache entry of a video exists and was created from the current version of the source folder."""
+        if not self.enabled or not os.path.exists(self.get_pose_file_path(video_name)):
+            return False
+        try:
+            with open(self.get_source_file_path(video_name), "r") as f:
+                source = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        return (
+            source.get("cache_version") == GT_CACHE_VERSION
+            and source.get("source_folder") == os.path.abspath(source_folder)
+            and source.get("mtime_ns") == os.stat(source_folder).st_mtime_ns
+        )
+
+    def load(self, video_name: str) -> VideoPoseResult:
+        return VideoPoseResult.from_npy(self.get_pose_file_path(video_name), video_name)
+
+    def store(self, video_name: str, source_folder: str, mtime_ns: int, gt_pose_result: VideoPoseResult) -> bool:
+        """
+        Write the cache entry of a video. The source file that validates the entry is written last, so that an
+        interrupted write never leaves a valid entry behind.
+
+        Args:
+            video_name (str): Name of the video.
+            source_folder (str): Folder the ground truth was read from.
+            mtime_ns (int): Modification time of the source folder before it was read.
+            gt_pose_result (VideoPoseResult): The ground truth poses.
+
+        Returns:
+            bool: Whether the entry was written.
+        """
+        if not self.enabled:
+            return False
+        pose_file_path = self.get_pose_file_path(video_name)
+        source_file_path = self.get_source_file_path(video_name)
+        tmp_suffix = f".{os.getpid()}.tmp"
+        tmp_pose_file_path = f"{os.path.splitext(pose_file_path)[0]}{tmp_suffix}.npy"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if os.path.exists(source_file_path):
+                os.remove(source_file_path)
+            gt_pose_result.to_npy(tmp_pose_file_path)
+            os.replace(tmp_pose_file_path, pose_file_path)
+            os.replace(get_npy_meta_path(tmp_pose_file_path), get_npy_meta_path(pose_file_path))
+
+            source = {"cache_version": GT_CACHE_VERSION, "source_folder": os.path.abspath(source_folder), "mtime_ns": mtime_ns}
+            with open(source_file_path + tmp_suffix, "w") as f:
+                json.dump(source, f, indent=2)
+            os.replace(source_file_path + tmp_suffix, source_file_path)
+            return True
+        except OSError as e:
+            print(f"Warning: Could not write ground truth cache entry {pose_file_path}: {e}")
+            logging.warning(f"Could not write ground truth cache entry {pose_file_path}: {e}")
+            return False
+
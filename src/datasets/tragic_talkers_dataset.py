@@ -1,18 +1,83 @@
 import os
 import json
 import glob
-from typing import Dict, List
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
 
-from inference import FramePoseResult, PersonPoseResult, PoseKeypoint, VideoPoseResult
-from keypoint_pairs import COCO_KEYPOINT_PAIRS, COCO_TO_OPENPOSE_BODY25, OPENPOSE_BODY25_KEYPOINT_PAIRS
-from utils import convert_keypoints_to_coco_format
+import numpy as np
+
+from inference import VideoPoseResult
+from keypoint_pairs import COCO_KEYPOINT_PAIRS, OPENPOSE_BODY25_KEYPOINT_PAIRS
+from utils import convert_keypoint_format
 from .dataset import Dataset
+from .gt_pose_cache import GtPoseCache
 from .video_sample import VideoSample
 
+
+def combine_json_files_for_video(video_json_folder: str, video_name: str) -> VideoPoseResult:
+    """
+    Read the OpenPose JSON files of a video (one file per frame) directly into the pose arrays of a VideoPoseResult.
+    Persons without pose keypoints are kept as persons without keypoints.
+    """
+    all_json_files = glob.glob(os.path.join(video_json_folder, "*"))
+    all_json_files = sorted(all_json_files, key=lambda x: int(os.path.basename(x).split('-')[1].split('_')[0])) # we need to sort them by frame number
+
+    all_frames_keypoints = []  # for every frame, an array of shape (keypoints, 3) for every person
+    for file in all_json_files:
+        with open(file, 'r') as f:
+            data = json.load(f)
+        people = data.get('people') or []
+        all_frames_keypoints.append([
+            np.asarray(person.get('pose_keypoints_2d') or [], dtype=np.float32).reshape(-1, 3)  # None confidences become NaN
+            for person in people
+        ])
+
+    num_frames = len(all_frames_keypoints)
+    person_counts = np.array([len(frame_keypoints) for frame_keypoints in all_frames_keypoints], dtype=np.int32)
+    max_persons = int(person_counts.max()) if num_frames else 0
+    num_keypoints = max((len(keypoints) for frame_keypoints in all_frames_keypoints for keypoints in frame_keypoints), default=0)
+
+    pose_array = np.zeros((num_frames, max_persons, num_keypoints, 3), dtype=np.float32)
+    pose_array[..., 2] = np.nan
+    valid_mask = np.zeros((num_frames, max_persons, num_keypoints), dtype=bool)
+    for frame_idx, frame_keypoints in enumerate(all_frames_keypoints):
+        for person_idx, keypoints in enumerate(frame_keypoints):
+            pose_array[frame_idx, person_idx, :len(keypoints)] = keypoints
+            valid_mask[frame_idx, person_idx, :len(keypoints)] = True
+
+    return VideoPoseResult(
+        fps=30,
+        frame_width=2448,
+        frame_height=2048,
+        video_name=video_name,
+        pose_array=pose_array,
+        valid_mask=valid_mask,
+        person_counts=person_counts,
+    )
+
+
+def _build_gt_pose_result(video_json_folder: str, video_name: str, cache_dir: Optional[str]) -> VideoPoseResult:
+    """Read the ground truth of a video from its JSON files and store it in the ground truth cache."""
+    mtime_ns = os.stat(video_json_folder).st_mtime_ns  # before reading, so that changes while reading invalidate the entry
+    gt_pose_result = combine_json_files_for_video(video_json_folder, video_name)
+    GtPoseCache(cache_dir).store(video_name, video_json_folder, mtime_ns, gt_pose_result)
+    return gt_pose_result
+
+
 class TragicTalkersDataset(Dataset):
     def __init__(self, name: str, video_folder: str, gt_folder: str = None, config: dict = None):
+        """
+        The optional dataset config parameter "gt_cache_dir" sets the folder of the ground truth cache (default: the
+        environment variable MASKBENCH_GT_CACHE_DIR or /output/gt_cache, followed by the dataset name). Set it to an empty
+        string to read the JSON files every time. The parameter "loading_workers" sets the number of parallel workers for
+        loading the ground truth (defaults to the number of CPU cores).
+        """
         super().__init__(name, video_folder, gt_folder, config)
         self.convert_gt_keypoints_to_coco = config.get("convert_gt_keypoints_to_coco", False) if config else False
+        gt_cache_dir = (config or {}).get("gt_cache_dir", os.path.join(os.getenv("MASKBENCH_GT_CACHE_DIR", "/output/gt_cache"), name))
+        self.gt_cache = GtPoseCache(gt_cache_dir or None)
     
     def load_videos(self) -> List[VideoSample]:
         samples = []
@@ -33,44 +98,46 @@ class TragicTalkersDataset(Dataset):
             return OPENPOSE_BODY25_KEYPOINT_PAIRS
 
     def get_gt_pose_results(self) -> Dict[str, VideoPoseResult]:
+        """
+        Load the ground truth of every video and camera angle. The per-frame JSON files of a camera folder are only read
+        once and compacted into the ground truth cache (see `GtPoseCache`). Folders without a valid cache entry are read
+        in parallel worker processes, cached folders are loaded in parallel threads.
+        """
+        video_json_folders = {}
+        for video_json_folder in sorted(glob.glob(os.path.join(self.gt_folder, "*", "*"))): # for every video & camera angle
+            video_json_folders[self._extract_video_name_from_labels_folder(video_json_folder)] = video_json_folder
+
+        max_workers = (self.config.get("loading_workers", None) if self.config else None) or os.cpu_count() or 1
+        start_time = time.time()
+        cached_video_names = [video_name for video_name, folder in video_json_folders.items() if self.gt_cache.is_valid(video_name, folder)]
+        missing_video_names = [video_name for video_name in video_json_folders if video_name not in cached_video_names]
+
         gt_pose_results = {}
-        video_json_folders = glob.glob(os.path.join(self.gt_folder, "*", "*")) # for every video & camera angle
-        for video_json_folder in video_json_folders:
-            video_name = self._extract_video_name_from_labels_folder(video_json_folder)
-            gt_pose_result = self.combine_json_files_for_video(video_json_folder, video_name)
-            if self.convert_gt_keypoints_to_coco:
-                gt_pose_result.frames = convert_keypoints_to_coco_format(gt_pose_result.frames, COCO_TO_OPENPOSE_BODY25)
-            gt_pose_results[video_name] = gt_pose_result
-        return gt_pose_results
-
-    def combine_json_files_for_video(self, video_json_folder: str, video_name: str) -> str:
-        all_json_files = glob.glob(os.path.join(video_json_folder, "*"))
-        all_json_files = sorted(all_json_files, key=lambda x: int(os.path.basename(x).split('-')[1].split('_')[0])) # we need to sort them by frame number
-
-        all_frames_keypoints = []
-        for frame_idx, file in enumerate(all_json_files): # for every frame
-            frame_keypoints = [] 
-            with open(file, 'r') as f:
-                data = json.load(f)
-                people = data.get('people', [])
-                if people:
-                    for person in people: # for every person in the frame
-                        person_keypoints = []
-                        pose_keypoints = person.get('pose_keypoints_2d', [])
-                        if pose_keypoints: # get keypoints for that person
-                            person_keypoints = [
-                                PoseKeypoint(x=pose_keypoints[i], y=pose_keypoints[i+1], confidence=pose_keypoints[i+2])
-                                for i in range(0, len(pose_keypoints), 3)]
-                        frame_keypoints.append(PersonPoseResult(keypoints=person_keypoints))
-            all_frames_keypoints.append(FramePoseResult(persons=frame_keypoints, frame_idx=frame_idx))
-
-        return VideoPoseResult(
-            fps=30,
-            frame_width=2448,
-            frame_height=2048,
-            video_name=video_name,
-            frames=all_frames_keypoints
+        if missing_video_names:
+            build_args = ([video_json_folders[video_name] for video_name in missing_video_names], missing_video_names, [self.gt_cache.cache_dir] * len(missing_video_names))
+            if max_workers <= 1 or len(missing_video_names) <= 1:
+                gt_pose_results.update(zip(missing_video_names, map(_build_gt_pose_result, *build_args)))
+            else:
+                with ProcessPoolExecutor(max_workers=min(max_workers, len(missing_video_names))) as executor:
+                    gt_pose_results.update(zip(missing_video_names, executor.map(_build_gt_pose_result, *build_args)))
+        if cached_video_names:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(cached_video_names))) as executor:
+                gt_pose_results.update(zip(cached_video_names, executor.map(self.gt_cache.load, cached_video_names)))
+
+        message = (
+            f"Loaded the ground truth of {len(video_json_folders)} videos in {time.time() - start_time:.2f}s "
+            f"({len(cached_video_names)} from the ground truth cache) with {max_workers} workers"
         )
+        print(message)
+        logging.info(message)
+
+        for video_name in video_json_folders:
+            if self.convert_gt_keypoints_to_coco:
+                gt_pose_results[video_name] = convert_keypoint_format(gt_pose_results[video_name], "openpose_body25")
+        return {video_name: gt_pose_results[video_name] for video_name in video_json_folders}
+
+    def combine_json_files_for_video(self, video_json_folder: str, video_name: str) -> VideoPoseResult:
+        return combine_json_files_for_video(video_json_folder, video_name)
 
     def _extract_video_name_from_labels_folder(self, path: str) -> str:
         """
@@ -0,0 +1,107 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+
+class DetectorPool:
+    """
+    Pool of pre-loaded model instances (detectors) that are checked out for a single video at a time.
+    Stateful detectors (e.g. MediaPipe landmarkers in VIDEO mode, which require increasing timestamps and track poses
+    between frames) cannot be reset. A checked in detector is therefore closed and replaced by a freshly loaded one in
+    a background thread, so the next video starts with a clean detector without waiting for the model to load.
+    Up to `size` replacements are loaded at the same time, so that videos finishing together do not wait for each
+    other's replacement. The time spent loading detectors is measured separately (see `load_times` and `get_load_time`).
+    """
+    def __init__(self, create_detector: Callable[[], Any], size: int, close_detector: Callable[[Any], None] = None, name: str = "detector"):
+        """
+        Args:
+            create_detector (Callable[[], Any]): Function that loads a new detector.
+            size (int): Number of detectors in the pool, i.e. the number of videos that can be processed at the same time.
+            close_detector (Callable[[Any], None]): Function that releases a detector. Defaults to calling `detector.close()`.
+            name (str): Name used in log messages.
+        """
+        if size < 1:
+            raise ValueError(f"The size of the {name} pool must be at least 1, got {size}")
+        self.create_detector = create_detector
+        self.close_detector = close_detector or (lambda detector: detector.close())
+        self.size = size
+        self.name = name
+        self.load_times: List[float] = []
+        self._lock = threading.Lock()
+        self._detector_load_times: Dict[int, float] = {}  # load time of every detector that is not checked in yet
+        self._idle = queue.Queue()  # None entries are detectors that could not be loaded in the background
+        self._refill_executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"{name}-pool")
+        self._closed = False
+
+        for _ in range(size):
+            self._idle.put(self._load())
+
+    def checkout(self):
+        """Returns an unused detector, blocking until one is available."""
+        detector = self._idle.get()
+        if detector is None:
+            try:
+                detector = self._load()
+            except Exception:
+                self._idle.put(None)
+                raise
+        return detector
+
+    def get_load_time(self, detector) -> float:
+        """Returns the time in seconds it took to load a detector of the pool, e.g. to report it per video."""
+        with self._lock:
+            return self._detector_load_times.get(id(detector), 0.0)
+
+    def checkin(self, detector):
+        """
+        Releases a checked out detector. It is closed and replaced by a new detector in the background, unless the pool
+        is closed already.
+        """
+        with self._lock:
+            self._detector_load_times.pop(id(detector), None)
+        try:
+            self.close_detector(detector)
+        except Exception as e:
+            logging.warning(f"Could not close {self.name}: {e}")
+        with self._lock:
+            if not self._closed:
+                self._refill_executor.submit(self._refill)
+
+    def close(self):
+        """Closes all idle detectors. Detectors that are still checked out are closed when they are checked in."""
+        with self._lock:
+            self._closed = True
+        self._refill_executor.shutdown(wait=True)
+        while True:
+            try:
+                detector = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if detector is not None:
+                self.close_detector(detector)
+
+    @property
+    def total_load_time(self) -> float:
+        with self._lock:
+            return sum(self.load_times)
+
+    def _load(self):
+        start_time = time.perf_counter()
+        detector = self.create_detector()
+        load_time = time.perf_counter() - start_time
+        with self._lock:
+            self.load_times.append(load_time)
+            self._detector_load_times[id(detector)] = load_time
+        return detector
+
+    def _refill(self):
+        try:
+            detector = self._load()
+        except Exception as e:
+            print(f"Warning: Could not load a new {self.name}, retrying on the next checkout: {e}")
+            logging.warning(f"Could not load a new {self.name}: {e}")
+            detector = None
+        self._idle.put(detector)
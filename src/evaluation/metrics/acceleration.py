@@ -16,6 +16,7 @@ class AccelerationMetric(Metric):
     Required config parameters:
         - time_unit: str, either "frame" or "second" - specifies whether to compute acceleration 
           in pixels/frame² or pixels/second². Defaults to "frame".
+        - exclude_interpolated_frames: bool - passed to the velocity metric. Defaults to False.
     """
     
     def __init__(self, config: Optional[Dict[str, Any]] = None):
@@ -51,6 +52,7 @@ class AccelerationMetric(Metric):
             - time_unit="frame": acceleration is computed per frame (pixels/frame²)
         """
         pred_poses = video_result.to_numpy_ma(self.name, model_name)  # shape: (frames, persons, keypoints, 2)
+        pred_poses, frame_step = self._select_estimated_frames(pred_poses, video_result)
         
         if pred_poses.shape[1] == 0 or pred_poses.shape[2] == 0:
             print(f"Warning: No persons or keypoints detected in the video. Returning empty MetricResult. Video: {video_result.video_name}, Model: {model_name}, Metric: {self.name}.")
@@ -66,7 +68,7 @@ class AccelerationMetric(Metric):
         if velocity_result is None:
             return None
         
-        acceleration = ma.diff(velocity_result.values, axis=0)  # shape: (frames-2, persons, keypoints, 2)
+        acceleration = ma.diff(velocity_result.values, axis=0) / frame_step  # shape: (frames-2, persons, keypoints, 2)
         
         if self.time_unit == "second":
             fps = video_result.fps
@@ -16,6 +16,7 @@ class JerkMetric(Metric):
     Required config parameters:
         - time_unit: str, either "frame" or "second" - specifies whether to compute jerk 
           in pixels/frame³ or pixels/second³. Defaults to "frame".
+        - exclude_interpolated_frames: bool - passed to the velocity metric. Defaults to False.
     """
     
     def __init__(self, config: Optional[Dict[str, Any]] = None):
@@ -50,6 +51,7 @@ class JerkMetric(Metric):
             - time_unit="frame": jerk is computed per frame (pixels/frame³)
         """
         pred_poses = video_result.to_numpy_ma(self.name, model_name)  # shape: (frames, persons, keypoints, 2)
+        pred_poses, frame_step = self._select_estimated_frames(pred_poses, video_result)
 
         if pred_poses.shape[1] == 0 or pred_poses.shape[2] == 0:
             print(f"Warning: No persons or keypoints detected in the video. Returning empty MetricResult. Video: {video_result.video_name}, Model: {model_name}, Metric: {self.name}.")
@@ -65,7 +67,7 @@ class JerkMetric(Metric):
         if acceleration_result is None:
             return None
         
-        jerk = ma.diff(acceleration_result.values, axis=0)  # shape: (frames-3, persons, keypoints, 2)
+        jerk = ma.diff(acceleration_result.values, axis=0) / frame_step  # shape: (frames-3, persons, keypoints, 2)
         
         if self.time_unit == "second":
             fps = video_result.fps
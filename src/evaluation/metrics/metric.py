@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
 import numpy as np
 import numpy.ma as ma
@@ -43,6 +43,22 @@ class Metric(ABC):
         """
         pass
 
+    def _select_estimated_frames(self, poses: ma.MaskedArray, video_result: VideoPoseResult) -> Tuple[ma.MaskedArray, int]:
+        """
+        Keep only the estimated frames of a result whose other frames were interpolated (see frame_stride of the pose
+        estimators), if the metric is configured with "exclude_interpolated_frames". Used by the kinematic metrics.
+
+        Returns:
+            The poses of the selected frames and the number of video frames between two selected frames.
+        """
+        interpolated_frames = video_result.interpolated_frames
+        if not self.config.get("exclude_interpolated_frames", False) or not interpolated_frames.any():
+            return poses, 1
+
+        estimated_frames = np.flatnonzero(~interpolated_frames)  # every frame_stride-th frame
+        frame_step = int(estimated_frames[1] - estimated_frames[0]) if len(estimated_frames) > 1 else 1
+        return poses[estimated_frames], frame_step
+
     def _match_person_indices(self, poses_to_match: ma.MaskedArray, reference: ma.MaskedArray) -> ma.MaskedArray:
         """
         Match the predictions to the reference (e.g. ground truth or previous frame) for a single frame.
@@ -17,6 +17,8 @@ class VelocityMetric(Metric):
     Config parameters:
         - time_unit: str, either "frame" or "second" - specifies whether to compute velocity 
           in pixels/frame or pixels/second. Defaults to "frame".
+        - exclude_interpolated_frames: bool - if True, the velocity of results with interpolated frames (see frame_stride
+          of the pose estimators) is only computed between the estimated frames. Defaults to False.
     """
     
     def __init__(self, config: Optional[Dict[str, Any]] = None):
@@ -49,7 +51,8 @@ class VelocityMetric(Metric):
             - time_unit="second": velocity is computed per second (pixels/second) by dividing by the time delta between frames
             - time_unit="frame": velocity is computed per frame (pixels/frame)
         """
-        pred_poses = video_result.to_numpy_ma(self.name, model_name)  # shape: (frames, persons, keypoints, 2)
+        pred_poses = video_result.to_numpy_ma(self.name, model_name).copy()  # shape: (frames, persons, keypoints, 2), copied because persons are re-ordered in place
+        pred_poses, frame_step = self._select_estimated_frames(pred_poses, video_result)
         if pred_poses.shape[1] == 0 or pred_poses.shape[2] == 0:
             print(f"Warning: No persons or keypoints detected in the video. Returning empty MetricResult. Video: {video_result.video_name}, Model: {model_name}, Metric: {self.name}.")
             logging.warning(f"Warning: No persons or keypoints detected in the video. Returning empty MetricResult. Video: {video_result.video_name}, Model: {model_name}, Metric: {self.name}.")
@@ -71,7 +74,7 @@ class VelocityMetric(Metric):
         zero_points_mask = np.repeat((pred_poses == 0).all(axis=-1)[..., np.newaxis], 2, axis=-1)
         pred_poses.mask |= zero_points_mask
 
-        velocity = ma.diff(pred_poses, axis=0)  # shape: (frames-1, persons, keypoints, 2)
+        velocity = ma.diff(pred_poses, axis=0) / frame_step  # shape: (frames-1, persons, keypoints, 2)
         
         if self.time_unit == "second":
             fps = video_result.fps
@@ -1,2 +1,3 @@
 from .inference_engine import *
 from .pose_result import *
+from .pose_loader import *
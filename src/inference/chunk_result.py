@@ -0,0 +1,173 @@
+import os
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .pose_result import VideoPoseResult
+
+
+class ChunkResult:
+    """
+    Pose result of a single chunk of a video (e.g. a chunk processed by the MaskAnyone API), stored in the same
+    columnar format as `VideoPoseResult`. The arrays can be spilled to disk to limit the memory used by the results of
+    long videos (see `ChunkResultCollector`). The shape is kept, so spilled results can be combined without loading
+    them twice.
+    """
+    def __init__(self, chunk_index: int, frame_offset: int, pose_array: np.ndarray, valid_mask: np.ndarray, person_counts: np.ndarray):
+        """
+        Args:
+            chunk_index (int): Index of the chunk in the video, starting at 0.
+            frame_offset (int): Index of the first frame of the chunk in the video.
+            pose_array (np.ndarray): Float32 array of shape (num_frames, max_persons, num_keypoints, 3).
+            valid_mask (np.ndarray): Bool array of shape (num_frames, max_persons, num_keypoints).
+            person_counts (np.ndarray): Int array of shape (num_frames,).
+        """
+        self.chunk_index = chunk_index
+        self.frame_offset = frame_offset
+        self.shape = pose_array.shape
+        self._arrays = (pose_array, valid_mask, person_counts)
+        self._spill_path = None
+
+    @property
+    def num_frames(self) -> int:
+        return self.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the arrays, also if they are spilled to disk."""
+        num_frames, max_persons, num_keypoints, _ = self.shape
+        return num_frames * max_persons * num_keypoints * (3 * 4 + 1) + num_frames * 4
+
+    @property
+    def is_spilled(self) -> bool:
+        return self._spill_path is not None
+
+    def spill(self, directory: str):
+        """Writes the arrays to an uncompressed npz file in the directory and drops them from memory."""
+        if self.is_spilled:
+            return
+        spill_path = os.path.join(directory, f"chunk_{self.chunk_index}.npz")
+        pose_array, valid_mask, person_counts = self._arrays
+        np.savez(spill_path, pose_array=pose_array, valid_mask=valid_mask, person_counts=person_counts)
+        self._spill_path = spill_path
+        self._arrays = None
+
+    def load(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the pose array, valid mask and person counts, reading them from disk if they are spilled."""
+        if not self.is_spilled:
+            return self._arrays
+        with np.load(self._spill_path) as data:
+            return data["pose_array"], data["valid_mask"], data["person_counts"]
+
+    def release(self):
+        """Drops the arrays and deletes the spill file."""
+        self._arrays = None
+        if self._spill_path is not None and os.path.exists(self._spill_path):
+            os.remove(self._spill_path)
+
+
+class ChunkResultCollector:
+    """
+    Collects the chunk results of a video in memory and combines them into a single `VideoPoseResult`.
+    The chunks can be added in any order (e.g. as the uploads of the chunks complete). If a memory budget is set, the
+    results added first are spilled to a private temporary directory as soon as the results in memory exceed the budget.
+    The collector is thread-safe and should be closed (or used as a context manager) to delete spilled results.
+    """
+    def __init__(self, memory_budget: Optional[int] = None):
+        """
+        Args:
+            memory_budget (Optional[int]): Maximum number of bytes of chunk results kept in memory, None for no limit.
+        """
+        self.memory_budget = memory_budget
+        self._chunk_results: List[ChunkResult] = []
+        self._lock = threading.Lock()
+        self._spill_dir = None
+
+    def __enter__(self) -> 'ChunkResultCollector':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def in_memory_bytes(self) -> int:
+        with self._lock:
+            return sum(chunk_result.nbytes for chunk_result in self._chunk_results if not chunk_result.is_spilled)
+
+    def add(self, chunk_result: ChunkResult):
+        with self._lock:
+            if any(existing.chunk_index == chunk_result.chunk_index for existing in self._chunk_results):
+                raise ValueError(f"The result of chunk {chunk_result.chunk_index} was added twice")
+            self._chunk_results.append(chunk_result)
+            if self.memory_budget is None:
+                return
+
+            in_memory_bytes = sum(existing.nbytes for existing in self._chunk_results if not existing.is_spilled)
+            for existing in self._chunk_results:
+                if in_memory_bytes <= self.memory_budget:
+                    break
+                if not existing.is_spilled:
+                    if self._spill_dir is None:
+                        self._spill_dir = tempfile.TemporaryDirectory(prefix="maskbench_chunk_results_")
+                    existing.spill(self._spill_dir.name)
+                    in_memory_bytes -= existing.nbytes
+
+    def to_video_pose_result(self, fps: int, frame_width: int, frame_height: int, video_name: str = None) -> VideoPoseResult:
+        """
+        Combine the chunk results in chunk order. The results are copied into the pose arrays of the video one at a time
+        and released afterwards, so that at most one spilled chunk is loaded at a time.
+
+        Raises:
+            ValueError: If the chunks are not contiguous, e.g. because a chunk result is missing or has too few frames.
+        """
+        with self._lock:
+            chunk_results = sorted(self._chunk_results, key=lambda chunk_result: chunk_result.chunk_index)
+            self._chunk_results = []
+
+        expected_frame_offset = 0
+        for expected_chunk_index, chunk_result in enumerate(chunk_results):
+            if chunk_result.chunk_index != expected_chunk_index or chunk_result.frame_offset != expected_frame_offset:
+                raise ValueError(
+                    f"Chunk {chunk_result.chunk_index} of {video_name} starts at frame {chunk_result.frame_offset}, "
+                    f"expected chunk {expected_chunk_index} at frame {expected_frame_offset}"
+                )
+            expected_frame_offset += chunk_result.num_frames
+
+        num_frames = expected_frame_offset
+        max_persons = max((chunk_result.shape[1] for chunk_result in chunk_results), default=0)
+        num_keypoints = max((chunk_result.shape[2] for chunk_result in chunk_results), default=0)
+        pose_array = np.zeros((num_frames, max_persons, num_keypoints, 3), dtype=np.float32)
+        pose_array[..., 2] = np.nan
+        valid_mask = np.zeros((num_frames, max_persons, num_keypoints), dtype=bool)
+        person_counts = np.zeros(num_frames, dtype=np.int32)
+
+        for chunk_result in chunk_results:
+            chunk_pose_array, chunk_valid_mask, chunk_person_counts = chunk_result.load()
+            frames = slice(chunk_result.frame_offset, chunk_result.frame_offset + chunk_result.num_frames)
+            _, num_chunk_persons, num_chunk_keypoints, _ = chunk_result.shape
+            pose_array[frames, :num_chunk_persons, :num_chunk_keypoints] = chunk_pose_array
+            valid_mask[frames, :num_chunk_persons, :num_chunk_keypoints] = chunk_valid_mask
+            person_counts[frames] = chunk_person_counts
+            chunk_result.release()
+
+        return VideoPoseResult(
+            fps=fps,
+            frame_width=frame_width,
+            frame_height=frame_height,
+            video_name=video_name,
+            pose_array=pose_array,
+            valid_mask=valid_mask,
+            person_counts=person_counts,
+        )
+
+    def close(self):
+        """Releases all chunk results that were not combined and deletes the spill directory."""
+        with self._lock:
+            for chunk_result in self._chunk_results:
+                chunk_result.release()
+            self._chunk_results = []
+            if self._spill_dir is not None:
+                self._spill_dir.cleanup()
+                self._spill_dir = None
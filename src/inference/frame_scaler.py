@@ -0,0 +1,111 @@
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class FrameScaler:
+    """
+    Input scaling stage for estimators that process decoded frames.
+    High resolution frames (e.g. 2448x2048 in Tragic Talkers) are downscaled before they are passed to the model,
+    which resizes them internally anyway. Frames are never upscaled.
+    The scaling is configured once per estimator, every video gets its own `VideoFrameScaler` with the buffers.
+    """
+    def __init__(self, max_side: Optional[int] = None, scale: Optional[float] = None):
+        """
+        Args:
+            max_side (Optional[int]): Maximum length of the longer frame side in pixels.
+            scale (Optional[float]): Scale factor in (0, 1]. Only one of max_side and scale can be set.
+        """
+        if max_side is not None and scale is not None:
+            raise ValueError("Set either the maximum side length or the scale factor of the input frames, not both.")
+        if max_side is not None and max_side < 1:
+            raise ValueError(f"The maximum side length of the input frames must be positive, got {max_side}")
+        if scale is not None and not 0 < scale <= 1:
+            raise ValueError(f"The scale factor of the input frames must be in (0, 1], got {scale}")
+        self.max_side = max_side
+        self.scale = scale
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'FrameScaler':
+        return cls(max_side=config.get("input_max_side"), scale=config.get("input_scale"))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_side is not None or self.scale is not None
+
+    def get_scale(self, width: int, height: int) -> float:
+        if self.scale is not None:
+            return self.scale
+        if self.max_side is not None and max(width, height) > self.max_side:
+            return self.max_side / max(width, height)
+        return 1.0
+
+    def for_video(self, width: int, height: int, num_buffers: int = 1) -> 'VideoFrameScaler':
+        """
+        Args:
+            width (int): Width of the original frames.
+            height (int): Height of the original frames.
+            num_buffers (int): Number of scaled frames that are in use at the same time (e.g. the batch size).
+        """
+        return VideoFrameScaler(self.get_scale(width, height), width, height, num_buffers)
+
+
+class VideoFrameScaler:
+    """
+    Downscales the frames of a single video into reused buffers and maps keypoints back to the original frame size.
+    A scaled frame is only valid until the frame `num_buffers` calls later is scaled into the same buffer.
+    """
+    def __init__(self, scale: float, width: int, height: int, num_buffers: int = 1):
+        self.scale = scale
+        self.original_size = (width, height)
+        self.scaled_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        self.num_frames = 0
+        self.scaling_time = 0.0
+        self._buffers = [None] * max(1, num_buffers)
+
+    @property
+    def enabled(self) -> bool:
+        return self.scaled_size != self.original_size
+
+    def resize(self, frame: np.ndarray) -> np.ndarray:
+        """Returns the downscaled frame, or the frame itself if no scaling is needed. The input frame is not modified."""
+        self.num_frames += 1
+        if not self.enabled:
+            return frame
+
+        start_time = time.perf_counter()
+        buffer_idx = self.num_frames % len(self._buffers)
+        buffer = self._buffers[buffer_idx]
+        if buffer is not None and buffer.shape != (self.scaled_size[1], self.scaled_size[0]) + frame.shape[2:]:
+            buffer = None  # allocated by the first frame, only replaced if the frame format changes
+        buffer = cv2.resize(frame, self.scaled_size, dst=buffer, interpolation=cv2.INTER_LINEAR)
+        self._buffers[buffer_idx] = buffer
+        self.scaling_time += time.perf_counter() - start_time
+        return buffer
+
+    def to_original_coordinates(self, keypoints: np.ndarray) -> np.ndarray:
+        """
+        Rescales pixel coordinates in the scaled frame to the original frame in place.
+
+        Args:
+            keypoints (np.ndarray): Array of shape (..., >=2) with x and y as the first two values.
+        """
+        if self.enabled and keypoints.size > 0:
+            keypoints[..., 0] *= self.original_size[0] / self.scaled_size[0]
+            keypoints[..., 1] *= self.original_size[1] / self.scaled_size[1]
+        return keypoints
+
+    def describe_timing(self, total_time: float, num_frames: int) -> str:
+        """Describes the time per frame with and without the time spent on scaling the frames."""
+        num_frames = max(num_frames, 1)
+        frame_time = total_time / num_frames * 1000
+        if not self.enabled:
+            return f"{frame_time:.1f}ms per frame ({num_frames} frames, no input scaling)"
+        scaling_time = self.scaling_time / num_frames * 1000
+        return (
+            f"{frame_time:.1f}ms per frame ({num_frames} frames) including {scaling_time:.1f}ms for scaling "
+            f"{self.original_size[0]}x{self.original_size[1]} to {self.scaled_size[0]}x{self.scaled_size[1]}, "
+            f"{frame_time - scaling_time:.1f}ms per frame without scaling"
+        )
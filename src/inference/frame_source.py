@@ -0,0 +1,140 @@
+import queue
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+_END_OF_STREAM = object()
+
+
+class FrameSubscription:
+    """
+    Bounded queue of decoded frames for a single consumer of a `FrameSource`.
+    Iterating over the subscription yields (frame, frame_idx, timestamp) tuples until the video ends.
+    A consumer that stops early must call `close`, otherwise the frame source blocks once the queue is full.
+    """
+    def __init__(self, max_queued_frames: int):
+        self._queue = queue.Queue(maxsize=max_queued_frames)
+        self._closed = threading.Event()
+        self._error = None
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def close(self):
+        self._closed.set()
+        # drain the queue, so that a frame source blocked on this subscription continues
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _publish(self, item) -> bool:
+        """Put an item into the queue, blocking while it is full (backpressure). Returns False if the subscription was closed."""
+        while not self.closed:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fail(self, error: Exception):
+        self._error = error
+        self._publish(_END_OF_STREAM)
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, int, float]]:
+        while not self.closed:
+            item = self._queue.get()
+            if item is _END_OF_STREAM:
+                if self._error is not None:
+                    raise RuntimeError(f"Decoding the video failed: {self._error}") from self._error
+                return
+            yield item
+
+
+class FrameSource:
+    """
+    Decodes a video once and publishes every frame to all subscribers.
+    Every subscriber has its own bounded queue. The decoder waits whenever a queue is full, so the slowest subscriber
+    sets the pace and at most `max_queued_frames` frames per subscriber are held in memory.
+    The frames are shared between the subscribers and must not be modified in place.
+    """
+    def __init__(self, video_path: str, max_queued_frames: int = 16, frame_count: Optional[int] = None):
+        """
+        Args:
+            video_path (str): The full path to the video file.
+            max_queued_frames (int): Maximum number of decoded frames that are buffered per subscriber.
+            frame_count (Optional[int]): Exact number of frames of the video (e.g. counted by ffprobe). It is set as
+                "frame_count" in the metadata at the end of the stream, so that the estimators detect frames that were
+                dropped by the decoder (see `PoseEstimator.assert_frame_count_is_correct`). Defaults to the number of
+                decoded frames.
+        """
+        self.video_path = video_path
+        self.max_queued_frames = max_queued_frames
+        self.frame_count = frame_count
+        self.num_decoded_frames = None
+        self._subscriptions: List[FrameSubscription] = []
+        self._thread = None
+
+        self._cap = cv2.VideoCapture(video_path)
+        if not self._cap.isOpened():
+            raise ValueError(f"Video capture is not opened: {video_path}")
+
+        # Same keys as utils.get_video_metadata. The exact frame count is only known once all frames are decoded.
+        fps = int(self._cap.get(cv2.CAP_PROP_FPS))
+        self.metadata = {
+            "width": int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": fps,
+            "duration": None,
+            "frame_count": None,
+        }
+
+    def subscribe(self) -> FrameSubscription:
+        if self._thread is not None:
+            raise RuntimeError("Subscribers must be added before the frame source is started.")
+        subscription = FrameSubscription(self.max_queued_frames)
+        self._subscriptions.append(subscription)
+        return subscription
+
+    def start(self):
+        self._thread = threading.Thread(target=self._decode, name=f"FrameSource-{self.video_path}", daemon=True)
+        self._thread.start()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def _decode(self):
+        fps = self.metadata["fps"]
+        frame_idx = 0
+        try:
+            while True:
+                open_subscriptions = [subscription for subscription in self._subscriptions if not subscription.closed]
+                if not open_subscriptions:
+                    break
+                ret, frame = self._cap.read()
+                if not ret:
+                    break
+                timestamp = frame_idx / fps if fps > 0 else 0.0
+                for subscription in open_subscriptions:
+                    subscription._publish((frame, frame_idx, timestamp))
+                frame_idx += 1
+        except Exception as e:
+            for subscription in self._subscriptions:
+                subscription._fail(e)
+            return
+        finally:
+            self._cap.release()
+
+        # subscribers read the final frame count after the end of the stream
+        self.num_decoded_frames = frame_idx
+        frame_count = self.frame_count if self.frame_count is not None else frame_idx
+        self.metadata["frame_count"] = frame_count
+        self.metadata["duration"] = frame_count / fps if fps > 0 else 0
+        for subscription in self._subscriptions:
+            subscription._publish(_END_OF_STREAM)
@@ -0,0 +1,191 @@
+import math
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from .person_tracker import PersonTracker
+from .pose_result import VideoPoseResult
+
+# Maximum distance a person may move between two consecutive estimated frames to be matched, relative to the frame
+# diagonal and per frame of the stride
+DEFAULT_TRACKING_MAX_DISTANCE = 0.1
+
+
+def estimate_pose_with_frame_stride(estimator, video_path: str) -> VideoPoseResult:
+    """
+    Run a pose estimator on a video, on every `estimator.frame_stride`-th frame only.
+    Estimators that support the per-frame API receive the sampled frames directly, all other estimators receive a
+    temporary video that only contains the sampled frames. The poses of the skipped frames are interpolated
+    (see `interpolate_strided_result`), so the result has one frame per video frame like `estimate_pose`.
+    With a frame stride of 1, this is the same as calling `estimator.estimate_pose`.
+
+    Args:
+        estimator (PoseEstimator): The pose estimator.
+        video_path (str): The full path to the input video file.
+
+    Returns:
+        VideoPoseResult: The poses of all frames, with the interpolated frames marked in `interpolated_frames`.
+    """
+    frame_stride = estimator.frame_stride
+    if frame_stride <= 1:
+        return estimator.estimate_pose(video_path)
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Video capture is not opened: {video_path}")
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    import utils  # imported here, utils imports the inference package
+    # the exact frame count, the interpolation fails if the decoder returns fewer frames
+    num_frames = utils.video_metadata_cache.get(video_path)["frame_count"]
+
+    if estimator.supports_frame_processing():
+        strided_result = _estimate_sampled_frames(estimator, video_path, cap, fps, frame_width, frame_height, frame_stride, num_frames)
+    else:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # keep the file name, estimators derive the video name from it
+            strided_video_path = os.path.join(temp_dir, os.path.splitext(os.path.basename(video_path))[0] + ".mp4")
+            num_written_frames = _write_sampled_frames(cap, strided_video_path, fps, frame_width, frame_height, frame_stride)
+            # the metadata of the temporary video is known, do not probe it or add it to the metadata cache
+            strided_fps = fps / frame_stride
+            utils.video_metadata_cache.add_transient(strided_video_path, {
+                "width": frame_width,
+                "height": frame_height,
+                "fps": strided_fps,
+                "frame_count": num_written_frames,
+                "duration": num_written_frames / strided_fps if strided_fps > 0 else 0,
+            })
+            try:
+                strided_result = estimator.estimate_pose(strided_video_path)
+            finally:
+                utils.video_metadata_cache.remove_transient(strided_video_path)
+
+    max_distance = estimator.config.get("tracking_max_distance", DEFAULT_TRACKING_MAX_DISTANCE) * math.hypot(frame_width, frame_height)
+    return interpolate_strided_result(strided_result, frame_stride, num_frames, fps, max_distance * frame_stride)
+
+
+def _estimate_sampled_frames(estimator, video_path: str, cap: cv2.VideoCapture, fps: int, frame_width: int, frame_height: int, frame_stride: int, num_frames: int):
+    # the estimator sees a video that only consists of the sampled frames
+    strided_metadata = {
+        "width": frame_width,
+        "height": frame_height,
+        "fps": fps / frame_stride,
+        "frame_count": math.ceil(num_frames / frame_stride),
+        "duration": num_frames / fps if fps > 0 else 0,
+    }
+    video_context = estimator.start_video(video_path, strided_metadata)
+    frame_idx = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_idx % frame_stride == 0:
+                sampled_frame_idx = frame_idx // frame_stride
+                estimator.process_frame(video_context, frame, sampled_frame_idx, frame_idx / fps if fps > 0 else 0.0)
+            frame_idx += 1
+        video_pose_result = estimator.finish_video(video_context)
+    except Exception:
+        estimator.abort_video(video_context)  # releases resources that finish_video did not release
+        raise
+    finally:
+        cap.release()
+
+    return video_pose_result
+
+
+def _write_sampled_frames(cap: cv2.VideoCapture, output_path: str, fps: int, frame_width: int, frame_height: int, frame_stride: int) -> int:
+    """Returns the number of frames written to the output video."""
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps / frame_stride, (frame_width, frame_height))
+    frame_idx = 0
+    num_written_frames = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_idx % frame_stride == 0:
+                writer.write(frame)
+                num_written_frames += 1
+            frame_idx += 1
+    finally:
+        writer.release()
+        cap.release()
+    return num_written_frames
+
+
+def interpolate_strided_result(strided_result: VideoPoseResult, frame_stride: int, num_frames: int, fps: int, max_distance: float) -> VideoPoseResult:
+    """
+    Expand the result of every `frame_stride`-th frame of a video to all frames of the video.
+    Persons are matched between consecutive estimated frames (see `PersonTracker`) and the keypoints of matched persons
+    are linearly interpolated in between. A keypoint is only interpolated if it is detected in both estimated frames,
+    persons that are only detected in one of them are not present in the frames in between. The frames after the last
+    estimated frame repeat its poses.
+
+    Args:
+        strided_result (VideoPoseResult): Result with one frame for the frames 0, frame_stride, 2 * frame_stride, ...
+        frame_stride (int): Distance between two estimated frames.
+        num_frames (int): Number of frames of the video.
+        fps (int): Frames per second of the video.
+        max_distance (float): Maximum distance in pixels between the mean keypoint positions of a person in two
+            consecutive estimated frames to be considered the same person.
+
+    Returns:
+        VideoPoseResult: The poses of all frames. The estimated frames keep their poses, with the persons ordered by track.
+    """
+    num_sampled_frames = math.ceil(num_frames / frame_stride)
+    if strided_result.num_frames != num_sampled_frames:
+        raise ValueError(
+            f"Expected {num_sampled_frames} estimated frames for {num_frames} frames with frame stride {frame_stride}, "
+            f"got {strided_result.num_frames}"
+        )
+
+    pose_array = strided_result.pose_array
+    person_counts = strided_result.person_counts
+    person_tracker = PersonTracker(max_distance=max_distance)
+    sampled_frames = [person_tracker.update(pose_array[idx, :person_counts[idx]]) for idx in range(num_sampled_frames)]
+
+    max_persons = max((len(track_ids) for _, track_ids in sampled_frames), default=0)
+    num_keypoints = pose_array.shape[2]
+    interpolated_pose_array = np.zeros((num_frames, max_persons, num_keypoints, 3), dtype=np.float32)
+    interpolated_pose_array[..., 2] = np.nan
+    interpolated_person_counts = np.zeros(num_frames, dtype=np.int32)
+    interpolated_frames = np.zeros(num_frames, dtype=bool)
+
+    for sampled_idx, (keypoints, track_ids) in enumerate(sampled_frames):
+        frame_idx = sampled_idx * frame_stride
+        interpolated_pose_array[frame_idx, :len(track_ids)] = keypoints
+        interpolated_person_counts[frame_idx] = len(track_ids)
+
+        skipped_frame_indices = np.arange(frame_idx + 1, min(frame_idx + frame_stride, num_frames))
+        if len(skipped_frame_indices) == 0:
+            continue
+        interpolated_frames[skipped_frame_indices] = True
+
+        if sampled_idx + 1 < num_sampled_frames:
+            next_keypoints, next_track_ids = sampled_frames[sampled_idx + 1]
+            _, person_indices, next_person_indices = np.intersect1d(track_ids, next_track_ids, return_indices=True)
+            start, end = keypoints[person_indices], next_keypoints[next_person_indices]  # shape: (persons, keypoints, 3)
+            weights = ((skipped_frame_indices - frame_idx) / frame_stride)[:, np.newaxis, np.newaxis, np.newaxis]
+            values = (1 - weights) * start + weights * end  # shape: (skipped frames, persons, keypoints, 3)
+            is_detected = ~np.all(start[..., :2] == 0, axis=-1) & ~np.all(end[..., :2] == 0, axis=-1)
+            values[:, ~is_detected] = (0, 0, np.nan)
+        else:
+            values = np.repeat(keypoints[np.newaxis], len(skipped_frame_indices), axis=0)
+
+        interpolated_pose_array[skipped_frame_indices, :values.shape[1]] = values
+        interpolated_person_counts[skipped_frame_indices] = values.shape[1]
+
+    return VideoPoseResult(
+        fps=fps,
+        frame_width=strided_result.frame_width,
+        frame_height=strided_result.frame_height,
+        video_name=strided_result.video_name,
+        pose_array=interpolated_pose_array,
+        person_counts=interpolated_person_counts,
+        interpolated_frames=interpolated_frames,
+    )
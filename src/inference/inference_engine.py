@@ -1,23 +1,93 @@
+import os
 import time
+import threading
+from .frame_source import FrameSource
+from .frame_stride import estimate_pose_with_frame_stride
 from .pose_result import VideoPoseResult
-from typing import Dict, List
+from .scheduler import InferenceJob, estimate_seconds_per_frame, estimate_video_frame_count, estimator_config_key, log_schedule, next_dispatchable_job, order_longest_job_first, simulate_schedule
+from typing import Dict, List, Optional
 from checkpointer import Checkpointer
 import multiprocessing as mp
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 import logging
 
+# Estimator of the current worker process in process execution mode, built once by the pool initializer
+_worker_estimator = None
+
+
+def _init_estimator_worker(pose_estimator_specification: dict, log_file: Optional[str], video_metadata_cache_path: Optional[str]):
+    global _worker_estimator
+    # imported here, main and utils import the inference package
+    from main import LOG_FORMAT, load_pose_estimators
+    import utils
+
+    # spawned workers start without the logging configuration and the metadata cache path of the main process
+    if log_file is not None:
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, filename=log_file)
+    utils.video_metadata_cache.set_cache_path(video_metadata_cache_path)
+
+    pose_estimators = load_pose_estimators([pose_estimator_specification])
+    if not pose_estimators:
+        raise RuntimeError(f"Could not create pose estimator {pose_estimator_specification.get('name')} in worker process {os.getpid()}")
+    _worker_estimator = pose_estimators[0]
+    _worker_estimator.load_model()  # not loaded by the constructor in process execution mode
+
+
+def _get_log_file() -> Optional[str]:
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            return handler.baseFilename
+    return None
+
+
+def _estimate_pose_in_worker(video_path: str):
+    """Returns the result and the pid of the worker process. The result is pickled as compact arrays (see VideoPoseResult.__getstate__)."""
+    return estimate_pose_with_frame_stride(_worker_estimator, video_path), os.getpid()
+
+
+class SharedDecodingGroup:
+    """Estimators that share the decoded frames of every video. The group is scheduled like a single estimator."""
+    def __init__(self, estimators: list):
+        self.estimators = estimators
+        self.name = "+".join(estimator.name for estimator in estimators)
+        self.max_concurrent_videos = min(estimator.max_concurrent_videos for estimator in estimators)
+
+
 class InferenceEngine:
     """Class responsible for running the pose estimators on the videos and saving the results in the `poses` folder."""
     
-    def __init__(self, dataset: dict, pose_estimators: list, checkpointer: Checkpointer, execute_processing: bool):
+    def __init__(self, dataset: dict, pose_estimators: list, checkpointer: Checkpointer, execute_processing: bool, shared_frame_decoding: bool = False, frame_queue_size: int = 16):
+        """
+        Args:
+            shared_frame_decoding (bool): Decode every video once and share the frames between all estimators that
+                support the per-frame API (see `PoseEstimator.process_frame`) and run in thread execution mode.
+            frame_queue_size (int): Maximum number of decoded frames that are buffered per estimator with shared frame decoding.
+        """
         self.dataset = dataset
         self.pose_estimators = pose_estimators
         self.estimator_point_pairs = dict()
         self.checkpointer = checkpointer
         self.results = dict()
         self.execute_processing = execute_processing
+        self.shared_frame_decoding = shared_frame_decoding
+        self.frame_queue_size = frame_queue_size
+        self.process_pools = dict()
     
     def run_parallel_tasks(self, max_workers: int = None) -> Dict:
+        """
+        Run all pose estimators on all videos that have no results yet.
+        Every (estimator, video) pair is a separate job. Jobs are submitted to a shared thread pool longest job first
+        (see `create_job_schedule`), while every estimator runs at most `max_concurrent_videos` videos at the same time
+        (configured per estimator, default 1). Estimators with execution mode "process" run in worker processes
+        (see `start_process_pools`), all other estimators run in the threads of the pool. With shared frame decoding,
+        the estimators that support it form one group with one job per video (see `estimate_pose_keypoints_shared`).
+
+        Args:
+            max_workers (int, optional): Size of the thread pool. Defaults to the sum of the concurrency limits of all estimators.
+
+        Returns:
+            Dictionary mapping pose estimator names to video names and `VideoPoseResult` objects.
+        """
         num_estimator = len(self.pose_estimators)
         if num_estimator == 0:
             raise ValueError("No pose estimators provided. Please provide at least one pose estimator to run the inference engine.")
@@ -33,62 +103,290 @@ class InferenceEngine:
         if not self.execute_processing:
             print("Skipping processing as per configuration.")
             logging.info("Skipping processing as per configuration.")
+            self.close_estimators()
             return self.results
         
+        schedulable_estimators = self.group_shared_decoding_estimators()
+        concurrency_limits = {estimator.name: max(1, estimator.max_concurrent_videos) for estimator in schedulable_estimators}
         if max_workers is None:
-            max_workers = num_estimator
+            max_workers = sum(concurrency_limits.values())
+
+        pending_jobs = self.create_job_schedule(schedulable_estimators, concurrency_limits, max_workers)
+        predicted_makespan = max((job.predicted_finish for job in pending_jobs), default=None)
+        remaining_jobs = {estimator.name: 0 for estimator in schedulable_estimators}
+        for job in pending_jobs:
+            remaining_jobs[job.estimator.name] += 1
 
         print('=' * 50)
         print(f"Running {num_estimator} pose estimators with max_workers={max_workers}")
+        print(f"Concurrent videos per estimator: {concurrency_limits}")
         print(f"Using {mp.cpu_count()} CPU cores")
         print(f"Total videos to process: {len(self.dataset)}")
+        dataset_summary = getattr(self.dataset, "summary", None)
+        if dataset_summary:
+            print(f"Total frames: {dataset_summary['total_frames']}, total duration: {dataset_summary['total_duration'] / 60:.1f} min")
         print('=' * 50)
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_estimator = {
-                executor.submit(self.estimate_pose_keypoints, estimator): estimator
-                for estimator in self.pose_estimators
-            }
-            for future in as_completed(future_to_estimator):
-                try:
-                    results = future.result()
-                    estimator_name = results['estimator_name']
-                    estimator_results = results['estimator_results']
-                    for video_name, video_pose_result in estimator_results.items():
-                        self.results[estimator_name][video_name] = video_pose_result
-                except Exception as e:
-                    logging.error(f"Faced Exception: {e} while processing estimator: {future_to_estimator[future].name}")
-                    print(f"Faced Exception: {e} while processing estimator: {future_to_estimator[future].name}")
+        running_videos = {estimator.name: 0 for estimator in schedulable_estimators}
+        future_to_job = {}
+
+        def submit_available_jobs():
+            # Submit the longest pending job whose estimator is below its concurrency limit as long as workers are free
+            while pending_jobs and len(future_to_job) < max_workers:
+                job_idx = next_dispatchable_job(pending_jobs, running_videos, concurrency_limits)
+                if job_idx is None:
+                    break
+                job = pending_jobs.pop(job_idx)
+                future = executor.submit(self.run_job, job.estimator, job.video)
+                future_to_job[future] = job
+                running_videos[job.estimator.name] += 1
+
+        total_cost = sum(job.predicted_cost for job in pending_jobs)
+        total_frames = sum(job.num_frames for job in pending_jobs)
+        completed_cost = 0.0
+        completed_frames = 0
+        run_start_time = time.time()
+        try:
+            self.start_process_pools(concurrency_limits, {job.estimator.name for job in pending_jobs})
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                submit_available_jobs()
+                while future_to_job:
+                    done_futures, _ = wait(future_to_job, return_when=FIRST_COMPLETED)
+                    for future in done_futures:
+                        job = future_to_job.pop(future)
+                        estimator, video = job.estimator, job.video
+                        running_videos[estimator.name] -= 1
+                        remaining_jobs[estimator.name] -= 1
+                        try:
+                            for estimator_name, video_pose_result in future.result().items():
+                                self.results[estimator_name][video.get_filename()] = video_pose_result
+                        except Exception as e:
+                            logging.error(f"Faced Exception: {e} while processing estimator: {estimator.name}")
+                            print(f"Faced Exception: {e} while processing estimator: {estimator.name}")
+
+                        actual_finish = time.time() - run_start_time
+                        completed_cost += job.predicted_cost
+                        completed_frames += job.num_frames
+                        # extrapolate the remaining time from the elapsed time and the share of the predicted cost that is done
+                        eta = actual_finish * (total_cost - completed_cost) / completed_cost if completed_cost > 0 else float("nan")
+                        message = (f"Finished {estimator.name} on {video.get_filename()}: "
+                                   f"predicted finish {job.predicted_finish:.1f}s, actual finish {actual_finish:.1f}s | "
+                                   f"{completed_frames}/{total_frames} frames, ETA {eta:.0f}s")
+                        print(message)
+                        logging.info(message)
+
+                        if remaining_jobs[estimator.name] == 0:
+                            print(f"Completed estimator '{estimator.name}'")
+                    submit_available_jobs()
+        finally:
+            self.shutdown_process_pools()
+            self.close_estimators()
+
+        if predicted_makespan is not None:
+            message = f"Inference finished after {time.time() - run_start_time:.1f}s (predicted makespan: {predicted_makespan:.1f}s)"
+            print(message)
+            logging.info(message)
         
         return self.results
 
-    def estimate_pose_keypoints(self, estimator) -> Dict:
+    def start_process_pools(self, concurrency_limits: Dict[str, int], estimator_names: set):
         """
-        Run the pose estimators on the videos and save the results in the `poses` folder.
-        If a checkpoint name is provided in the configuration file, the inference engine will load the results from the checkpoint and skip the inference for the videos that already have results.
+        Start the worker processes of all estimators with execution mode "process" that have pending jobs.
+        Every estimator gets its own pool with `max_concurrent_videos` workers. Each worker builds the estimator once
+        from its configuration, so models are loaded once per worker and not once per video. The main process does not
+        load the models of these estimators (see `PoseEstimator.load_model`). The workers log to the log file of the
+        main process and use the same video metadata cache file.
+        The worker processes are started with "spawn", because forking the multi-threaded engine is unsafe.
+        """
+        for estimator in self.pose_estimators:
+            if estimator.execution_mode != "process" or estimator.name not in estimator_names:
+                continue
+            if estimator.specification is None:
+                print(f"Warning: {estimator.name} was not created from a configuration and cannot be rebuilt in a worker process. Running it in a thread.")
+                logging.warning(f"{estimator.name} has no specification, falling back to thread execution mode.")
+                estimator.load_model()  # not loaded by the constructor in process execution mode
+                continue
+            import utils  # imported here, utils imports the inference package
+            self.process_pools[estimator.name] = ProcessPoolExecutor(
+                max_workers=concurrency_limits[estimator.name],
+                mp_context=mp.get_context("spawn"),
+                initializer=_init_estimator_worker,
+                initargs=(estimator.specification, _get_log_file(), utils.video_metadata_cache.cache_path),
+            )
+            print(f"Running estimator '{estimator.name}' in {concurrency_limits[estimator.name]} worker processes")
+
+    def shutdown_process_pools(self):
+        for process_pool in self.process_pools.values():
+            process_pool.shutdown()
+        self.process_pools = dict()
+
+    def close_estimators(self):
+        """Release the models of all estimators (see `PoseEstimator.close`), they are not needed after the inference."""
+        for estimator in self.pose_estimators:
+            try:
+                estimator.close()
+            except Exception as e:
+                logging.warning(f"Could not close estimator {estimator.name}: {e}")
+
+    def group_shared_decoding_estimators(self) -> list:
+        """
+        Returns the estimators to schedule. With shared frame decoding, all estimators that support the per-frame API
+        and run in thread execution mode without frame stride are replaced by a single `SharedDecodingGroup`.
+        """
+        if not self.shared_frame_decoding:
+            return list(self.pose_estimators)
+
+        frame_estimators = [estimator for estimator in self.pose_estimators if estimator.execution_mode == "thread" and estimator.frame_stride == 1 and estimator.supports_frame_processing()]
+        if not frame_estimators:
+            print("Warning: shared frame decoding is enabled, but no estimator supports frame processing.")
+            return list(self.pose_estimators)
+
+        group = SharedDecodingGroup(frame_estimators)
+        print(f"Sharing decoded frames between estimators: {[estimator.name for estimator in frame_estimators]}")
+        return [group] + [estimator for estimator in self.pose_estimators if estimator not in frame_estimators]
+
+    def create_job_schedule(self, schedulable_estimators: list, concurrency_limits: Dict[str, int], max_workers: int) -> List[InferenceJob]:
+        """
+        Create one job for every (estimator, video) pair without results and order the jobs longest first.
+        The cost of a job is the frame count of the video times the average inference time per frame of the estimator
+        with the same configuration in previous runs of this checkpoint (and of the configured history checkpoints). Running long jobs first avoids a single long video at the end of the run keeping all
+        other workers idle. The schedule and the predicted finish times are logged.
+
+        Returns:
+            List of jobs in dispatch order.
+        """
+        video_frame_counts = {video.get_filename(): estimate_video_frame_count(video) for video in self.dataset}
+        seconds_per_frame = estimate_seconds_per_frame(
+            self.checkpointer.load_inference_time_history(),
+            {estimator.name: estimator_config_key(estimator) for estimator in self.pose_estimators},
+            video_frame_counts,
+        )
+        for estimator in schedulable_estimators:
+            if isinstance(estimator, SharedDecodingGroup):
+                seconds_per_frame[estimator.name] = sum(seconds_per_frame[member.name] for member in estimator.estimators)
+
+        jobs = []
+        for estimator in schedulable_estimators:
+            member_estimators = estimator.estimators if isinstance(estimator, SharedDecodingGroup) else [estimator]
+            for video in self.dataset:
+                processed_estimators = [member for member in member_estimators if video.get_filename() in self.results[member.name]]
+                for member in processed_estimators:
+                    print(f"Skipping already processed video {video.get_filename()} for estimator {member.name}")
+                if len(processed_estimators) == len(member_estimators):
+                    continue # if results already exist, skip inference
+                num_frames = video_frame_counts[video.get_filename()]
+                jobs.append(InferenceJob(estimator, video, num_frames, num_frames * seconds_per_frame[estimator.name]))
+
+        jobs = order_longest_job_first(jobs)
+        if jobs:
+            makespan = simulate_schedule(jobs, concurrency_limits, max_workers)
+            log_schedule(jobs, seconds_per_frame, makespan)
+        return jobs
+
+    def run_job(self, estimator, video) -> Dict[str, VideoPoseResult]:
+        """Run a scheduled job and return a dictionary mapping estimator names to the results of the video."""
+        if isinstance(estimator, SharedDecodingGroup):
+            return self.estimate_pose_keypoints_shared(estimator, video)
+
+        video_pose_result = self.estimate_pose_keypoints(estimator, video)
+        return {estimator.name: video_pose_result} if video_pose_result is not None else {}
+
+    def estimate_pose_keypoints(self, estimator, video) -> VideoPoseResult | None:
+        """
+        Run a pose estimator on a single video and save the result in the `poses` folder.
+        Errors are logged and isolated to the video, so that the remaining videos are still processed.
+        If a checkpoint name is provided in the configuration file, the inference engine loads the results from the checkpoint
+        and does not schedule the videos that already have results.
         This allows to resume the inference process in case it fails or to skip the inference entirely and only evaluate the metrics.
 
         Returns:
-            Dictionary mapping pose estimator names to video names and `VideoPoseResult` objects.
+            The `VideoPoseResult` of the video or None if the estimator failed on the video.
         """
-        estimator_results = {}
+        print(f"Running estimator '{estimator.name}' on video {video.path}")
 
-        for video in self.dataset:
-            if video.get_filename() in self.results[estimator.name]:
-                print(f"Skipping already processed video {video.get_filename()} for estimator {estimator.name}")
-                continue # if results already exist, skip inference
-            print(f"Running estimator '{estimator.name}' on video {video.path}")
+        start_time = time.time()
+        try:
+            process_pool = self.process_pools.get(estimator.name)
+            if process_pool is not None:
+                video_pose_result, worker_pid = process_pool.submit(_estimate_pose_in_worker, video.path).result()
+                worker_id = str(worker_pid)  # the pid of the worker process that ran the estimator
+            else:
+                video_pose_result = estimate_pose_with_frame_stride(estimator, video.path)
+                worker_id = None
+            self.save_video_pose_result(estimator, video, video_pose_result, start_time, time.time(), worker_id)
+        except Exception as e:
+            print(f"Error processing video {video.get_filename()} with estimator {estimator.name}: {e}")
+            logging.error(f"Faced Exception: {e} on Video: {video.get_filename()} with Estimator: {estimator.name}")
+            return None
 
-            start_time = time.time()
-            try:
-                video_pose_result = estimator.estimate_pose(video.path)
-                estimator_results[video.get_filename()] = video_pose_result
-                self.checkpointer.save_video_pose_result(video_pose_result, estimator.name)
-                self.checkpointer.save_inference_time(estimator.name, video.get_filename(), time.time() - start_time)
-            except Exception as e:
-                print(f"Error processing video {video.get_filename()} with estimator {estimator.name}: {e}")
-                logging.error(f"Faced Exception: {e} on Video: {video.get_filename()} with Estimator: {estimator.name}")
-                continue
-        
-        print(f"Completed estimator '{estimator.name}'")
-        return {'estimator_name': estimator.name, 'estimator_results': estimator_results}
\ No newline at end of file
+        return video_pose_result
+
+    def estimate_pose_keypoints_shared(self, group: SharedDecodingGroup, video) -> Dict[str, VideoPoseResult]:
+        """
+        Run the estimators of a group on a single video that is decoded only once (see `FrameSource`).
+        Every estimator consumes the decoded frames in its own thread through the per-frame API. The results are saved
+        like in `estimate_pose_keypoints` and errors are isolated to the estimator, so the other estimators continue.
+
+        Returns:
+            Dictionary mapping estimator names to the `VideoPoseResult` of the video. Failed estimators are missing.
+        """
+        estimators = [estimator for estimator in group.estimators if video.get_filename() not in self.results[estimator.name]]
+        print(f"Running estimators {[estimator.name for estimator in estimators]} on video {video.path} with shared frame decoding")
+
+        try:
+            import utils  # imported here, utils imports the inference package
+            # the exact frame count (from ffprobe), so that the estimators detect frames dropped by the decoder
+            frame_count = utils.video_metadata_cache.get(video.path)["frame_count"]
+            frame_source = FrameSource(video.path, max_queued_frames=self.frame_queue_size, frame_count=frame_count)
+        except Exception as e:
+            print(f"Error decoding video {video.get_filename()}: {e}")
+            logging.error(f"Faced Exception: {e} while decoding Video: {video.get_filename()}")
+            return {}
+
+        subscriptions = [frame_source.subscribe() for _ in estimators]
+        frame_source.start()
+        with ThreadPoolExecutor(max_workers=len(estimators)) as executor:
+            futures = {
+                estimator.name: executor.submit(self._estimate_pose_from_frames, estimator, video, frame_source, subscription)
+                for estimator, subscription in zip(estimators, subscriptions)
+            }
+        frame_source.join()
+
+        return {name: future.result() for name, future in futures.items() if future.result() is not None}
+
+    def _estimate_pose_from_frames(self, estimator, video, frame_source: FrameSource, subscription) -> VideoPoseResult | None:
+        start_time = time.time()
+        video_context = None
+        try:
+            video_context = estimator.start_video(video.path, frame_source.metadata)
+            for frame, frame_idx, timestamp in subscription:
+                estimator.process_frame(video_context, frame, frame_idx, timestamp)
+            video_pose_result = estimator.finish_video(video_context)
+            self.save_video_pose_result(estimator, video, video_pose_result, start_time, time.time())
+        except Exception as e:
+            if video_context is not None:
+                estimator.abort_video(video_context)  # releases resources that finish_video did not release
+            print(f"Error processing video {video.get_filename()} with estimator {estimator.name}: {e}")
+            logging.error(f"Faced Exception: {e} on Video: {video.get_filename()} with Estimator: {estimator.name}")
+            return None
+        finally:
+            subscription.close()  # stops the frame source from waiting for this estimator
+
+        return video_pose_result
+
+    def save_video_pose_result(self, estimator, video, video_pose_result: VideoPoseResult, start_time: float, end_time: float, worker_id: Optional[str] = None):
+        """
+        Save the result and the inference time of a video. `worker_id` identifies the worker process that ran the
+        estimator, it defaults to the current process and thread.
+        """
+        self.checkpointer.save_video_pose_result(video_pose_result, estimator.name)
+        self.checkpointer.save_inference_time(
+            estimator.name,
+            video.get_filename(),
+            end_time - start_time,
+            start_time=start_time,
+            end_time=end_time,
+            num_frames=video_pose_result.num_frames,
+            worker_id=worker_id or f"{os.getpid()}-{threading.current_thread().name}",
+            estimator_config=estimator_config_key(estimator),
+        )
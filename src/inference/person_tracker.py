@@ -0,0 +1,97 @@
+from typing import Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+class PersonTracker:
+    """
+    Keeps the order of persons stable across the frames of a video for estimators that detect persons frame by frame
+    without tracking (e.g. batched inference).
+    The persons of a frame are matched to the tracks of the previous frames with the Hungarian algorithm on the distance
+    between the mean positions of their detected keypoints. Matched persons keep their track, unmatched persons start a
+    new track. The persons of every frame are ordered by track id, like the results of a tracker.
+    The tracker works on the raw keypoint arrays of a frame (see `VideoPoseResult.from_frame_keypoints`).
+    """
+    def __init__(self, max_distance: float, max_missing_frames: int = 30):
+        """
+        Args:
+            max_distance (float): Maximum distance in pixels between the mean keypoint positions of a person in two frames
+                to be considered the same person.
+            max_missing_frames (int): Number of frames after which a track without matching person is dropped.
+        """
+        self.max_distance = max_distance
+        self.max_missing_frames = max_missing_frames
+        self._next_track_id = 0
+        self._track_ids = np.empty(0, dtype=int)
+        self._track_centers = np.empty((0, 2))
+        self._track_missing_frames = np.empty(0, dtype=int)
+
+    def update(self, frame_keypoints: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Assign the persons of the next frame to tracks.
+
+        Args:
+            frame_keypoints (np.ndarray): Keypoints of the frame with shape (persons, keypoints, >=2), where the first two
+                values are x and y. Undetected keypoints are at (0, 0).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The keypoints with the persons ordered by track id and the track ids in this order.
+        """
+        centers = self._get_centers(frame_keypoints)
+        detection_track_ids = self.assign(centers)
+
+        order = np.argsort(detection_track_ids, kind="stable")
+        return frame_keypoints[order], detection_track_ids[order]
+
+    def assign(self, centers: np.ndarray) -> np.ndarray:
+        """
+        Assign detections to tracks.
+
+        Args:
+            centers (np.ndarray): Mean keypoint positions of the detections, shape (num_persons, 2). NaN for persons
+                without detected keypoints, which always start a new track.
+
+        Returns:
+            np.ndarray: Track id of every detection.
+        """
+        detection_track_ids = np.full(len(centers), -1, dtype=int)
+        is_matched_track = np.zeros(len(self._track_ids), dtype=bool)
+
+        if len(centers) and len(self._track_ids):
+            distances = np.linalg.norm(centers[:, np.newaxis, :] - self._track_centers[np.newaxis, :, :], axis=-1)
+            distances = np.where(np.isnan(distances) | (distances > self.max_distance), np.inf, distances)
+            finite_distances = np.where(np.isinf(distances), 1e12, distances)  # the solver needs finite costs
+            detection_indices, track_indices = linear_sum_assignment(finite_distances)
+            for detection_idx, track_idx in zip(detection_indices, track_indices):
+                if np.isfinite(distances[detection_idx, track_idx]):
+                    detection_track_ids[detection_idx] = self._track_ids[track_idx]
+                    self._track_centers[track_idx] = centers[detection_idx]
+                    is_matched_track[track_idx] = True
+
+        self._track_missing_frames = np.where(is_matched_track, 0, self._track_missing_frames + 1)
+        is_active_track = self._track_missing_frames <= self.max_missing_frames
+        self._track_ids = self._track_ids[is_active_track]
+        self._track_centers = self._track_centers[is_active_track]
+        self._track_missing_frames = self._track_missing_frames[is_active_track]
+
+        for detection_idx in np.flatnonzero(detection_track_ids < 0):
+            detection_track_ids[detection_idx] = self._next_track_id
+            if not np.isnan(centers[detection_idx]).any():
+                self._track_ids = np.append(self._track_ids, self._next_track_id)
+                self._track_centers = np.vstack([self._track_centers, centers[detection_idx]])
+                self._track_missing_frames = np.append(self._track_missing_frames, 0)
+            self._next_track_id += 1
+
+        return detection_track_ids
+
+    @staticmethod
+    def _get_centers(frame_keypoints: np.ndarray) -> np.ndarray:
+        # mean position of the detected keypoints of every person, missing keypoints are stored as (0, 0)
+        if len(frame_keypoints) == 0:
+            return np.empty((0, 2))
+        xy = frame_keypoints[..., :2].astype(np.float64)
+        is_detected = ~np.all(xy == 0, axis=-1)  # shape: (persons, keypoints)
+        num_detected = is_detected.sum(axis=1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (xy * is_detected[..., np.newaxis]).sum(axis=1) / num_detected  # NaN for persons without keypoints
@@ -0,0 +1,61 @@
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Hashable, Optional, Tuple
+
+from .pose_result import VideoPoseResult
+
+
+def load_pose_files(pose_files: Dict[Hashable, Tuple[str, str]], max_workers: Optional[int] = None, description: str = "pose files") -> Dict[Hashable, VideoPoseResult]:
+    """
+    Load many pose files in parallel using a process pool.
+    JSON files are parsed in worker processes and sent back as compact pose arrays. Binary (npy) files are
+    memory-mapped in the calling process, because this is fast and memory maps cannot be shared with the workers.
+
+    Args:
+        pose_files (Dict[Hashable, Tuple[str, str]]): Dictionary mapping arbitrary keys (e.g. (estimator, video))
+            to tuples of pose file path and video name.
+        max_workers (int, optional): Number of worker processes. Defaults to the number of CPU cores.
+            With 1 worker or a single file, all files are loaded in the calling process.
+        description (str): Name of the loaded files used in the throughput report.
+
+    Returns:
+        Dict[Hashable, VideoPoseResult]: Dictionary mapping the keys of `pose_files` to the loaded pose results.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    start_time = time.time()
+    total_bytes = sum(os.path.getsize(pose_file_path) for pose_file_path, _ in pose_files.values())
+    results = {}
+
+    json_files = {}
+    for key, (pose_file_path, video_name) in pose_files.items():
+        if pose_file_path.endswith(".npy"):
+            results[key] = VideoPoseResult.from_file(pose_file_path, video_name)
+        else:
+            json_files[key] = (pose_file_path, video_name)
+
+    if max_workers <= 1 or len(json_files) <= 1:
+        for key, (pose_file_path, video_name) in json_files.items():
+            results[key] = VideoPoseResult.from_file(pose_file_path, video_name)
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(json_files))) as executor:
+            future_to_key = {
+                executor.submit(VideoPoseResult.from_file, pose_file_path, video_name): key
+                for key, (pose_file_path, video_name) in json_files.items()
+            }
+            for future in as_completed(future_to_key):
+                results[future_to_key[future]] = future.result()
+
+    elapsed_time = max(time.time() - start_time, 1e-6)
+    total_megabytes = total_bytes / (1024 * 1024)
+    message = (
+        f"Loaded {len(pose_files)} {description} ({total_megabytes:.1f} MB) in {elapsed_time:.2f}s "
+        f"with {max_workers} workers: {len(pose_files) / elapsed_time:.1f} files/s, {total_megabytes / elapsed_time:.1f} MB/s"
+    )
+    print(message)
+    logging.info(message)
+
+    return {key: results[key] for key in pose_files}  # keep the order of the input
@@ -1,12 +1,17 @@
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
+import hashlib
 import json
 import logging
+import os
+import threading
 from typing import List, Optional
 import numpy as np
 import numpy.ma as ma
 
 np.set_printoptions(threshold=np.inf)
 
+NPY_FORMAT_VERSION = 1
+
 
 @dataclass
 class PoseKeypoint:
@@ -31,129 +36,642 @@ class VideoPoseResult:
     """
     This class is the main output of the pose estimation models.
     It contains the pose estimation results for a video.
-    It is a nested object that contains a `FramePoseResult`object for each frame in the video.
+
+    Internally, the results are stored in a columnar format:
+        - `pose_array`: float32 array of shape (num_frames, max_persons, num_keypoints, 3) with x, y and confidence
+          for every keypoint. Missing confidences are stored as NaN.
+        - `valid_mask`: bool array of shape (num_frames, max_persons, num_keypoints) that is True for every keypoint
+          that exists in the model output.
+        - `person_counts`: int array of shape (num_frames,) with the number of persons in every frame.
+
+    For backward compatibility, the results are also available as a nested object through the `frames` attribute.
+    It contains a `FramePoseResult` object for each frame in the video.
     Within each frame pose result, there is a list of `PersonPoseResult` objects, one for each person in the frame.
     Every `PersonPoseResult` contains a list of `PoseKeypoint` objects, one for each keypoint in the model output format, with the x, y coordinates and a confidence score.
+    The nested object is built lazily on first access. It can be mutated in place, the changes are synced into the
+    arrays on the next array access (which drops the nested object again). The arrays are only replaced if the frames
+    were actually changed. Code that only reads the results should prefer the array attributes.
+
+    Results of estimators that run with a frame stride contain frames whose poses are interpolated between the
+    estimated frames. They are marked in `interpolated_frames`, so that metrics can exclude them.
+
+    The masked array returned by `to_numpy_ma` is cached and read-only. The cache is invalidated automatically when
+    changes to the `frames` attribute are synced into the arrays. Code that writes to `pose_array` or `valid_mask` directly must
+    call `invalidate_cache` afterwards.
     """
     def __init__(
         self,
         fps: int,
         frame_width: int,
         frame_height: int,
-        frames: List[FramePoseResult],
-        video_name: str,
+        frames: Optional[List[FramePoseResult]] = None,
+        video_name: str = None,
+        pose_array: Optional[np.ndarray] = None,
+        valid_mask: Optional[np.ndarray] = None,
+        person_counts: Optional[np.ndarray] = None,
+        interpolated_frames: Optional[np.ndarray] = None,
     ):
+        """
+        Create a video pose result either from a list of `FramePoseResult` objects or directly from arrays.
+
+        Args:
+            fps (int): Frames per second of the video.
+            frame_width (int): Width of the video frames in pixels.
+            frame_height (int): Height of the video frames in pixels.
+            frames (List[FramePoseResult], optional): Nested pose results, one per frame.
+            video_name (str): Name of the video without extension.
+            pose_array (np.ndarray, optional): Array of shape (num_frames, max_persons, num_keypoints, 3). Used without
+                copying if it is already a float32 array.
+            valid_mask (np.ndarray, optional): Bool array of shape (num_frames, max_persons, num_keypoints). If not
+                provided, every keypoint of the first `person_counts[f]` persons of frame f is considered valid.
+            person_counts (np.ndarray, optional): Array of shape (num_frames,). If not provided, it is derived from
+                `valid_mask`, or all `max_persons` slots are considered occupied.
+            interpolated_frames (np.ndarray, optional): Bool array of shape (num_frames,) that is True for frames
+                whose poses were interpolated instead of estimated. Defaults to no interpolated frames.
+        """
         self.fps = fps
         self.frame_width = frame_width
         self.frame_height = frame_height
-        self.frames = frames
         self.video_name = video_name
 
+        self._frames = None
+        self._pose_array = None
+        self._valid_mask = None
+        self._person_counts = None
+        self._numpy_ma_cache = None
+        self._interpolated_frames = None if interpolated_frames is None else np.asarray(interpolated_frames, dtype=bool)
+
+        if pose_array is not None:
+            if frames is not None:
+                raise ValueError("Provide either frames or pose_array to VideoPoseResult, not both.")
+            self._set_arrays(pose_array, valid_mask, person_counts)
+        else:
+            self._frames = frames if frames is not None else []
+
+    @property
+    def frames(self) -> List[FramePoseResult]:
+        """
+        Nested view of the poses. If the arrays hold the poses, the frames are built from them on first access and kept
+        until the arrays are read again. In-place changes to the frames are synced into the arrays then; if nothing
+        was changed, the arrays (and the cached masked array) are kept as they are.
+        """
+        if self._frames is None:
+            self._frames = [self._frame_from_arrays(frame_idx) for frame_idx in range(self.num_frames)]
+        return self._frames
+
+    @frames.setter
+    def frames(self, frames: List[FramePoseResult]):
+        self._frames = frames
+        self._pose_array = self._valid_mask = self._person_counts = None
+        self.invalidate_cache()
+
+    @property
+    def pose_array(self) -> np.ndarray:
+        self._ensure_arrays()
+        return self._pose_array
+
+    @property
+    def valid_mask(self) -> np.ndarray:
+        self._ensure_arrays()
+        return self._valid_mask
+
+    @property
+    def person_counts(self) -> np.ndarray:
+        self._ensure_arrays()
+        return self._person_counts
+
+    @property
+    def interpolated_frames(self) -> np.ndarray:
+        """Bool array of shape (num_frames,) that is True for frames whose poses were interpolated (see frame_stride)."""
+        if self._interpolated_frames is None:
+            return np.zeros(self.num_frames, dtype=bool)
+        return self._interpolated_frames
+
+    @property
+    def num_frames(self) -> int:
+        if self._frames is not None:
+            return len(self._frames)
+        return self._pose_array.shape[0]
+
+    def __len__(self) -> int:
+        return self.num_frames
+
+    def __getstate__(self) -> dict:
+        # Pickle only the compact arrays (e.g. when sending results between processes), never the nested dataclass objects
+        if self._frames is not None:
+            self._ensure_arrays()
+        state = self.__dict__.copy()
+        state["_numpy_ma_cache"] = None
+        return state
+
+    def invalidate_cache(self):
+        """
+        Drop the cached masked array of `to_numpy_ma`.
+        Must be called after modifying `pose_array` or `valid_mask` in place.
+        """
+        self._numpy_ma_cache = None
+
+    def _set_arrays(self, pose_array: np.ndarray, valid_mask: Optional[np.ndarray], person_counts: Optional[np.ndarray]):
+        pose_array = np.asarray(pose_array, dtype=np.float32)
+        if pose_array.ndim != 4 or pose_array.shape[-1] != 3:
+            raise ValueError(f"pose_array must have shape (frames, persons, keypoints, 3), got {pose_array.shape}")
+        num_frames, max_persons, num_keypoints, _ = pose_array.shape
+
+        if person_counts is None:
+            if valid_mask is not None:
+                person_counts = _person_counts_from_valid_mask(np.asarray(valid_mask))
+            else:
+                person_counts = np.full(num_frames, max_persons)
+        person_counts = np.asarray(person_counts, dtype=np.int32)
+
+        if valid_mask is None:
+            person_slots = np.arange(max_persons) < person_counts[:, np.newaxis]  # shape: (frames, persons)
+            valid_mask = np.repeat(person_slots[:, :, np.newaxis], num_keypoints, axis=2)
+        valid_mask = np.asarray(valid_mask, dtype=bool)
+        if valid_mask.shape != pose_array.shape[:3]:
+            raise ValueError(f"valid_mask must have shape {pose_array.shape[:3]}, got {valid_mask.shape}")
+
+        self._pose_array = pose_array
+        self._valid_mask = valid_mask
+        self._person_counts = person_counts
+
+    def _ensure_arrays(self):
+        """Sync the frames into the arrays if the frames hold the poses or were handed out by the `frames` view."""
+        if self._frames is None:
+            return
+
+        pose_array, valid_mask, person_counts = self._arrays_from_frames(self._frames)
+        if self._pose_array is None or not _same_poses(self._pose_array, self._valid_mask, self._person_counts, pose_array, valid_mask, person_counts):
+            self._pose_array = pose_array
+            self._valid_mask = valid_mask
+            self._person_counts = person_counts
+            self.invalidate_cache()
+        self._frames = None  # the arrays own the data from now on
+
+    @staticmethod
+    def _arrays_from_frames(frames: List[FramePoseResult]):
+        num_frames = len(frames)
+        person_counts = np.array([len(frame.persons) if frame and frame.persons else 0 for frame in frames], dtype=np.int32)
+        max_persons = int(person_counts.max()) if num_frames else 0
+        num_keypoints = max(
+            (len(person.keypoints) for frame in frames if frame and frame.persons for person in frame.persons if person and person.keypoints),
+            default=0,
+        )
+
+        pose_array = np.zeros((num_frames, max_persons, num_keypoints, 3), dtype=np.float32)
+        pose_array[..., 2] = np.nan
+        valid_mask = np.zeros((num_frames, max_persons, num_keypoints), dtype=bool)
+
+        for frame_idx, frame in enumerate(frames):
+            if not frame or not frame.persons:
+                continue
+            for person_idx, person in enumerate(frame.persons):
+                if not person or not person.keypoints:
+                    continue
+                num_person_keypoints = len(person.keypoints)
+                pose_array[frame_idx, person_idx, :num_person_keypoints] = [
+                    (kpt.x, kpt.y, np.nan if kpt.confidence is None else kpt.confidence)
+                    for kpt in person.keypoints
+                ]
+                valid_mask[frame_idx, person_idx, :num_person_keypoints] = True
+        return pose_array, valid_mask, person_counts
+
+    def _frame_from_arrays(self, frame_idx: int) -> FramePoseResult:
+        persons = []
+        for person_idx in range(self._person_counts[frame_idx]):
+            num_person_keypoints = int(self._valid_mask[frame_idx, person_idx].sum())
+            keypoints = [
+                PoseKeypoint(x=float(x), y=float(y), confidence=None if np.isnan(c) else float(c))
+                for x, y, c in self._pose_array[frame_idx, person_idx, :num_person_keypoints].tolist()
+            ]
+            persons.append(PersonPoseResult(keypoints=keypoints))
+        return FramePoseResult(persons=persons, frame_idx=frame_idx)
+
     def __info__(self, num_of_sample_frames: int = 3) -> dict:
+        if self._frames is not None:
+            sample_frames = self._frames[:num_of_sample_frames]
+        else:
+            sample_frames = [self._frame_from_arrays(i) for i in range(min(num_of_sample_frames, self.num_frames))]
         return {
             "video_name": self.video_name,
             "fps": self.fps,
             "frame_width": self.frame_width,
             "frame_height": self.frame_height,
-            "num_frames": len(self.frames),
-            "sample_frames": self.frames[:num_of_sample_frames] if len(self.frames) > num_of_sample_frames else self.frames,
+            "num_frames": self.num_frames,
+            "sample_frames": sample_frames,
         }
-    
+
     def to_numpy_ma(self, metric_name: str = None, model_name: str = None) -> np.ndarray:
         """
-        Convert the video pose results from a nested object to a masked array.
+        Convert the video pose results to a masked array.
         This method is useful for evaluation and plotting in order to work
         with arrays rather than nested objects.
-        
+        The masked array is computed once and cached, every call returns a read-only view of the cache.
+        Metrics that need to modify the poses must work on a copy (e.g. `video_result.to_numpy_ma().copy()`).
+
         Returns:
             Masked array with shape (num_frames, max_persons, num_keypoints, 2)
             where 2 represents x and y coordinates. Max_persons is the maximum number
-            of detected persons in the entire video. Values are masked for frames with 
+            of detected persons in the entire video. Values are masked for frames with
             fewer persons than max_persons, which means that these values are not included
             in computations (e.g. evaluation or plotting).
         """
-        if not self.frames:
+        if self.num_frames == 0:
             print(f"Warning: No frames in video pose result: {self.video_name}.")
             logging.warning(f"Warning: No frames in video pose result: {self.video_name} {metric_name} {model_name}.")
             return ma.array(np.zeros((0, 0, 0, 2)))
-            
-        # Get dimensions
-        num_frames = len(self.frames)
-        max_persons = max(len(frame.persons) for frame in self.frames)
-        num_keypoints = max(
-            len(person.keypoints)
-            for frame in self.frames
-            for person in frame.persons
-        ) if any(frame.persons for frame in self.frames) else 0
-        
+
+        self._ensure_arrays()  # changes to the frames view invalidate the cache
+        if self._numpy_ma_cache is not None:
+            return self._numpy_ma_cache.view()
+
+        pose_array = self.pose_array
+        valid_mask = self.valid_mask
+        num_frames, max_persons, num_keypoints, _ = pose_array.shape
+
         if max_persons == 0 or num_keypoints == 0:
             print(f"Warning: No persons or keypoints found in video pose result: {self.video_name}.")
             logging.warning(f"Warning: No persons or keypoints found in video pose result: {self.video_name} {metric_name} {model_name}.")
             return ma.array(np.zeros((num_frames, 0, 0, 2)))
-        
-        # Initialize arrays - all values masked by default
-        values = np.zeros((num_frames, max_persons, num_keypoints, 2))
-        mask = np.ones_like(values, dtype=bool)  # True means masked
-        
-        for frame_idx, frame in enumerate(self.frames):
-            # Only fill and unmask values for persons that exist
-            for person_idx, person in enumerate(frame.persons):
-                for kpt_idx, keypoint in enumerate(person.keypoints):
-                    values[frame_idx, person_idx, kpt_idx, 0] = keypoint.x
-                    values[frame_idx, person_idx, kpt_idx, 1] = keypoint.y
-                    mask[frame_idx, person_idx, kpt_idx] = False  # Unmask only existing values
-        
-        return ma.array(values, mask=mask)
+
+        values = pose_array[..., :2].astype(np.float64)
+        values[~valid_mask] = 0  # masked values are zero, some metrics work on the raw data
+        mask = np.repeat(~valid_mask[..., np.newaxis], 2, axis=-1)  # True means masked
+        values.flags.writeable = False
+        mask.flags.writeable = False
+
+        self._numpy_ma_cache = ma.array(values, mask=mask, copy=False)
+        return self._numpy_ma_cache.view()
 
     def to_json(self) -> dict:
-        return {
+        pose_array = self.pose_array
+        valid_mask = self.valid_mask
+        frames = []
+        for frame_idx, num_persons in enumerate(self.person_counts.tolist()):
+            persons = []
+            for person_idx in range(num_persons):
+                num_person_keypoints = int(valid_mask[frame_idx, person_idx].sum())
+                keypoints = [
+                    {"x": x, "y": y, "confidence": None if c != c else c}  # c != c is True for NaN
+                    for x, y, c in pose_array[frame_idx, person_idx, :num_person_keypoints].tolist()
+                ]
+                persons.append({"keypoints": keypoints, "id": None})
+            frames.append({"persons": persons, "frame_idx": frame_idx})
+
+        result = {
             "fps": self.fps,
             "frame_width": self.frame_width,
             "frame_height": self.frame_height,
-            "frames": [asdict(frame) for frame in self.frames],
+            "frames": frames,
             "video_name": self.video_name,
         }
+        if self.interpolated_frames.any():
+            result["interpolated_frames"] = np.flatnonzero(self.interpolated_frames).tolist()
+        return result
+
+    def to_npy(self, npy_path: str):
+        """
+        Save the pose arrays in a binary format that can be memory-mapped when loading.
+        The pose array is written as a raw `.npy` file, where keypoints that do not exist are marked with NaN
+        coordinates. The remaining fields are written to a small metadata header next to it (see `get_npy_meta_path`).
+
+        Args:
+            npy_path (str): Path of the `.npy` file to write.
+        """
+        pose_array = np.array(self.pose_array, dtype=np.float32)
+        pose_array[~self.valid_mask, :2] = np.nan
+        np.save(npy_path, pose_array)
+
+        meta = {
+            "format_version": NPY_FORMAT_VERSION,
+            "fps": self.fps,
+            "frame_width": self.frame_width,
+            "frame_height": self.frame_height,
+            "video_name": self.video_name,
+        }
+        # Person counts only need to be stored for persons without any keypoints, otherwise they follow from the NaN marks
+        if not np.array_equal(self.person_counts, _person_counts_from_valid_mask(self.valid_mask)):
+            meta["person_counts"] = self.person_counts.tolist()
+        if self.interpolated_frames.any():
+            meta["interpolated_frames"] = np.flatnonzero(self.interpolated_frames).tolist()
+
+        with open(get_npy_meta_path(npy_path), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def from_npy(cls, npy_path: str, video_name: str = None, mmap_mode: Optional[str] = "r") -> 'VideoPoseResult':
+        """
+        Create a VideoPoseResult instance from a binary pose file written by `to_npy`.
+
+        Args:
+            npy_path (str): Path to the `.npy` file containing the pose array.
+            video_name (str, optional): Video name to use. If not provided, uses the one from the metadata header.
+            mmap_mode (str, optional): Memory-map mode passed to `np.load`. Defaults to read-only memory mapping,
+                set to None to load the array into memory.
+
+        Returns:
+            VideoPoseResult: A new instance backed by the (memory-mapped) pose array.
+        """
+        with open(get_npy_meta_path(npy_path), "r") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != NPY_FORMAT_VERSION:
+            raise ValueError(f"Unsupported pose file format version {meta.get('format_version')} in {npy_path}")
+
+        pose_array = np.load(npy_path, mmap_mode=mmap_mode)
+        valid_mask = ~np.isnan(pose_array[..., 0])
+
+        return cls(
+            fps=meta.get("fps", None),
+            frame_width=meta.get("frame_width", None),
+            frame_height=meta.get("frame_height", None),
+            video_name=video_name or meta.get("video_name"),
+            pose_array=pose_array,
+            valid_mask=valid_mask,
+            person_counts=meta.get("person_counts", None),
+            interpolated_frames=_interpolated_frames_from_indices(meta.get("interpolated_frames"), pose_array.shape[0]),
+        )
+
+    @classmethod
+    def from_file(cls, pose_file_path: str, video_name: str = None) -> 'VideoPoseResult':
+        """
+        Create a VideoPoseResult instance from a pose file in either format.
+        Files ending with `.npy` are loaded with `from_npy` (memory-mapped), all other files with `from_json`.
+        """
+        if pose_file_path.endswith(".npy"):
+            return cls.from_npy(pose_file_path, video_name)
+        return cls.from_json(pose_file_path, video_name)
 
     @classmethod
     def from_json(cls, json_path: str, video_name: str = None) -> 'VideoPoseResult':
         """
         Create a VideoPoseResult instance from a JSON file.
-        
+        The keypoints are written directly into the pose arrays without creating intermediate dataclass objects.
+
         Args:
             json_path (str): Path to the JSON file containing the pose result data
             video_name (str, optional): Video name to use. If not provided, uses the one from data.
-            
+
         Returns:
             VideoPoseResult: A new instance created from the JSON data
         """
         with open(json_path, "r") as f:
             data = json.load(f)
-            frames = data.get("frames", [])
-            frame_pose_results = []
-            
-            for frame_index, frame in enumerate(frames):
-                persons = frame.get("persons", [])
-                person_pose_results = []
-                for person in persons:
-                    keypoints = person.get("keypoints", [])
-                    pose_keypoints = [
-                        PoseKeypoint(
-                            x=k["x"], 
-                            y=k["y"], 
-                            confidence=k.get("confidence", None)
-                        ) for k in keypoints
-                    ]
-                    person_pose_results.append(PersonPoseResult(keypoints=pose_keypoints))
-                frame_pose_results.append(FramePoseResult(persons=person_pose_results, frame_idx=frame_index))
-            
-            return cls(
-                fps=data.get("fps", None),
-                frame_width=data.get("frame_width", None),
-                frame_height=data.get("frame_height", None),
-                video_name=video_name or data.get("video_name"),
-                frames=frame_pose_results
-            )
+
+        frames = data.get("frames", [])
+        num_frames = len(frames)
+        persons_per_frame = [frame.get("persons", []) or [] for frame in frames]
+        person_counts = np.array([len(persons) for persons in persons_per_frame], dtype=np.int32)
+        max_persons = int(person_counts.max()) if num_frames else 0
+        num_keypoints = max(
+            (len(person.get("keypoints", []) or []) for persons in persons_per_frame for person in persons),
+            default=0,
+        )
+
+        pose_array = np.zeros((num_frames, max_persons, num_keypoints, 3), dtype=np.float32)
+        pose_array[..., 2] = np.nan
+        valid_mask = np.zeros((num_frames, max_persons, num_keypoints), dtype=bool)
+
+        for frame_idx, persons in enumerate(persons_per_frame):
+            for person_idx, person in enumerate(persons):
+                keypoints = person.get("keypoints", []) or []
+                if not keypoints:
+                    continue
+                pose_array[frame_idx, person_idx, :len(keypoints)] = [
+                    (k["x"], k["y"], np.nan if k.get("confidence") is None else k["confidence"])
+                    for k in keypoints
+                ]
+                valid_mask[frame_idx, person_idx, :len(keypoints)] = True
+
+        return cls(
+            fps=data.get("fps", None),
+            frame_width=data.get("frame_width", None),
+            frame_height=data.get("frame_height", None),
+            video_name=video_name or data.get("video_name"),
+            pose_array=pose_array,
+            valid_mask=valid_mask,
+            person_counts=person_counts,
+            interpolated_frames=_interpolated_frames_from_indices(data.get("interpolated_frames"), num_frames),
+        )
+
+    @classmethod
+    def from_frame_keypoints(
+        cls,
+        frame_keypoints: List[Optional[np.ndarray]],
+        fps: int,
+        frame_width: int,
+        frame_height: int,
+        video_name: str = None,
+    ) -> 'VideoPoseResult':
+        """
+        Create an array-backed VideoPoseResult from the raw keypoint arrays of a model, one array per frame.
+        Keypoints at (0, 0) follow the convention for undetected keypoints and get no confidence.
+
+        Args:
+            frame_keypoints (List[Optional[np.ndarray]]): One array per frame with shape (persons, keypoints, 3) holding
+                x, y and confidence, or (persons, keypoints, 2) for models without confidences. None or an empty
+                array if no person is detected in the frame.
+            fps (int): Frames per second of the video.
+            frame_width (int): Width of the video frames in pixels.
+            frame_height (int): Height of the video frames in pixels.
+            video_name (str): Name of the video without extension.
+
+        Returns:
+            VideoPoseResult: A new instance that stores the keypoints in its pose arrays.
+        """
+        frame_keypoints = [keypoints if keypoints is not None and keypoints.size > 0 else None for keypoints in frame_keypoints]
+        num_frames = len(frame_keypoints)
+        person_counts = np.array([len(keypoints) if keypoints is not None else 0 for keypoints in frame_keypoints], dtype=np.int32)
+        max_persons = int(person_counts.max()) if num_frames else 0
+        num_keypoints = max((keypoints.shape[1] for keypoints in frame_keypoints if keypoints is not None), default=0)
+
+        pose_array = np.zeros((num_frames, max_persons, num_keypoints, 3), dtype=np.float32)
+        pose_array[..., 2] = np.nan
+        valid_mask = np.zeros((num_frames, max_persons, num_keypoints), dtype=bool)
+
+        for frame_idx, keypoints in enumerate(frame_keypoints):
+            if keypoints is None:
+                continue
+            num_persons, num_frame_keypoints, num_values = keypoints.shape
+            pose_array[frame_idx, :num_persons, :num_frame_keypoints, :num_values] = keypoints
+            valid_mask[frame_idx, :num_persons, :num_frame_keypoints] = True
+
+        is_undetected = (pose_array[..., 0] == 0) & (pose_array[..., 1] == 0)
+        pose_array[..., 2][is_undetected] = np.nan
+
+        return cls(
+            fps=fps,
+            frame_width=frame_width,
+            frame_height=frame_height,
+            video_name=video_name,
+            pose_array=pose_array,
+            valid_mask=valid_mask,
+            person_counts=person_counts,
+        )
 
     def __str__(self):
         array = self.to_numpy_ma()
-        return f"VideoPoseResult(fps={self.fps}, frame_width={self.frame_width}, frame_height={self.frame_height}, video_name={self.video_name}), frame_values: \n{array}"
\ No newline at end of file
+        return f"VideoPoseResult(fps={self.fps}, frame_width={self.frame_width}, frame_height={self.frame_height}, video_name={self.video_name}), frame_values: \n{array}"
+
+
+class LazyVideoPoseResult(VideoPoseResult):
+    """
+    Proxy for a `VideoPoseResult` that is stored in a pose file.
+    The file is only parsed (JSON) or memory-mapped (npy) when the poses are accessed for the first time.
+    Metadata that is known in advance (e.g. from the checkpoint manifest) is available without loading the file.
+    If the SHA-256 of the file is known, it is verified when the file is loaded. If the file was changed since, the
+    metadata known in advance is discarded and taken from the file.
+    """
+    def __init__(
+        self,
+        pose_file_path: str,
+        video_name: str,
+        fps: Optional[int] = None,
+        frame_width: Optional[int] = None,
+        frame_height: Optional[int] = None,
+        num_frames: Optional[int] = None,
+        sha256: Optional[str] = None,
+    ):
+        self.pose_file_path = pose_file_path
+        self.sha256 = sha256
+        self._num_frames_hint = num_frames
+        self._is_loaded = False
+        self._load_lock = threading.Lock()
+        super().__init__(fps, frame_width, frame_height, video_name=video_name)
+        self._frames = None  # neither frames nor arrays exist until the file is loaded
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._is_loaded
+
+    def __getstate__(self) -> dict:
+        state = super().__getstate__()
+        del state["_load_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._load_lock = threading.Lock()
+
+    def _load(self):
+        if self._is_loaded:
+            return
+        with self._load_lock:
+            if self._is_loaded:
+                return
+            if self.sha256 is not None and compute_file_sha256(self.pose_file_path) != self.sha256:
+                print(f"Warning: {self.pose_file_path} does not match its manifest entry, reading its metadata from the file.")
+                logging.warning(f"{self.pose_file_path} does not match the SHA-256 of its manifest entry")
+                self._fps = self._frame_width = self._frame_height = self._num_frames_hint = None
+            loaded = VideoPoseResult.from_file(self.pose_file_path, self.video_name)
+            self._fps = self._fps if self._fps is not None else loaded.fps
+            self._frame_width = self._frame_width if self._frame_width is not None else loaded.frame_width
+            self._frame_height = self._frame_height if self._frame_height is not None else loaded.frame_height
+            self._set_arrays(loaded.pose_array, loaded.valid_mask, loaded.person_counts)
+            self._interpolated_frames = loaded._interpolated_frames
+            self.invalidate_cache()
+            self._is_loaded = True
+
+    @property
+    def frames(self) -> List[FramePoseResult]:
+        self._load()
+        return VideoPoseResult.frames.fget(self)
+
+    @frames.setter
+    def frames(self, frames: List[FramePoseResult]):
+        self._is_loaded = True  # the content is replaced, the file does not need to be loaded anymore
+        VideoPoseResult.frames.fset(self, frames)
+
+    @property
+    def interpolated_frames(self) -> np.ndarray:
+        self._load()
+        return VideoPoseResult.interpolated_frames.fget(self)
+
+    @property
+    def num_frames(self) -> int:
+        if not self._is_loaded and self._num_frames_hint is not None:
+            return self._num_frames_hint
+        self._load()
+        return VideoPoseResult.num_frames.fget(self)
+
+    def _ensure_arrays(self):
+        self._load()
+        super()._ensure_arrays()
+
+    # fps and frame size are plain attributes of VideoPoseResult, they are loaded from the file if they are not known yet
+    @property
+    def fps(self) -> int:
+        if self._fps is None:
+            self._load()
+        return self._fps
+
+    @fps.setter
+    def fps(self, fps: int):
+        self._fps = fps
+
+    @property
+    def frame_width(self) -> int:
+        if self._frame_width is None:
+            self._load()
+        return self._frame_width
+
+    @frame_width.setter
+    def frame_width(self, frame_width: int):
+        self._frame_width = frame_width
+
+    @property
+    def frame_height(self) -> int:
+        if self._frame_height is None:
+            self._load()
+        return self._frame_height
+
+    @frame_height.setter
+    def frame_height(self, frame_height: int):
+        self._frame_height = frame_height
+
+def get_npy_meta_path(npy_path: str) -> str:
+    """Returns the path of the metadata header that belongs to a binary pose file."""
+    return os.path.splitext(npy_path)[0] + ".meta.json"
+
+
+def compute_file_sha256(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def _same_poses(pose_array, valid_mask, person_counts, other_pose_array, other_valid_mask, other_person_counts) -> bool:
+    """
+    Whether two sets of pose arrays describe the same poses. The other arrays may have fewer person and keypoint slots
+    (e.g. arrays rebuilt from frames without the padding of a pose file), only valid keypoints are compared.
+    """
+    _, max_persons, num_keypoints, _ = other_pose_array.shape
+    if pose_array.shape[0] != other_pose_array.shape[0] or max_persons > pose_array.shape[1] or num_keypoints > pose_array.shape[2]:
+        return False
+    if not np.array_equal(person_counts, other_person_counts):
+        return False
+    if valid_mask[:, max_persons:].any() or valid_mask[:, :, num_keypoints:].any():
+        return False
+    if not np.array_equal(valid_mask[:, :max_persons, :num_keypoints], other_valid_mask):
+        return False
+    return np.array_equal(pose_array[:, :max_persons, :num_keypoints][other_valid_mask], other_pose_array[other_valid_mask], equal_nan=True)
+
+
+def _person_counts_from_valid_mask(valid_mask: np.ndarray) -> np.ndarray:
+    """Number of person slots per frame, i.e. the index of the last person with any valid keypoint plus one."""
+    person_has_keypoints = valid_mask.any(axis=2)  # shape: (frames, persons)
+    max_persons = person_has_keypoints.shape[1]
+    if max_persons == 0:
+        return np.zeros(person_has_keypoints.shape[0], dtype=np.int32)
+    last_person_idx = max_persons - np.argmax(person_has_keypoints[:, ::-1], axis=1)
+    return np.where(person_has_keypoints.any(axis=1), last_person_idx, 0).astype(np.int32)
+
+
+def _interpolated_frames_from_indices(frame_indices: Optional[List[int]], num_frames: int) -> Optional[np.ndarray]:
+    """Bool array of the interpolated frames from the frame indices stored in a pose file, None if there are none."""
+    if not frame_indices:
+        return None
+    interpolated_frames = np.zeros(num_frames, dtype=bool)
+    interpolated_frames[frame_indices] = True
+    return interpolated_frames
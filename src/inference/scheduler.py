@@ -0,0 +1,146 @@
+import hashlib
+import heapq
+import json
+import os
+import logging
+import statistics
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Per-frame time in seconds that is assumed for estimators without any inference time history.
+# The absolute value does not matter for the ordering, it only scales the predicted finish times.
+DEFAULT_SECONDS_PER_FRAME = 0.05
+
+
+@dataclass
+class InferenceJob:
+    estimator: object  # PoseEstimator
+    video: object  # VideoSample
+    num_frames: int
+    predicted_cost: float  # seconds
+    predicted_start: Optional[float] = None  # seconds after the start of the run
+    predicted_finish: Optional[float] = None  # seconds after the start of the run
+
+
+def estimate_video_frame_count(video) -> int:
+    """
+    Cheap frame count estimate used for scheduling.
+    Uses the frame count from the video metadata (see `Dataset.prescan`) or the video metadata cache if available,
+    otherwise the frame count from the container header, which does not require decoding the video but can be slightly inaccurate.
+    """
+    import utils  # imported here, utils imports the inference package
+
+    if video.metadata and video.metadata.get("frame_count"):
+        return int(video.metadata["frame_count"])
+    if not os.path.exists(video.path):
+        return 0
+    cached_metadata = utils.video_metadata_cache.peek(video.path)
+    if cached_metadata and cached_metadata.get("frame_count"):
+        return int(cached_metadata["frame_count"])
+
+    try:
+        return utils.read_video_header(video.path)["frame_count"]
+    except ValueError:
+        return 0
+
+
+def estimator_config_key(estimator) -> str:
+    """
+    Short hash of the estimator class and configuration. Inference times are only pooled for estimators with the same
+    key, e.g. a different frame stride, input size or batch size changes the time per frame.
+    """
+    configuration = json.dumps({"class": type(estimator).__name__, "config": estimator.config}, sort_keys=True, default=str)
+    return hashlib.sha1(configuration.encode("utf-8")).hexdigest()[:12]
+
+
+def estimate_seconds_per_frame(inference_time_records: List[dict], estimator_config_keys: Dict[str, str], video_frame_counts: Dict[str, int]) -> Dict[str, float]:
+    """
+    Estimate the average inference time per frame for every estimator from previous inference times.
+
+    Args:
+        inference_time_records: Records of the inference time logs (see `Checkpointer.load_inference_time_history`).
+            Records without a frame count use the frame count of the video in `video_frame_counts` if known.
+        estimator_config_keys: Dictionary mapping the names of the estimators to estimate the time for to their
+            configuration key (see `estimator_config_key`). Only records with the same name and key are used.
+        video_frame_counts: Dictionary mapping video names to frame counts.
+
+    Returns:
+        Dictionary mapping estimator names to seconds per frame. Estimators without history get the median
+        of the other estimators, or `DEFAULT_SECONDS_PER_FRAME` if there is no history at all.
+    """
+    total_times = {}
+    total_frames = {}
+    for record in inference_time_records:
+        estimator_name = record.get("estimator")
+        num_frames = record.get("num_frames") or video_frame_counts.get(record.get("video"))
+        if estimator_name not in estimator_config_keys or record.get("estimator_config") != estimator_config_keys[estimator_name]:
+            continue
+        if not num_frames or record.get("inference_time") is None:
+            continue
+        total_times[estimator_name] = total_times.get(estimator_name, 0.0) + record["inference_time"]
+        total_frames[estimator_name] = total_frames.get(estimator_name, 0) + num_frames
+
+    seconds_per_frame = {name: total_times[name] / total_frames[name] for name in total_times}
+    fallback = statistics.median(seconds_per_frame.values()) if seconds_per_frame else DEFAULT_SECONDS_PER_FRAME
+    return {name: seconds_per_frame.get(name, fallback) for name in estimator_config_keys}
+
+
+def order_longest_job_first(jobs: List[InferenceJob]) -> List[InferenceJob]:
+    """Sort jobs by predicted cost, longest first, which keeps long videos from delaying the end of the run."""
+    return sorted(jobs, key=lambda job: job.predicted_cost, reverse=True)
+
+
+def next_dispatchable_job(jobs: List[InferenceJob], running_videos: Dict[str, int], concurrency_limits: Dict[str, int]) -> Optional[int]:
+    """Index of the first job in `jobs` whose estimator is below its concurrency limit, or None."""
+    for job_idx, job in enumerate(jobs):
+        if running_videos[job.estimator.name] < concurrency_limits[job.estimator.name]:
+            return job_idx
+    return None
+
+
+def simulate_schedule(jobs: List[InferenceJob], concurrency_limits: Dict[str, int], max_workers: int) -> float:
+    """
+    Predict start and finish times of the jobs for the dispatch policy of the inference engine: whenever a worker is
+    free, the first job in the list whose estimator is below its concurrency limit is started.
+    The predicted times are written to the jobs.
+
+    Returns:
+        float: Predicted makespan of all jobs in seconds.
+    """
+    pending = list(jobs)
+    running = []  # heap of (predicted finish, sequence number, job)
+    running_videos = {name: 0 for name in concurrency_limits}
+    current_time = 0.0
+    sequence = 0
+
+    while pending or running:
+        while pending and len(running) < max_workers:
+            job_idx = next_dispatchable_job(pending, running_videos, concurrency_limits)
+            if job_idx is None:
+                break
+            job = pending.pop(job_idx)
+            job.predicted_start = current_time
+            job.predicted_finish = current_time + job.predicted_cost
+            running_videos[job.estimator.name] += 1
+            heapq.heappush(running, (job.predicted_finish, sequence, job))
+            sequence += 1
+
+        current_time, _, finished_job = heapq.heappop(running)
+        running_videos[finished_job.estimator.name] -= 1
+
+    return current_time
+
+
+def log_schedule(jobs: List[InferenceJob], seconds_per_frame: Dict[str, float], makespan: float):
+    lines = ["Inference schedule (longest job first):"]
+    for name, value in seconds_per_frame.items():
+        lines.append(f"  {name}: {value * 1000:.1f} ms/frame (estimated)")
+    for job_idx, job in enumerate(jobs):
+        lines.append(
+            f"  {job_idx + 1:>4}. {job.estimator.name} | {job.video.get_filename()} | {job.num_frames} frames | "
+            f"predicted {job.predicted_cost:.1f}s, start {job.predicted_start:.1f}s, finish {job.predicted_finish:.1f}s"
+        )
+    lines.append(f"  Predicted makespan: {makespan:.1f}s")
+    message = "\n".join(lines)
+    print(message)
+    logging.info(message)
@@ -1,3 +1,4 @@
+import numpy as np
 from mediapipe.python.solutions.pose import PoseLandmark
 
 # Depending on the source you look at, there are a different number of keypoints for COCO.
@@ -115,3 +116,35 @@ COCO_KEYPOINT_PAIRS = [
     (12, 6), (5, 6), (5, 7), (6, 8), (7, 9), (8, 10),
     (0, 1), (0, 2), (1, 3), (2, 4)
 ]
+
+
+# Keypoint formats that can be converted into each other. Every format is registered with its number of keypoints and
+# the index array of the COCO keypoints in that format, i.e. coco_keypoints = format_keypoints[coco_indices].
+# Conversions between two formats go through COCO (see get_keypoint_format_mapping and utils.convert_keypoint_format).
+KEYPOINT_FORMATS = {}
+
+def register_keypoint_format(format_name: str, num_keypoints: int, coco_indices: list):
+    coco_indices = np.array([int(idx) for idx in coco_indices], dtype=np.intp)
+    if len(coco_indices) != len(COCO_KEYPOINT_NAMES) or coco_indices.min() < 0 or coco_indices.max() >= num_keypoints:
+        raise ValueError(f"Invalid COCO indices for keypoint format {format_name}")
+    KEYPOINT_FORMATS[format_name] = (num_keypoints, coco_indices)
+
+register_keypoint_format("coco", len(COCO_KEYPOINT_NAMES), range(len(COCO_KEYPOINT_NAMES)))
+register_keypoint_format("mediapipe", len(PoseLandmark), COCO_TO_MEDIAPIPE)
+register_keypoint_format("openpose_body25", 25, COCO_TO_OPENPOSE_BODY25)
+register_keypoint_format("openpose_body25b", 25, COCO_TO_OPENPOSE_BODY25B)
+
+def get_keypoint_format_mapping(source_format: str, target_format: str = "coco") -> np.ndarray:
+    """
+    Index array that gathers the keypoints of the target format from the keypoints of the source format.
+    Keypoints of the target format that are not part of COCO (and therefore cannot be converted) have the index -1.
+    """
+    for format_name in (source_format, target_format):
+        if format_name not in KEYPOINT_FORMATS:
+            raise ValueError(f"Unknown keypoint format: {format_name}. Registered formats are: {list(KEYPOINT_FORMATS)}")
+
+    _, source_coco_indices = KEYPOINT_FORMATS[source_format]
+    num_target_keypoints, target_coco_indices = KEYPOINT_FORMATS[target_format]
+    mapping = np.full(num_target_keypoints, -1, dtype=np.intp)
+    mapping[target_coco_indices] = source_coco_indices
+    return mapping
@@ -6,6 +6,7 @@ import logging
 import datetime
 
 current_session = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(funcName)s:%(lineno)d - %(message)s'
 
 from datasets import Dataset
 from inference import InferenceEngine
@@ -15,6 +16,7 @@ from rendering import PoseRenderer
 from evaluation import Evaluator, MaskBenchVisualizer
 from evaluation.metrics import Metric
 from scripts.raw_masked_experiment import run_raw_masked_experiment
+import utils
 
 def main():
     config, config_file_path = load_config()
@@ -25,11 +27,24 @@ def main():
 
     checkpoint_name = config.get("inference_checkpoint_name", None)
     checkpoint_name = checkpoint_name if checkpoint_name != "None" else None
-    checkpointer = Checkpointer(dataset.name, checkpoint_name)
+    pose_file_format = config.get("pose_file_format", "json")
+    lazy_checkpoint_loading = config.get("lazy_checkpoint_loading", True)
+    pose_loading_workers = config.get("pose_loading_workers", None)
+    inference_time_history_checkpoints = config.get("inference_time_history_checkpoints", None)
+    checkpointer = Checkpointer(dataset.name, checkpoint_name, pose_file_format, lazy_checkpoint_loading, pose_loading_workers, inference_time_history_checkpoints)
     checkpointer.save_config(config_file_path)
 
     log_folder =  checkpointer.checkpoint_dir or "/output"
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(funcName)s:%(lineno)d - %(message)s', filename=f'{log_folder}/{current_session}_maskbench.log')
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, filename=f'{log_folder}/{current_session}_maskbench.log')
+
+    # only after the logging is configured, the first logging call would otherwise configure the root logger implicitly
+    video_metadata_cache_path = config.get("video_metadata_cache_path", None)
+    if video_metadata_cache_path is not None:
+        utils.video_metadata_cache.set_cache_path(video_metadata_cache_path)
+    if config.get("prefill_video_metadata", False):
+        utils.video_metadata_cache.fill([video.path for video in dataset], max_workers=config.get("video_metadata_workers", None))
+    if config.get("prescan_dataset", True):
+        dataset.prescan(max_workers=config.get("video_metadata_workers", None))
 
     pose_estimator_specifications = config.get("pose_estimators", [])
     pose_estimators = load_pose_estimators(pose_estimator_specifications)
@@ -43,13 +58,15 @@ def main():
     execute_rendering = config.get("execute_rendering", True)
     render_poses_only = config.get("render_poses_only", False)
     execute_processing = config.get("execute_processing", True)
+    shared_frame_decoding = config.get("shared_frame_decoding", False)
+    frame_queue_size = config.get("frame_queue_size", 16)
     
-    run(dataset, pose_estimators, metrics, checkpointer, execute_evaluation, execute_rendering, render_poses_only, execute_processing)
+    run(dataset, pose_estimators, metrics, checkpointer, execute_evaluation, execute_rendering, render_poses_only, execute_processing, shared_frame_decoding, frame_queue_size)
     print("Done")
 
 
-def run(dataset: Dataset, pose_estimators: List[PoseEstimator], metrics: List[Metric], checkpointer: Checkpointer, execute_evaluation: bool, execute_rendering: bool, render_poses_only: bool, execute_processing: bool):
-    inference_engine = InferenceEngine(dataset, pose_estimators, checkpointer, execute_processing)
+def run(dataset: Dataset, pose_estimators: List[PoseEstimator], metrics: List[Metric], checkpointer: Checkpointer, execute_evaluation: bool, execute_rendering: bool, render_poses_only: bool, execute_processing: bool, shared_frame_decoding: bool = False, frame_queue_size: int = 16):
+    inference_engine = InferenceEngine(dataset, pose_estimators, checkpointer, execute_processing, shared_frame_decoding, frame_queue_size)
     gt_pose_results = dataset.get_gt_pose_results()
     pose_results = inference_engine.run_parallel_tasks()
     
@@ -132,6 +149,7 @@ def load_pose_estimators(pose_estimator_specifications: dict) -> List[PoseEstima
             estimator_module = importlib.import_module(module_path)
             estimator_class = getattr(estimator_module, class_name)
             pose_estimator = estimator_class(estimator_name, estimator_config)
+            pose_estimator.specification = spec
             pose_estimators.append(pose_estimator)
         except (ImportError, AttributeError, TypeError) as e:
             print(f"Error instantiating pose estimator {estimator_name}: {e}")
@@ -1,19 +1,31 @@
-import requests
 import zipfile
 import json
 import io
 import os
 import utils
 import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable
+from api_client import ApiClient
 from models import PoseEstimator
-from video_chunker import VideoChunker
-from inference import VideoPoseResult
+from video_chunker import CHUNKING_BACKENDS, VideoChunk, VideoChunker
+from inference.chunk_result import ChunkResult, ChunkResultCollector
 from keypoint_pairs import *
 
 class MaskAnyoneApiPoseEstimator(PoseEstimator):
+    provides_confidences = False  # MaskAnyone does not provide confidence scores
+
     def __init__(self, name: str, config: dict):
         """
         Initialize the MaskAnyoneApiPoseEstimator with a name and configuration.
+        The chunks of a video are uploaded while the video is still being chunked, "max_inflight_chunks" (default 2) at the same time.
+        Requests are sent with a shared ApiClient, which can be configured with the optional config keys "max_inflight_requests"
+        (default max_concurrent_videos * max_inflight_chunks), "connect_timeout", "read_timeout", "max_retries" and "retry_backoff".
+        The optional config key "chunking_backend" selects how videos are chunked: "opencv" (default) re-encodes the video,
+        "ffmpeg" cuts it at keyframes without re-encoding (see `VideoChunker.iter_chunks_using_ffmpeg`).
+        The pose results of the chunks are kept in memory. With the optional config key "chunk_memory_budget_mb", results
+        that exceed the budget are spilled to disk until the chunks are combined (see `ChunkResultCollector`).
         """
         super().__init__(name, config)
         self.port = os.getenv("WORKER_PORT", 8000)
@@ -21,8 +33,18 @@ class MaskAnyoneApiPoseEstimator(PoseEstimator):
         self.docker_url = f"http://{self.host}:{self.port}/mask-video"
         self.options = utils.maskanyone_get_config(self.config)
         self.chunk_length = self.config.get("chunk_length", 120)  # default chunk length is 120 seconds
+        self.chunking_backend = self.config.get("chunking_backend", "opencv")
+        if self.chunking_backend not in CHUNKING_BACKENDS:
+            raise ValueError(f"Invalid chunking backend for {name}: {self.chunking_backend}. Valid options are: {CHUNKING_BACKENDS}")
+        self.max_inflight_chunks = max(1, int(self.config.get("max_inflight_chunks", 2)))  # chunks of a video uploaded at the same time
+        chunk_memory_budget_mb = self.config.get("chunk_memory_budget_mb")
+        self.chunk_memory_budget = None if chunk_memory_budget_mb is None else int(chunk_memory_budget_mb * 1024 * 1024)
         self.model_keypoint_pairs = {"mp_pose": MEDIAPIPE_KEYPOINT_PAIRS, "openpose_body25b": OPENPOSE_BODY25B_KEYPOINT_PAIRS, "openpose": OPENPOSE_BODY25_KEYPOINT_PAIRS}
-        self.model_to_coco_mapping = {"mp_pose": COCO_TO_MEDIAPIPE, "openpose_body25b": COCO_TO_OPENPOSE_BODY25B, "openpose": COCO_TO_OPENPOSE_BODY25}
+        self.keypoint_formats = {"mp_pose": "mediapipe", "openpose_body25b": "openpose_body25b", "openpose": "openpose_body25"}
+        self.api_client = ApiClient.from_config(name, config, default_max_inflight_requests=self.max_concurrent_videos * self.max_inflight_chunks)
+
+    def close(self):
+        self.api_client.close()
 
     def get_keypoint_pairs(self):
         if self.config.get("save_keypoints_in_coco_format", False):
@@ -33,6 +55,8 @@ class MaskAnyoneApiPoseEstimator(PoseEstimator):
     def estimate_pose(self, video_path: str) -> list:
         """
         Estimate the pose of a video using Mask Anyone Api estimation.
+        The video is split into chunks, which are uploaded while the next chunks are still being written
+        (see `_process_chunks`).
 
         Args:
             video_path (str): The path to the input video file.
@@ -43,63 +67,84 @@ class MaskAnyoneApiPoseEstimator(PoseEstimator):
         cap, video_metadata = utils.get_video_metadata(video_path)
         cap.release()  # release the video capture object as we only needed it to get the metadata, the actual processing will be done by the MaskAnyone API
 
-        chunk_output_dir = '/tmp/chunks' + f"_{os.path.basename(video_path)}" + f'_{self.options.get("overlay_strategy")}'
-        processed_output_dir = '/tmp/processed_chunks' + f"_{os.path.basename(video_path)}" + f'_{self.options.get("overlay_strategy")}'
-
-        print("MaskAnyoneAPI: Splitting video into chunks.")
-        video_chunk_paths = VideoChunker(chunk_length=self.chunk_length).chunk_video_using_opencv(video_path, chunk_output_dir)
-        print("MaskAnyoneAPI: Processing chunks.")
-        self._process_chunks(video_chunk_paths, processed_output_dir)
-        print("MaskAnyoneAPI: Combining chunk outputs into a single video result.")
-        frame_results = utils.maskanyone_combine_json_files(processed_output_dir, self.options.get("overlay_strategy"))
-        
-        video_pose_result = VideoPoseResult(
-            fps=video_metadata.get("fps"),
-            frame_width=video_metadata.get("width"),
-            frame_height=video_metadata.get("height"),
-            video_name=os.path.splitext(os.path.basename(video_path))[0],
-            frames=frame_results
-        )
-
-        # Clean up temporary output directory
-        shutil.rmtree(chunk_output_dir)
-        shutil.rmtree(processed_output_dir)
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        # a private directory per call, so that videos with the same name (or the same video with several strategies) never collide
+        chunk_output_dir = tempfile.mkdtemp(prefix=f"maskanyone_chunks_{video_name}_")
+
+        print("MaskAnyoneAPI: Splitting video into chunks and processing them.")
+        try:
+            with ChunkResultCollector(memory_budget=self.chunk_memory_budget) as chunk_results:
+                video_chunks = VideoChunker(chunk_length=self.chunk_length, backend=self.chunking_backend).iter_chunks(video_path, chunk_output_dir)
+                self._process_chunks(video_chunks, chunk_results)
+                video_pose_result = chunk_results.to_video_pose_result(
+                    fps=video_metadata.get("fps"),
+                    frame_width=video_metadata.get("width"),
+                    frame_height=video_metadata.get("height"),
+                    video_name=video_name,
+                )
+        finally:
+            shutil.rmtree(chunk_output_dir, ignore_errors=True)  # Clean up temporary output directory
 
         self.assert_frame_count_is_correct(video_pose_result, video_metadata)
-        video_pose_result = self.filter_low_confidence_keypoints(video_pose_result) # this call will have no effect, because MaskAnyone does not provide confidence scores
+        video_pose_result = self.filter_low_confidence_keypoints(video_pose_result) # this call returns immediately, because MaskAnyone does not provide confidence scores
         if self.config.get("save_keypoints_in_coco_format", False):
-            video_pose_result.frames = utils.convert_keypoints_to_coco_format(video_pose_result.frames, self.model_to_coco_mapping[self.config.get("overlay_strategy")])
+            video_pose_result = utils.convert_keypoint_format(video_pose_result, self.keypoint_formats[self.config.get("overlay_strategy")])
         return video_pose_result
 
-    def _process_chunks(self, video_chunks: list, output_dir: str):
-        os.makedirs(output_dir, exist_ok=True)  # we will store the chunk json files here
+    def _process_chunks(self, video_chunks: Iterable[VideoChunk], chunk_results: ChunkResultCollector):
+        """
+        Upload the chunks to the MaskAnyone API as soon as they are written, with up to `max_inflight_chunks` chunks
+        processed at the same time. The chunker waits while that many chunks are in flight, so that it does not
+        fill the disk ahead of the uploads. The result of every chunk is added to the collector when it completes.
+        If a chunk fails, the pending chunks are cancelled and the error is raised without waiting for the uploads
+        that are still in flight.
 
-        video_extension = os.path.splitext(video_chunks[0])[1]          
-        if video_extension == ".mp4":
-            mime_type = "video/mp4"
-        elif video_extension == ".avi":
-            mime_type = "video/x-msvideo"
-        else:
-            raise ValueError(f"Unsupported video format: {video_extension}. Supported formats are .mp4 and .avi.")
-
-        for _, chunk_path in enumerate(video_chunks):
-            with open(chunk_path, "rb") as f:
-                files = {'video': (os.path.basename(chunk_path), f, mime_type)}
-                data ={ "options": json.dumps(self.options) }
-
-                try:
-                    response = requests.post(self.docker_url, files=files, data=data)
-                    if response.status_code == 200:
-                        zip_content = io.BytesIO(response.content)
-                        with zipfile.ZipFile(zip_content, 'r') as zip_file:
-                            zip_file.extractall(output_dir)  # Extract to the 'output' directory
-                    else:
-                        print(f"Error: Received Response Status Code: {response.status_code}")
-                
-                except requests.exceptions.RequestException as e:
-                    print(f"Request Failed in MaskAnyone API for {chunk_path}: {e}")
-                except zipfile.BadZipFile as e:
-                    print(f"Bad Zip File in MaskAnyone API for {chunk_path}: {e}")
-                except OSError as e:
-                    print(f"OS Error in MaskAnyone API for {chunk_path}: {e}")
-    
+        Args:
+            video_chunks (Iterable[VideoChunk]): The chunks in order, e.g. from `VideoChunker.iter_chunks`.
+            chunk_results (ChunkResultCollector): Collector for the results of the chunks.
+        """
+        running = set()
+        executor = ThreadPoolExecutor(max_workers=self.max_inflight_chunks, thread_name_prefix=f"{self.name}-chunks")
+        try:
+            for video_chunk in video_chunks:
+                running.add(executor.submit(self._process_chunk, video_chunk))
+                if len(running) >= self.max_inflight_chunks:
+                    wait(running, return_when=FIRST_COMPLETED)
+                done = {future for future in running if future.done()}
+                running -= done
+                for future in done:
+                    chunk_results.add(future.result())  # raises the error of a failed chunk, which stops chunking
+
+            for future in running:
+                chunk_results.add(future.result())
+        except BaseException:
+            # leaving a with block would wait for all uploads in flight, the results are not needed anymore
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+    def _process_chunk(self, video_chunk: VideoChunk) -> ChunkResult:
+        """Upload a single chunk and parse the pose file of the response zip in memory."""
+        chunk_path = video_chunk.path
+        mime_type = "video/x-msvideo" if chunk_path.lower().endswith(".avi") else "video/mp4"  # stream copied chunks keep the container of the video
+        with open(chunk_path, "rb") as f:
+            files = {'video': (os.path.basename(chunk_path), f, mime_type)}
+            data = { "options": json.dumps(self.options) }
+            response = self.api_client.post(self.docker_url, files=files, data=data)
+
+        if response.status_code != 200:
+            raise ValueError(f"Error in MaskAnyone API for {chunk_path}: {response.status_code} - {response.text}")
+
+        with zipfile.ZipFile(io.BytesIO(response.content), 'r') as zip_file:
+            pose_file_names = [file_name for file_name in zip_file.namelist() if file_name.endswith(".json")]
+            if not pose_file_names:
+                raise ValueError(f"MaskAnyone API returned no pose file for {chunk_path}")
+            data = utils.maskanyone_load_pose_data(zip_file.read(pose_file_names[0]))
+
+        os.remove(chunk_path)  # the chunk is not needed anymore
+        pose_array, valid_mask, person_counts = utils.maskanyone_pose_data_to_arrays(data, self.options.get("overlay_strategy"))
+        if len(pose_array) != video_chunk.num_frames:
+            raise ValueError(f"MaskAnyone API returned {len(pose_array)} frames for {chunk_path}, which has {video_chunk.num_frames} frames")
+        return ChunkResult(video_chunk.chunk_index, video_chunk.start_frame, pose_array, valid_mask, person_counts)
@@ -5,6 +5,8 @@ from models import PoseEstimator
 from keypoint_pairs import *
 
 class MaskAnyoneUiPoseEstimator(PoseEstimator):
+    provides_confidences = False  # MaskAnyone does not provide confidence scores
+
     def __init__(self, name: str, config: dict):
         """
         Initialize the MaskAnyoneUiPoseEstimator with a name and configuration.
@@ -13,7 +15,7 @@ class MaskAnyoneUiPoseEstimator(PoseEstimator):
         self.dataset_poses_folder = self.config.get("dataset_poses_folder")
         self.options = utils.maskanyone_get_config(self.config)
         self.model_keypoint_pairs = {"mp_pose": MEDIAPIPE_KEYPOINT_PAIRS, "openpose_body25b": OPENPOSE_BODY25B_KEYPOINT_PAIRS, "openpose": OPENPOSE_BODY25_KEYPOINT_PAIRS}
-        self.model_to_coco_mapping = {"mp_pose": COCO_TO_MEDIAPIPE, "openpose_body25b": COCO_TO_OPENPOSE_BODY25B, "openpose": COCO_TO_OPENPOSE_BODY25}
+        self.keypoint_formats = {"mp_pose": "mediapipe", "openpose_body25b": "openpose_body25b", "openpose": "openpose_body25"}
 
     def get_keypoint_pairs(self):
         if self.config.get("save_keypoints_in_coco_format", False):
@@ -41,9 +43,9 @@ class MaskAnyoneUiPoseEstimator(PoseEstimator):
 
         overlay_strategy = self.config.get("overlay_strategy")
         if os.path.exists(json_path): # If it's a single JSON file, process it directly
-            frame_results = utils.maskanyone_convert_json_to_nested_arrays(json_path, overlay_strategy)
+            pose_array, valid_mask, person_counts = utils.maskanyone_read_pose_arrays(json_path, overlay_strategy)
         elif os.path.exists(dir_path) and os.path.isdir(dir_path): # If it's a directory containing JSON chunks, combine them
-            frame_results = utils.maskanyone_combine_json_files(dir_path, overlay_strategy)
+            pose_array, valid_mask, person_counts = utils.maskanyone_combine_json_files(dir_path, overlay_strategy)
         else:
             raise ValueError(f"Neither {dir_path} is a directory nor {json_path} is a file")
     
@@ -52,12 +54,14 @@ class MaskAnyoneUiPoseEstimator(PoseEstimator):
             frame_width=video_metadata.get("width"),
             frame_height=video_metadata.get("height"),
             video_name=video_name,
-            frames=frame_results
+            pose_array=pose_array,
+            valid_mask=valid_mask,
+            person_counts=person_counts,
         )
 
         self.assert_frame_count_is_correct(video_pose_result, video_metadata)
-        video_pose_result = self.filter_low_confidence_keypoints(video_pose_result) # this call will have no effect, because MaskAnyone does not provide confidence scores
+        video_pose_result = self.filter_low_confidence_keypoints(video_pose_result) # this call returns immediately, because MaskAnyone does not provide confidence scores
         if self.config.get("save_keypoints_in_coco_format", False):
-            video_pose_result.frames = utils.convert_keypoints_to_coco_format(video_pose_result.frames, self.model_to_coco_mapping[self.config.get("overlay_strategy")])
+            video_pose_result = utils.convert_keypoint_format(video_pose_result, self.keypoint_formats[self.config.get("overlay_strategy")])
         return video_pose_result
     
\ No newline at end of file
@@ -1,5 +1,10 @@
 import os
+import time
+import logging
 import utils
+from dataclasses import dataclass, field
+import numpy as np
+from typing import List, Optional
 import cv2
 import mediapipe as mp
 
@@ -10,9 +15,23 @@ from mediapipe.tasks.python.vision import (
     RunningMode,
 )
 
-from inference import FramePoseResult, PersonPoseResult, PoseKeypoint, VideoPoseResult
+from detector_pool import DetectorPool
+from inference import VideoPoseResult
+from inference.frame_scaler import VideoFrameScaler
 from models import PoseEstimator
-from keypoint_pairs import COCO_KEYPOINT_PAIRS, MEDIAPIPE_KEYPOINT_PAIRS, COCO_TO_MEDIAPIPE
+from keypoint_pairs import COCO_KEYPOINT_PAIRS, MEDIAPIPE_KEYPOINT_PAIRS
+
+@dataclass
+class MediaPipeVideoContext:
+    detector: PoseLandmarker
+    video_name: str
+    video_metadata: dict
+    frame_scaler: VideoFrameScaler
+    frame_keypoints: List[Optional[np.ndarray]] = field(default_factory=list)  # (persons, keypoints, 3) array per frame
+    detector_wait_time: float = 0.0  # time spent waiting for a detector of the pool, i.e. for a model to load
+    detector_load_time: float = 0.0  # time it took to load the detector, in the background unless the video waited for it
+    start_time: float = field(default_factory=time.perf_counter)
+
 
 class MediaPipePoseEstimator(PoseEstimator):
     def __init__(self, name: str, config: dict):
@@ -22,6 +41,9 @@ class MediaPipePoseEstimator(PoseEstimator):
             estimator_name (str): The name of the estimator (e.g. "mediapipe_pose").
             config (dict): Configuration dictionary for the estimator. It must contain the key "weights" with the path to the weights file relative to the weights folder, otherwise it uses 'pose_landmarker_lite.task'.
             It can also contain the key "max_num_poses" with the maximum number of poses to detect, otherwise it uses 3.
+            The estimator keeps a pool of "detector_pool_size" pre-loaded landmarkers (default "max_concurrent_videos", 1 in process execution mode),
+            every video checks out its own landmarker. Used landmarkers are replaced by new ones in the background,
+            because the timestamps and tracking state of a landmarker in VIDEO mode cannot be reset.
         """
 
         super().__init__(name, config)
@@ -50,6 +72,26 @@ class MediaPipePoseEstimator(PoseEstimator):
             num_poses=self.config.get("max_num_poses", 3)
         )
 
+        self.detector_pool = None
+        if self.execution_mode != "process":
+            self.load_model()
+
+    def load_model(self):
+        default_pool_size = 1 if self.execution_mode == "process" else self.max_concurrent_videos
+        self.detector_pool = DetectorPool(
+            lambda: PoseLandmarker.create_from_options(self.options),
+            size=self.config.get("detector_pool_size", default_pool_size),
+            name=f"{self.name} landmarker",
+        )
+        print(f"Loaded {self.detector_pool.size} {self.name} landmarkers in {self.detector_pool.total_load_time:.2f}s")
+
+    def close(self):
+        if self.detector_pool is not None:
+            self.detector_pool.close()
+            message = f"{self.name}: loaded {len(self.detector_pool.load_times)} landmarkers in {self.detector_pool.total_load_time:.2f}s in total"
+            print(message)
+            logging.info(message)
+
     def get_keypoint_pairs(self):
         if self.config.get("save_keypoints_in_coco_format", False):
             return COCO_KEYPOINT_PAIRS
@@ -65,62 +107,98 @@ class MediaPipePoseEstimator(PoseEstimator):
         Returns:
             VideoPoseResult: A standardized result object containing the pose estimation results for the video.
         """
-        self.detector = PoseLandmarker.create_from_options(self.options)
-
         cap, video_metadata = utils.get_video_metadata(video_path)
-        video_name = os.path.splitext(os.path.basename(video_path))[0]
-        width = video_metadata.get("width")
-        height = video_metadata.get("height")
+        video_context = self.start_video(video_path, video_metadata)
         fps = video_metadata.get("fps")
 
         frame_number = 0
-        frame_results = []
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            result = self._execute_on_frame(frame, frame_number, fps)
-
-            if not result.pose_landmarks:
-                frame_results.append(FramePoseResult(persons=[], frame_idx=frame_number))
-            else:
-                persons = []
-                for person_landmarks in result.pose_landmarks:
-                    keypoints = []
-
-                    for lm in person_landmarks:
-                        if not (0 <= lm.x <= 1 and 0 <= lm.y <= 1): # for undetected keypoints, x and y can be outside the range [0, 1]
-                            keypoints.append(PoseKeypoint(x=0, y=0, confidence=None)) # standardized handling of missing keypoints by setting x and y to 0
-                            continue
-
-                        x = lm.x * width # convert normalized landmarks to image coordinates
-                        y = lm.y * height
-                        keypoints.append(PoseKeypoint(x=x, y=y, confidence=lm.visibility))
-
-                    persons.append(PersonPoseResult(keypoints=keypoints))
-
-                frame_results.append(FramePoseResult(persons=persons, frame_idx=frame_number))
-            frame_number += 1
-
-        cap.release()
-        self.detector.close()
-
-        video_pose_result = VideoPoseResult(
-            fps=fps,
-            frame_width=width,
-            frame_height=height,
-            frames=frame_results,
+        try:
+            while cap.isOpened():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self.process_frame(video_context, frame, frame_number, frame_number / fps)
+                frame_number += 1
+        except Exception:
+            self.abort_video(video_context)
+            raise
+        finally:
+            cap.release()
+        return self.finish_video(video_context)
+
+    def start_video(self, video_path: str, video_metadata: dict) -> MediaPipeVideoContext:
+        checkout_start_time = time.perf_counter()
+        detector = self.detector_pool.checkout() # one detector per video, so that videos can be processed concurrently
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        return MediaPipeVideoContext(
+            detector=detector,
             video_name=video_name,
+            video_metadata=video_metadata,
+            frame_scaler=self.frame_scaler.for_video(video_metadata.get("width"), video_metadata.get("height")),
+            detector_wait_time=time.perf_counter() - checkout_start_time,
+            detector_load_time=self.detector_pool.get_load_time(detector),
+        )
+
+    def process_frame(self, video_context: MediaPipeVideoContext, frame, frame_idx: int, timestamp: float):
+        width = video_context.video_metadata.get("width")
+        height = video_context.video_metadata.get("height")
+        frame = video_context.frame_scaler.resize(frame)  # landmarks are normalized, so no rescaling is needed
+        result = self._execute_on_frame(video_context.detector, frame, frame_idx, video_context.video_metadata.get("fps"))
+
+        if not result.pose_landmarks:
+            video_context.frame_keypoints.append(None)
+            return
+
+        landmarks = np.array([
+            [(lm.x, lm.y, np.nan if lm.visibility is None else lm.visibility) for lm in person_landmarks]
+            for person_landmarks in result.pose_landmarks
+        ])  # shape: (persons, keypoints, 3) with normalized coordinates
+        is_undetected = np.any((landmarks[..., :2] < 0) | (landmarks[..., :2] > 1), axis=-1) # for undetected keypoints, x and y can be outside the range [0, 1]
+        landmarks[..., 0] *= width # convert normalized landmarks to image coordinates
+        landmarks[..., 1] *= height
+        landmarks[is_undetected] = (0, 0, np.nan) # standardized handling of missing keypoints by setting x and y to 0
+        video_context.frame_keypoints.append(landmarks)
+
+    def finish_video(self, video_context: MediaPipeVideoContext) -> VideoPoseResult:
+        self._release_detector(video_context)
+        self._report_frame_time(video_context)
+        video_metadata = video_context.video_metadata
+
+        video_pose_result = VideoPoseResult.from_frame_keypoints(
+            video_context.frame_keypoints,
+            fps=video_metadata.get("fps"),
+            frame_width=video_metadata.get("width"),
+            frame_height=video_metadata.get("height"),
+            video_name=video_context.video_name,
         )
 
         self.assert_frame_count_is_correct(video_pose_result, video_metadata)
         video_pose_result = self.filter_low_confidence_keypoints(video_pose_result)
         if self.config.get("save_keypoints_in_coco_format", False):
-            video_pose_result.frames = utils.convert_keypoints_to_coco_format(video_pose_result.frames, COCO_TO_MEDIAPIPE)
+            video_pose_result = utils.convert_keypoint_format(video_pose_result, "mediapipe")
         return video_pose_result
 
-    def _execute_on_frame(self, frame, frame_number: int, fps: int):
+    def abort_video(self, video_context: MediaPipeVideoContext):
+        self._release_detector(video_context)
+
+    def _release_detector(self, video_context: MediaPipeVideoContext):
+        if video_context.detector is not None:
+            self.detector_pool.checkin(video_context.detector)
+            video_context.detector = None
+
+    def _report_frame_time(self, video_context: MediaPipeVideoContext):
+        # the model load time is excluded, it is reported when the detector pool is created
+        num_frames = len(video_context.frame_keypoints)
+        frame_time = time.perf_counter() - video_context.start_time - video_context.detector_wait_time
+        message = (
+            f"{self.name} on {video_context.video_name}: {video_context.frame_scaler.describe_timing(frame_time, num_frames)}, "
+            f"waited {video_context.detector_wait_time:.2f}s for a landmarker (loaded in {video_context.detector_load_time:.2f}s)"
+        )
+        print(message)
+        logging.info(message)
+
+    def _execute_on_frame(self, detector: PoseLandmarker, frame, frame_number: int, fps: int):
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb)
         timestamp = int(((frame_number + 1) * 1_000_000 / fps))
-        return self.detector.detect_for_video(mp_image, timestamp)
+        return detector.detect_for_video(mp_image, timestamp)
@@ -3,17 +3,19 @@ import json
 import os
 import pickle
 
-import requests
 import utils
-from inference import FramePoseResult, PersonPoseResult, PoseKeypoint, VideoPoseResult
+from api_client import ApiClient
+from inference import VideoPoseResult
 from models import PoseEstimator
-from keypoint_pairs import COCO_KEYPOINT_PAIRS, COCO_TO_OPENPOSE_BODY25, OPENPOSE_BODY25B_KEYPOINT_PAIRS, COCO_TO_OPENPOSE_BODY25B, OPENPOSE_BODY25_KEYPOINT_PAIRS
+from keypoint_pairs import COCO_KEYPOINT_PAIRS, OPENPOSE_BODY25B_KEYPOINT_PAIRS, OPENPOSE_BODY25_KEYPOINT_PAIRS
 class OpenPoseEstimator(PoseEstimator):
     def __init__(self, name: str, config: dict):
         """
         Initialize the OpenPoseEstimator with a name and configuration.
         The config parameter 'overlay_strategy' must be one of 'BODY_25' or 'BODY_25B'.
         If no 'overlay_strategy' is provided in config, default is 'BODY_25B'.
+        Requests are sent with a shared ApiClient, which can be configured with the optional config keys "max_inflight_requests"
+        (default max_concurrent_videos), "connect_timeout", "read_timeout", "max_retries" and "retry_backoff".
         """
         super().__init__(name, config)
         self.overlay_strategy = config.get("overlay_strategy", "BODY_25B")
@@ -21,7 +23,11 @@ class OpenPoseEstimator(PoseEstimator):
             raise ValueError(f"Invalid overlay strategy: {self.overlay_strategy}")
 
         self.model_keypoint_pairs = {"BODY_25": OPENPOSE_BODY25_KEYPOINT_PAIRS, "BODY_25B": OPENPOSE_BODY25B_KEYPOINT_PAIRS}
-        self.model_to_coco_mapping = {"BODY_25": COCO_TO_OPENPOSE_BODY25, "BODY_25B": COCO_TO_OPENPOSE_BODY25B}
+        self.keypoint_formats = {"BODY_25": "openpose_body25", "BODY_25B": "openpose_body25b"}
+        self.api_client = ApiClient.from_config(name, config, default_max_inflight_requests=self.max_concurrent_videos)
+
+    def close(self):
+        self.api_client.close()
 
     def get_keypoint_pairs(self):
         if self.config.get("save_keypoints_in_coco_format", False):
@@ -64,7 +70,7 @@ class OpenPoseEstimator(PoseEstimator):
             files = {"video": (f"video{extension}", f, mime_type)}
             frame = {"options": json.dumps(options)}
 
-            response = requests.post(url, files=files, data=frame)
+            response = self.api_client.post(url, files=files, data=frame)
             if response.status_code == 200:
                 buffer = io.BytesIO(response.content)
                 pose_data = pickle.load(buffer)
@@ -77,24 +83,13 @@ class OpenPoseEstimator(PoseEstimator):
     def _convert_to_video_pose_result(
         self, pose_data, video_metadata: dict, video_name: str
     ) -> VideoPoseResult:
-        frame_results = []
-        for idx, frame in enumerate(pose_data):  # every frame
-            if frame and frame.get("pose_keypoints").size > 0:  # if data from frame or a pose detected
-                person_keypoints = []
-                for person in frame.get("pose_keypoints"):
-                    keypoints = []
-                    for kp in person:
-                        if kp[0] == 0 and kp[1] == 0:
-                            keypoints.append(PoseKeypoint(x=0, y=0, confidence=None))
-                        else:
-                            keypoints.append(PoseKeypoint(x=kp[0], y=kp[1], confidence=kp[2]))
-                    person_keypoints.append(PersonPoseResult(keypoints=keypoints))
-                frame_results.append(FramePoseResult(persons=person_keypoints, frame_idx=idx))
-            else:
-                frame_results.append(FramePoseResult(persons=[], frame_idx=idx))
+        frame_keypoints = [
+            frame.get("pose_keypoints") if frame and frame.get("pose_keypoints").size > 0 else None  # if data from frame or a pose detected
+            for frame in pose_data
+        ]
 
-        video_pose_result = VideoPoseResult(
-            frames=frame_results,
+        video_pose_result = VideoPoseResult.from_frame_keypoints(
+            frame_keypoints,
             frame_width=video_metadata.get("width"),
             frame_height=video_metadata.get("height"),
             fps=video_metadata.get("fps"),
@@ -104,5 +99,5 @@ class OpenPoseEstimator(PoseEstimator):
         self.assert_frame_count_is_correct(video_pose_result, video_metadata)
         video_pose_result = self.filter_low_confidence_keypoints(video_pose_result)
         if self.config.get("save_keypoints_in_coco_format", False):
-            video_pose_result.frames = utils.convert_keypoints_to_coco_format(video_pose_result.frames, self.model_to_coco_mapping[self.overlay_strategy])
+            video_pose_result = utils.convert_keypoint_format(video_pose_result, self.keypoint_formats[self.overlay_strategy])
         return video_pose_result
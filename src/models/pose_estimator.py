@@ -1,10 +1,17 @@
 from abc import ABC, abstractmethod
 import cv2
+import numpy as np
 
+from inference.frame_scaler import FrameScaler
 from inference.pose_result import VideoPoseResult
 
+EXECUTION_MODES = ["thread", "process"]
+
 
 class PoseEstimator(ABC):
+    # Estimators without confidence scores (e.g. MaskAnyone) set this to False to skip the confidence filter
+    provides_confidences = True
+
     def __init__(self, name: str, config: dict):
         """
         Initialize the PoseEstimator with a name and configuration.
@@ -12,6 +19,10 @@ class PoseEstimator(ABC):
         Args:
             name (str): The name of the estimator (e.g. "YoloPose", "MediaPipe", "OpenPose", ...).
             config (dict): Configuration dictionary for the pose estimator. This can include arbitrary parameters for the model that are necessary for inference (e.g. "confidence_threshold", "weights_file_name", ...). The config parameter "confidence_threshold" is required. This has no effect for MaskAnyonePoseEstimators, because they do not provide confidence scores. If you do not want to filter, set confidence_threshold to 0.
+                The optional config parameter "max_concurrent_videos" (default 1) sets how many videos the inference engine processes with this estimator at the same time. Only increase it for estimators whose estimate_pose method is thread-safe (e.g. CPU-bound or HTTP-bound estimators).
+                The optional config parameter "execution_mode" is either "thread" (default) or "process". In process mode, the inference engine runs the estimator in "max_concurrent_videos" worker processes, which avoids the GIL for CPU-bound estimators (e.g. MediaPipe).
+                The optional config parameter "frame_stride" (default 1) runs the estimator only on every n-th frame. The inference engine interpolates the poses of the frames in between and marks them as interpolated in the VideoPoseResult (see inference.frame_stride).
+                The optional config parameters "input_max_side" (maximum side length in pixels) or "input_scale" (scale factor) downscale the frames before they are passed to the model. The keypoints are mapped back to the original frame size. Only supported by estimators that process decoded frames (YOLO, MediaPipe).
         """
         if not config or "confidence_threshold" not in config:
             raise ValueError(f"Config for {name} must include a 'confidence_threshold' key.")
@@ -19,6 +30,31 @@ class PoseEstimator(ABC):
         self.name = name
         self.config = config
         self.confidence_threshold = config["confidence_threshold"]
+        self.max_concurrent_videos = config.get("max_concurrent_videos", 1)
+        self.execution_mode = config.get("execution_mode", "thread")
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Invalid execution mode for {name}: {self.execution_mode}. Valid options are: {EXECUTION_MODES}")
+        self.frame_stride = int(config.get("frame_stride", 1))
+        if self.frame_stride < 1:
+            raise ValueError(f"Invalid frame stride for {name}: {self.frame_stride}. The frame stride must be at least 1.")
+        self.frame_scaler = FrameScaler.from_config(config)
+        self.specification = None  # set by main.load_pose_estimators, used to rebuild the estimator in worker processes
+
+    def load_model(self):
+        """
+        Optional hook to load the model of the estimator. Estimators with expensive models (e.g. YOLO, MediaPipe) load
+        them here and call this method at the end of __init__, unless the execution mode is "process". Then the model
+        is only loaded in the worker processes of the inference engine (see InferenceEngine.start_process_pools) and
+        not in the main process, which never runs the estimator.
+        """
+        pass
+
+    def close(self):
+        """
+        Optional hook to release the resources of the estimator (e.g. loaded models and their background threads).
+        Called by the inference engine once all videos are processed, the estimator must not be used afterwards.
+        """
+        pass
 
     @abstractmethod
     def estimate_pose(self, video_path: str) -> VideoPoseResult:
@@ -29,7 +65,7 @@ class PoseEstimator(ABC):
         The user is responsible for the following three steps after creating the initial VideoPoseResult object:
         1. Assert that the number of frames in the frame results matches the number of frames in the video (call assert_frame_count_is_correct)
         2. Filter out low confidence keypoints (call filter_low_confidence_keypoints)
-        3. If the config contains a "save_keypoints_in_coco_format" key, convert the keypoints to the COCO format (call utils.convert_keypoints_to_coco_format, providing a mapping from the model output format to the COCO format)
+        3. If the config contains a "save_keypoints_in_coco_format" key, convert the keypoints to the COCO format (call utils.convert_keypoint_format with the name of the model output format registered in keypoint_pairs.py)
 
         Args:
             video_path (str): The full path to the input video file.
@@ -41,6 +77,50 @@ class PoseEstimator(ABC):
         """
         pass
 
+    def supports_frame_processing(self) -> bool:
+        """Whether the estimator implements the optional per-frame API (start_video, process_frame, finish_video)."""
+        return type(self).process_frame is not PoseEstimator.process_frame
+
+    def start_video(self, video_path: str, video_metadata: dict):
+        """
+        Optional per-frame API, which allows the inference engine to decode a video once and share the frames between
+        estimators. Prepares the estimation of a single video and returns a video context object that holds all state
+        of this video (e.g. the model instance or tracker and the frame results), so that several videos can be processed at the same time.
+
+        Args:
+            video_path (str): The full path to the input video file.
+            video_metadata (dict): Metadata with the keys "width", "height" and "fps". The key "frame_count" is only set
+                once all frames are decoded, i.e. when finish_video is called.
+        """
+        raise NotImplementedError(f"{self.name} does not support frame processing.")
+
+    def process_frame(self, video_context, frame, frame_idx: int, timestamp: float):
+        """
+        Optional per-frame API. Estimates the poses of a single BGR frame and stores the result in the video context.
+        Frames are passed in order and are shared with other estimators, so they must not be modified in place.
+
+        Args:
+            video_context: The object returned by start_video.
+            frame (np.ndarray): The decoded BGR frame.
+            frame_idx (int): Index of the frame in the video.
+            timestamp (float): Time of the frame in seconds.
+        """
+        raise NotImplementedError(f"{self.name} does not support frame processing.")
+
+    def finish_video(self, video_context) -> VideoPoseResult:
+        """
+        Optional per-frame API. Releases the resources of the video context and returns the result of the video,
+        with the same post-processing steps as estimate_pose (frame count assertion, confidence filtering, COCO conversion).
+        """
+        raise NotImplementedError(f"{self.name} does not support frame processing.")
+
+    def abort_video(self, video_context):
+        """
+        Optional per-frame API. Releases the resources of a video context whose estimation failed. It may be called after
+        a failed finish_video, so it must not release resources twice.
+        """
+        pass
+
     @abstractmethod
     def get_keypoint_pairs(self) -> list:
         """
@@ -66,15 +146,21 @@ class PoseEstimator(ABC):
         Raises:
             Exception: If the number of frames in the frame results does not match the number of frames in the video.
         """
-        if len(video_pose_result.frames) != video_metadata.get("frame_count"):
-            raise Exception(f"Number of frames in the video ({video_metadata.get('frame_count')}) does not match the number of frames in the frame results ({len(video_pose_result.frames)})")
+        if video_pose_result.num_frames != video_metadata.get("frame_count"):
+            raise Exception(f"Number of frames in the video ({video_metadata.get('frame_count')}) does not match the number of frames in the frame results ({video_pose_result.num_frames})")
 
     def filter_low_confidence_keypoints(self, video_pose_result: VideoPoseResult):
-        for frame_result in video_pose_result.frames:
-            for person_result in frame_result.persons:
-                for keypoint in person_result.keypoints:
-                    if keypoint.confidence is not None and keypoint.confidence < self.confidence_threshold:
-                        keypoint.x = 0
-                        keypoint.y = 0
-                        keypoint.confidence = None
-        return video_pose_result
\ No newline at end of file
+        """
+        Mark keypoints with a confidence below the confidence threshold as undetected (x=0, y=0, confidence=None).
+        The filter runs as a single vectorized pass over the pose array of the whole video. It is skipped entirely if
+        the threshold is 0 or the estimator does not provide confidence scores (see `provides_confidences`).
+        """
+        if self.confidence_threshold <= 0 or not self.provides_confidences:
+            return video_pose_result
+
+        pose_array = video_pose_result.pose_array
+        is_low_confidence = pose_array[..., 2] < self.confidence_threshold  # missing confidences (NaN) are never low
+        if is_low_confidence.any():
+            pose_array[is_low_confidence] = (0, 0, np.nan)
+            video_pose_result.invalidate_cache()
+        return video_pose_result
@@ -1,12 +1,31 @@
 import os
+import time
+import logging
 import torch
 import utils
+from dataclasses import dataclass, field
+import math
+import numpy as np
+from typing import List, Optional
 from ultralytics import YOLO
 
 from models import PoseEstimator
-from inference import FramePoseResult, PersonPoseResult, PoseKeypoint, VideoPoseResult
+from inference import VideoPoseResult
+from inference.frame_scaler import VideoFrameScaler
+from inference.person_tracker import PersonTracker
 from keypoint_pairs import COCO_KEYPOINT_PAIRS
 
+@dataclass
+class YoloVideoContext:
+    video_name: str
+    video_metadata: dict
+    frame_scaler: VideoFrameScaler
+    frame_keypoints: List[np.ndarray] = field(default_factory=list)  # (persons, keypoints, 3) array per frame
+    pending_frames: list = field(default_factory=list)  # frames waiting for the next batch
+    person_tracker: Optional[PersonTracker] = None  # only used for batched inference
+    start_time: float = field(default_factory=time.perf_counter)
+
+
 class YoloPoseEstimator(PoseEstimator):
     def __init__(self, name: str, config: dict):
         """
@@ -14,9 +33,19 @@ class YoloPoseEstimator(PoseEstimator):
         Args:
             name (str): The name of the model (e.g. "YoloPose").
             config (dict): Configuration dictionary for the model. It must contain the key "weights" with the path to the weights file relative to the weights folder, otherwise it uses 'yolo11n-pose.pt'.
+            The model keeps tracker state between frames, therefore "max_concurrent_videos" must stay 1 for this estimator.
+            With "batch_size" greater than 1 (default 1), frames are predicted in batches without the Ultralytics tracker.
+            Persons are then associated across frames by MaskBench (see PersonTracker), a person may move at most
+            "tracking_max_distance" (default 0.1) times the frame diagonal between two frames.
+            With input scaling ("input_max_side" or "input_scale"), the frames are decoded and downscaled by MaskBench before they are passed to the model.
         """
 
         super().__init__(name, config)
+        if self.max_concurrent_videos > 1:
+            print(f"Warning: {name} does not support concurrent videos, because the tracker state is shared. Setting max_concurrent_videos to 1.")
+            self.max_concurrent_videos = 1
+        self.batch_size = max(1, int(self.config.get("batch_size", 1)))
+        self.tracking_max_distance = self.config.get("tracking_max_distance", 0.1)
 
         weights_file = self.config.get("weights", "yolo11n-pose.pt")
         print("Using weights file: ", weights_file)
@@ -31,8 +60,14 @@ class YoloPoseEstimator(PoseEstimator):
             raise ValueError(
                 f"Could not find weights file {weights_file}. Please download the weights from https://docs.ultralytics.com/tasks/pose/ and place them in the weights folder."
             )
+        self.weights_file_path = weights_file_path
+
+        self.model = None
+        if self.execution_mode != "process":
+            self.load_model()
 
-        self.model = YOLO(weights_file_path)
+    def load_model(self):
+        self.model = YOLO(self.weights_file_path)
         # only for dev
         device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model.to(device)
@@ -52,53 +87,104 @@ class YoloPoseEstimator(PoseEstimator):
         """
 
         cap, video_metadata = utils.get_video_metadata(video_path)
-        video_name = os.path.splitext(os.path.basename(video_path))[0]
-        cap.release()
+        video_context = self.start_video(video_path, video_metadata)
+
+        if self.batch_size > 1 or self.frame_scaler.enabled:
+            fps = video_metadata.get("fps")
+            frame_idx = 0
+            while cap.isOpened():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self.process_frame(video_context, frame, frame_idx, frame_idx / fps if fps > 0 else 0.0)
+                frame_idx += 1
+            cap.release()
+            return self.finish_video(video_context)
 
+        cap.release()
         results = self.model.track(
-            video_path, conf=self.confidence_threshold, stream=True, verbose=False
+            video_path, conf=self.confidence_threshold, stream=True, persist=True, verbose=False
         )
+        for frame_result in results:
+            video_context.frame_keypoints.append(self._get_frame_keypoints(frame_result))
+
+        return self.finish_video(video_context)
 
-        frame_results = []
-        for frame_idx, frame_result in enumerate(results):
-            if not frame_result.keypoints:  # if no keypoints detected
-                frame_results.append(FramePoseResult(persons=[], frame_idx=frame_idx))
-                continue
-
-            xys = frame_result.keypoints.xy.cpu().numpy()
-            confidences = frame_result.keypoints.conf
-
-            if xys.size == 0: # if no persons detected
-                frame_results.append(FramePoseResult(persons=[], frame_idx=frame_idx))
-                continue
-
-            persons = []
-            num_persons = frame_result.keypoints.shape[0]
-            num_keypoints = frame_result.keypoints.shape[1]
-
-            for i in range(num_persons):
-                keypoints = []
-                for j in range(num_keypoints):
-                    conf = float(confidences[i, j]) if (confidences is not None) and (xys[i, j, 0] != 0 and xys[i, j, 1] != 0) else None
-                    kp = PoseKeypoint(
-                        x=float(xys[i, j, 0]),
-                        y=float(xys[i, j, 1]),
-                        confidence=conf,
-                    )
-
-                    keypoints.append(kp)
-                persons.append(PersonPoseResult(keypoints=keypoints))
-            frame_results.append(FramePoseResult(persons=persons, frame_idx=frame_idx))
-
-        video_pose_result = VideoPoseResult(
+    def start_video(self, video_path: str, video_metadata: dict) -> YoloVideoContext:
+        video_name = os.path.splitext(os.path.basename(video_path))[0]
+        # a batch keeps up to batch_size scaled frames until it is predicted
+        frame_scaler = self.frame_scaler.for_video(video_metadata.get("width"), video_metadata.get("height"), num_buffers=self.batch_size)
+        if self.batch_size > 1:
+            frame_diagonal = math.hypot(video_metadata.get("width"), video_metadata.get("height"))
+            person_tracker = PersonTracker(max_distance=self.tracking_max_distance * frame_diagonal)
+            return YoloVideoContext(video_name=video_name, video_metadata=video_metadata, frame_scaler=frame_scaler, person_tracker=person_tracker)
+
+        self._reset_tracker()
+        return YoloVideoContext(video_name=video_name, video_metadata=video_metadata, frame_scaler=frame_scaler)
+
+    def process_frame(self, video_context: YoloVideoContext, frame, frame_idx: int, timestamp: float):
+        frame = video_context.frame_scaler.resize(frame)
+        if self.batch_size > 1:
+            video_context.pending_frames.append(frame)
+            if len(video_context.pending_frames) >= self.batch_size:
+                self._predict_batch(video_context)
+            return
+
+        frame_result = self.model.track(frame, conf=self.confidence_threshold, persist=True, verbose=False)[0]
+        video_context.frame_keypoints.append(video_context.frame_scaler.to_original_coordinates(self._get_frame_keypoints(frame_result)))
+
+    def _predict_batch(self, video_context: YoloVideoContext):
+        results = self.model.predict(video_context.pending_frames, conf=self.confidence_threshold, verbose=False)
+        video_context.pending_frames = []
+        for frame_result in results:
+            frame_keypoints = video_context.frame_scaler.to_original_coordinates(self._get_frame_keypoints(frame_result))
+            frame_keypoints, _ = video_context.person_tracker.update(frame_keypoints)
+            video_context.frame_keypoints.append(frame_keypoints)
+
+    def finish_video(self, video_context: YoloVideoContext) -> VideoPoseResult:
+        if video_context.pending_frames:
+            self._predict_batch(video_context)
+
+        num_frames = len(video_context.frame_keypoints)
+        message = f"{self.name} on {video_context.video_name}: {video_context.frame_scaler.describe_timing(time.perf_counter() - video_context.start_time, num_frames)}"
+        print(message)
+        logging.info(message)
+
+        video_metadata = video_context.video_metadata
+        video_pose_result = VideoPoseResult.from_frame_keypoints(
+            video_context.frame_keypoints,
             fps=video_metadata.get("fps"),
             frame_width=video_metadata.get("width"),
             frame_height=video_metadata.get("height"),
-            frames=frame_results,
-            video_name=video_name,
+            video_name=video_context.video_name,
         )
 
         self.assert_frame_count_is_correct(video_pose_result, video_metadata)
         video_pose_result = self.filter_low_confidence_keypoints(video_pose_result)
         # we do not convert keypoints to coco format, because yolo already stores keypoints in coco format
         return video_pose_result
+
+    def _reset_tracker(self):
+        # The tracker is always called with persist=True and reset at the start of every video. Ultralytics fixes the
+        # persist argument at the first call, so mixing per-video and per-frame tracking would otherwise break tracking.
+        predictor = self.model.predictor
+        if predictor is not None and hasattr(predictor, "trackers"):
+            for tracker in predictor.trackers:
+                tracker.reset()
+
+    def _get_frame_keypoints(self, frame_result) -> np.ndarray:
+        """Keypoints of a frame as array of shape (persons, keypoints, 3) with x, y and confidence."""
+        if not frame_result.keypoints:  # if no keypoints detected
+            return np.empty((0, 0, 3), dtype=np.float32)
+
+        xys = frame_result.keypoints.xy.cpu().numpy()
+        if xys.size == 0: # if no persons detected
+            return np.empty((0, 0, 3), dtype=np.float32)
+
+        confidences = frame_result.keypoints.conf
+        if confidences is not None:
+            confidences = confidences.cpu().numpy().astype(np.float32)
+        else:
+            confidences = np.full(xys.shape[:2], np.nan, dtype=np.float32)
+        confidences[(xys[..., 0] == 0) | (xys[..., 1] == 0)] = np.nan  # keypoints on the image border are not detected
+        return np.concatenate([xys, confidences[..., np.newaxis]], axis=-1)
@@ -6,7 +6,7 @@ import numpy as np
 import multiprocessing as mp
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from inference import FramePoseResult, VideoPoseResult
+from inference import VideoPoseResult
 from datasets import Dataset, VideoSample
 from checkpointer import Checkpointer
 from utils import get_color_palette, get_video_metadata
@@ -100,10 +100,13 @@ class PoseRenderer:
 
             for idx, (estimator_name, writer) in enumerate(video_writers):  # for every model
                 try:
-                    frame_keypoints = video_pose_results[estimator_name].frames[frame_number]
+                    video_pose_result = video_pose_results[estimator_name]
+                    frame_poses = video_pose_result.pose_array[frame_number]
+                    frame_valid_mask = video_pose_result.valid_mask[frame_number]
                     frame_copies[idx] = self.draw_keypoints(
                         frame_copies[idx],
-                        frame_keypoints,
+                        frame_poses,
+                        frame_valid_mask,
                         self.estimators_point_pairs[estimator_name],
                         self.hex_to_bgr(color_palette[idx]),
                     )  # draw keypoints on frame
@@ -113,8 +116,8 @@ class PoseRenderer:
                     logging.error(f"No pose results for estimator {estimator_name} in video {video_name}")
                     writer.write(np.zeros_like(frame))  # write blank frame if exception occurs
                 except IndexError as e:
-                    print(f"{frame_number} is not in list, length of list is {len(video_pose_results[estimator_name].frames)}")
-                    logging.error(f"Video: {video_name}, Estimator Name: {estimator_name}, frame {frame_number} is not in list, length of list is {len(video_pose_results[estimator_name].frames)}")                  
+                    print(f"{frame_number} is not in list, length of list is {video_pose_results[estimator_name].num_frames}")
+                    logging.error(f"Video: {video_name}, Estimator Name: {estimator_name}, frame {frame_number} is not in list, length of list is {video_pose_results[estimator_name].num_frames}")                  
                     writer.write(np.zeros_like(frame))  # write blank frame if exception occurs
             
             frame_number += 1
@@ -124,35 +127,35 @@ class PoseRenderer:
             self.checkpointer.save_rendered_video(video_name, estimator_name, writer)
 
     def draw_keypoints(
-        self, frame, frame_pose_result: FramePoseResult, point_pairs, color
+        self, frame, frame_poses: np.ndarray, frame_valid_mask: np.ndarray, point_pairs, color
     ):
-        """Draw keypoints and join keypoint pairs on 1 frame"""
-        if not frame_pose_result.persons:  # if this frame has no keypoints
+        """
+        Draw keypoints and join keypoint pairs on 1 frame.
+        frame_poses has shape (persons, keypoints, 3) and frame_valid_mask has shape (persons, keypoints),
+        as stored in `VideoPoseResult.pose_array` and `VideoPoseResult.valid_mask` for a single frame.
+        """
+        if not frame_valid_mask.any():  # if this frame has no keypoints
             return frame
 
-        for person in frame_pose_result.persons:
-            if not person or not person.keypoints:
+        for person_poses, person_valid_mask in zip(frame_poses, frame_valid_mask):
+            if not person_valid_mask.any():
                 continue
 
-            for keypoint in person.keypoints: # draw a circle for each keypoint if it exists
-                if keypoint: 
-                    center = (int(keypoint.x), int(keypoint.y))
-                    cv2.circle(frame, center, self.line_thickness, color, -1)
-                
+            num_keypoints = int(person_valid_mask.sum())
+            points = person_poses[:num_keypoints, :2].astype(int).tolist()
+            for center in points: # draw a circle for each keypoint if it exists
+                cv2.circle(frame, tuple(center), self.line_thickness, color, -1)
+
             for pair in point_pairs:  # iterate over point pairs to add lines between keypoints
-                try: # some keypoints might be missing, which would lead to an IndexError
-                    point1 = person.keypoints[pair[0]]
-                    point2 = person.keypoints[pair[1]]
-                except IndexError as e:
+                if pair[0] >= num_keypoints or pair[1] >= num_keypoints: # some keypoints might be missing
                     continue
-                
-                if (point1 is None) or (point2 is None) or \
-                    ((point1.x <= 0) and (point1.y <= 0)) or ((point2.x <= 0) and (point2.y <= 0)):
+
+                point1 = person_poses[pair[0]]
+                point2 = person_poses[pair[1]]
+                if ((point1[0] <= 0) and (point1[1] <= 0)) or ((point2[0] <= 0) and (point2[1] <= 0)):
                     continue
 
-                point1 = (int(point1.x), int(point1.y))
-                point2 = (int(point2.x), int(point2.y))
-                cv2.line(frame, point1, point2, color=color, thickness=self.line_thickness)
+                cv2.line(frame, tuple(points[pair[0]]), tuple(points[pair[1]]), color=color, thickness=self.line_thickness)
 
         return frame
 
@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import inference  # must be imported before utils to avoid a circular import
+import utils
+from inference import FramePoseResult, PersonPoseResult, PoseKeypoint, VideoPoseResult
+
+
+def convert_pose_data_to_nested_arrays(data: dict, overlay_strategy: str) -> list:
+    """
+    The previous conversion of the parsed content of a MaskAnyone pose file (persons mapped to per-frame keypoints) to
+    frame results with one PoseKeypoint object per keypoint. Reference for utils.maskanyone_pose_data_to_arrays.
+    """
+    first_person_data = next(iter(data.values()))
+    number_of_frames = len(first_person_data)
+
+    frame_results = [FramePoseResult(persons=[], frame_idx=i) for i in range(number_of_frames)]
+
+    for person_idx, data_person_keypoints in data.items():
+        for frame_idx, data_frame_keypoints in enumerate(data_person_keypoints):
+            keypoints = []
+            if data_frame_keypoints is None:
+                continue
+
+            # The output of MaskAnyone API for a frame is different for MediaPipe and OpenPose:
+            # For Openpose, the frame output is a dictionary with a key "pose_keypoints" (and other keys like "face_keypoints", "hand_keypoints")
+            # For MediaPipe, the frame output is a list of keypoints
+            if overlay_strategy == "openpose_body25b" or overlay_strategy == "openpose":
+                data_pose_keypoints = data_frame_keypoints.get("pose_keypoints", None)
+            elif overlay_strategy == "mp_pose":
+                data_pose_keypoints = data_frame_keypoints
+            else:
+                raise ValueError(f"Invalid overlay strategy: {overlay_strategy}")
+
+            if data_pose_keypoints is None:
+                continue
+
+            for keypoint in data_pose_keypoints:
+                if not keypoint:
+                    keypoints.append(PoseKeypoint(x=0, y=0))
+                    continue
+
+                keypoints.append(PoseKeypoint(x=keypoint[0], y=keypoint[1]))
+
+            frame_results[frame_idx].persons.append(PersonPoseResult(keypoints=keypoints))
+
+    return frame_results
+
+
+def parse_nested(json_pose_file: str, overlay_strategy: str) -> np.ndarray:
+    """The previous implementation: json.load, PoseKeypoint objects and conversion to the pose arrays."""
+    with open(json_pose_file, "r") as f:
+        data = json.load(f)
+    frame_results = convert_pose_data_to_nested_arrays(data, overlay_strategy)
+    return VideoPoseResult(fps=0, frame_width=0, frame_height=0, frames=frame_results).pose_array
+
+
+def parse_arrays(json_pose_file: str, overlay_strategy: str) -> np.ndarray:
+    return utils.maskanyone_read_pose_arrays(json_pose_file, overlay_strategy)[0]
+
+
+def measure(parse, json_pose_file: str, overlay_strategy: str, repeats: int):
+    """Returns the best parse time in seconds, the peak memory in bytes and the pose array."""
+    parse_times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        pose_array = parse(json_pose_file, overlay_strategy)
+        parse_times.append(time.perf_counter() - start_time)
+
+    tracemalloc.start()  # separate run, tracing slows down the parser
+    parse(json_pose_file, overlay_strategy)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(parse_times), peak_memory, pose_array
+
+
+def write_synthetic_export(json_pose_file: str, overlay_strategy: str, num_frames: int, num_persons: int):
+    """Write a MaskAnyone UI export with persons that leave the video and frames with empty keypoints."""
+    num_keypoints = 33 if overlay_strategy == "mp_pose" else 25
+    rng = np.random.default_rng(0)
+    data = {}
+    for person_idx in range(num_persons):
+        person_frames = []
+        for frame_idx in range(num_frames):
+            if person_idx > 0 and (frame_idx // 100) % (person_idx + 1) == 0:
+                person_frames.append(None)  # the person is not in the video
+                continue
+            keypoints = rng.uniform(0, 1920, size=(num_keypoints, 4)).round(2).tolist()
+            if frame_idx % 50 == 0:
+                keypoints[0] = []  # keypoint not detected
+            person_frames.append(keypoints if overlay_strategy == "mp_pose" else {"pose_keypoints": keypoints, "face_keypoints": []})
+        data[str(person_idx)] = person_frames
+    with open(json_pose_file, "w") as f:
+        json.dump(data, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse time and peak memory of the MaskAnyone pose file parsers.")
+    parser.add_argument(
+        "--json_file",
+        type=str,
+        default=None,
+        help="MaskAnyone UI export to parse. If not set, a synthetic export is generated.",
+    )
+    parser.add_argument(
+        "--overlay_strategy",
+        type=str,
+        choices=["mp_pose", "openpose_body25b", "openpose"],
+        default="mp_pose",
+        help="Overlay strategy of the export (default: mp_pose).",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=20000,
+        help="Number of frames of the synthetic export (default: 20000).",
+    )
+    parser.add_argument(
+        "--persons",
+        type=int,
+        default=3,
+        help="Number of persons of the synthetic export (default: 3).",
+    )
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=3,
+        help="Number of timed runs per parser, the best time is reported (default: 3).",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_pose_file = args.json_file
+        if json_pose_file is None:
+            json_pose_file = os.path.join(temp_dir, "export.json")
+            write_synthetic_export(json_pose_file, args.overlay_strategy, args.frames, args.persons)
+        print(f"Parsing {json_pose_file} ({os.path.getsize(json_pose_file) / 1024 ** 2:.1f} MB), JSON backend: {utils._json_loads.__module__}")
+
+        nested_time, nested_memory, nested_pose_array = measure(parse_nested, json_pose_file, args.overlay_strategy, args.repeats)
+        arrays_time, arrays_memory, arrays_pose_array = measure(parse_arrays, json_pose_file, args.overlay_strategy, args.repeats)
+
+    np.testing.assert_array_equal(arrays_pose_array, nested_pose_array)
+    print(f"{'parser':<10} {'time (s)':>10} {'peak memory (MB)':>18}")
+    print(f"{'nested':<10} {nested_time:>10.2f} {nested_memory / 1024 ** 2:>18.1f}")
+    print(f"{'arrays':<10} {arrays_time:>10.2f} {arrays_memory / 1024 ** 2:>18.1f}")
+    print(f"Speedup: {nested_time / arrays_time:.1f}x, peak memory: {arrays_memory / nested_memory:.0%} of the nested parser")
+
+
+if __name__ == "__main__":
+    # Run from the src folder: python -m scripts.benchmark_maskanyone_parser [--json_file <export.json>]
+    main()
@@ -0,0 +1,35 @@
+import argparse
+
+import inference  # must be imported before the checkpointer to avoid a circular import
+from checkpointer import Checkpointer, POSE_FILE_FORMATS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the pose files of a MaskBench checkpoint between the JSON and the binary (npy) format.")
+    parser.add_argument(
+        "checkpoint_name",
+        type=str,
+        help="Name of the checkpoint folder inside the output directory (e.g. TragicTalkers-20250101-120000).",
+    )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=POSE_FILE_FORMATS,
+        default="npy",
+        help="Target pose file format (default: npy).",
+    )
+    parser.add_argument(
+        "--remove_source",
+        action="store_true",
+        help="Delete the original pose files after conversion.",
+    )
+    args = parser.parse_args()
+
+    checkpointer = Checkpointer(dataset_name=None, checkpoint_name=args.checkpoint_name)
+    num_converted = checkpointer.convert_pose_files(args.format, remove_source=args.remove_source)
+    print(f"Converted {num_converted} pose files in {checkpointer.poses_dir} to {args.format}.")
+
+
+if __name__ == "__main__":
+    # Run from the src folder: python -m scripts.convert_pose_files <checkpoint_name> --format npy
+    main()
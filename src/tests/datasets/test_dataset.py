@@ -0,0 +1,47 @@
+"""Tests for the dataset pre-scan."""
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from datasets.dataset import Dataset
+
+
+class TestDatasetPrescan(unittest.TestCase):
+    """Test cases for probing the metadata of all dataset videos."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for video_name, size, num_frames in [("a", (64, 48), 10), ("b", (64, 48), 20), ("c", (32, 24), 5)]:
+            writer = cv2.VideoWriter(os.path.join(self.temp_dir.name, f"{video_name}.avi"), cv2.VideoWriter_fourcc(*"MJPG"), 10, size)
+            for _ in range(num_frames):
+                writer.write(np.zeros((size[1], size[0], 3), dtype=np.uint8))
+            writer.release()
+        with open(os.path.join(self.temp_dir.name, "broken.mp4"), "wb") as f:
+            f.write(b"not a video")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_prescan_attaches_metadata_and_summarizes(self):
+        """Test that every readable video gets metadata and the summary adds up frames, duration and resolutions."""
+        dataset = Dataset("test", video_folder=self.temp_dir.name)
+        summary = dataset.prescan(max_workers=2)
+
+        samples = {sample.get_filename(): sample for sample in dataset}
+        self.assertEqual(samples["b"].metadata["frame_count"], 20)
+        self.assertEqual(samples["c"].metadata["width"], 32)
+        self.assertIsNone(samples["broken"].metadata)
+
+        self.assertEqual(summary["num_videos"], 4)
+        self.assertEqual(summary["num_unreadable_videos"], 1)
+        self.assertEqual(summary["total_frames"], 35)
+        self.assertAlmostEqual(summary["total_duration"], 3.5)
+        self.assertEqual(summary["resolution_histogram"], {"64x48": 2, "32x24": 1})
+        self.assertIs(dataset.summary, summary)
+
+
+if __name__ == '__main__':
+    unittest.main()
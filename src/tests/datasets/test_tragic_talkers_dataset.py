@@ -0,0 +1,77 @@
+"""Tests for loading the Tragic Talkers ground truth through the ground truth cache."""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from datasets import tragic_talkers_dataset
+from datasets.tragic_talkers_dataset import TragicTalkersDataset
+
+
+class TestTragicTalkersGroundTruth(unittest.TestCase):
+    """Test cases for compacting the per-frame OpenPose JSON files into the ground truth cache."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gt_folder = os.path.join(self.temp_dir.name, "labels")
+        self.cache_dir = os.path.join(self.temp_dir.name, "gt_cache")
+        for camera, num_frames in [("cam-022", 12), ("cam-001", 3)]:
+            camera_folder = os.path.join(self.gt_folder, "conversation1_t3", camera)
+            os.makedirs(camera_folder)
+            for frame_idx in range(num_frames):
+                people = [{"pose_keypoints_2d": [float(frame_idx), 2.0, 0.9] * 25}]
+                if frame_idx % 2:
+                    people.append({"pose_keypoints_2d": []})  # a person without keypoints
+                self.write_frame(camera_folder, frame_idx, people)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_frame(self, camera_folder, frame_idx, people):
+        with open(os.path.join(camera_folder, f"conversation1_t3-{frame_idx:06d}_keypoints.json"), "w") as f:
+            json.dump({"people": people}, f)
+
+    def create_dataset(self):
+        config = {"gt_cache_dir": self.cache_dir, "loading_workers": 2}
+        return TragicTalkersDataset("TragicTalkers", video_folder=self.temp_dir.name, gt_folder=self.gt_folder, config=config)
+
+    def test_ground_truth_is_read_from_cache(self):
+        gt_pose_results = self.create_dataset().get_gt_pose_results()
+        self.assertEqual(list(gt_pose_results), ["conversation1_t3-cam01", "conversation1_t3-cam22"])
+        gt_pose_result = gt_pose_results["conversation1_t3-cam22"]
+        self.assertEqual(gt_pose_result.pose_array.shape, (12, 2, 25, 3))
+        np.testing.assert_array_equal(gt_pose_result.pose_array[:, 0, 0, 0], np.arange(12))
+        np.testing.assert_array_equal(gt_pose_result.person_counts, [1, 2] * 6)
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, "conversation1_t3-cam22.npy")))
+
+        with mock.patch.object(tragic_talkers_dataset, "combine_json_files_for_video") as combine_json_files:
+            cached_gt_pose_results = self.create_dataset().get_gt_pose_results()
+        combine_json_files.assert_not_called()
+        cached_gt_pose_result = cached_gt_pose_results["conversation1_t3-cam22"]
+        np.testing.assert_array_equal(cached_gt_pose_result.valid_mask, gt_pose_result.valid_mask)
+        np.testing.assert_array_equal(cached_gt_pose_result.pose_array[gt_pose_result.valid_mask], gt_pose_result.pose_array[gt_pose_result.valid_mask])
+        np.testing.assert_array_equal(cached_gt_pose_result.person_counts, gt_pose_result.person_counts)
+
+    def test_cache_is_invalidated_when_folder_changes(self):
+        self.create_dataset().get_gt_pose_results()
+        camera_folder = os.path.join(self.gt_folder, "conversation1_t3", "cam-001")
+        self.write_frame(camera_folder, 3, [])
+        stat = os.stat(camera_folder)
+        os.utime(camera_folder, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))  # coarse file system timestamps
+
+        gt_pose_results = self.create_dataset().get_gt_pose_results()
+        self.assertEqual(gt_pose_results["conversation1_t3-cam01"].num_frames, 4)
+        self.assertEqual(gt_pose_results["conversation1_t3-cam22"].num_frames, 12)
+
+    def test_conversion_to_coco(self):
+        dataset = self.create_dataset()
+        dataset.convert_gt_keypoints_to_coco = True
+        gt_pose_results = dataset.get_gt_pose_results()
+        self.assertEqual(gt_pose_results["conversation1_t3-cam01"].pose_array.shape, (3, 2, 17, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Tests for collecting and combining the pose results of video chunks."""
+import os
+import unittest
+
+import numpy as np
+
+from inference.chunk_result import ChunkResult, ChunkResultCollector
+
+
+def create_chunk_result(chunk_index, frame_offset, num_frames, num_persons, num_keypoints=4):
+    pose_array = np.zeros((num_frames, num_persons, num_keypoints, 3), dtype=np.float32)
+    pose_array[..., 0] = np.arange(frame_offset, frame_offset + num_frames)[:, np.newaxis, np.newaxis]
+    pose_array[..., 2] = np.nan
+    valid_mask = np.ones((num_frames, num_persons, num_keypoints), dtype=bool)
+    person_counts = np.full(num_frames, num_persons, dtype=np.int32)
+    return ChunkResult(chunk_index, frame_offset, pose_array, valid_mask, person_counts)
+
+
+class TestChunkResultCollector(unittest.TestCase):
+    """Test cases for combining chunk results in chunk order, with and without spilling to disk."""
+
+    def test_chunks_are_combined_in_chunk_order(self):
+        with ChunkResultCollector() as collector:
+            collector.add(create_chunk_result(1, 10, 10, num_persons=2))
+            collector.add(create_chunk_result(2, 20, 5, num_persons=0))
+            collector.add(create_chunk_result(0, 0, 10, num_persons=1))
+            result = collector.to_video_pose_result(fps=10, frame_width=64, frame_height=48, video_name="video")
+
+        self.assertEqual(result.num_frames, 25)
+        self.assertEqual(result.pose_array.shape, (25, 2, 4, 3))
+        np.testing.assert_array_equal(result.person_counts, [1] * 10 + [2] * 10 + [0] * 5)
+        np.testing.assert_array_equal(result.pose_array[:20, 0, 0, 0], np.arange(20))
+        self.assertFalse(result.valid_mask[:10, 1].any())  # padded person slots of the first chunk
+
+    def test_results_above_memory_budget_are_spilled(self):
+        chunk_results = [create_chunk_result(idx, idx * 10, 10, num_persons=1) for idx in range(3)]
+        with ChunkResultCollector(memory_budget=chunk_results[0].nbytes) as collector:
+            for chunk_result in chunk_results:
+                collector.add(chunk_result)
+            self.assertEqual([chunk_result.is_spilled for chunk_result in chunk_results], [True, True, False])
+            self.assertLessEqual(collector.in_memory_bytes, collector.memory_budget)
+            spill_path = chunk_results[0]._spill_path
+            self.assertTrue(os.path.exists(spill_path))
+
+            result = collector.to_video_pose_result(fps=10, frame_width=64, frame_height=48)
+
+        np.testing.assert_array_equal(result.pose_array[:, 0, 0, 0], np.arange(30))
+        self.assertFalse(os.path.exists(spill_path))
+
+    def test_missing_chunk(self):
+        with ChunkResultCollector() as collector:
+            collector.add(create_chunk_result(0, 0, 10, num_persons=1))
+            collector.add(create_chunk_result(2, 20, 10, num_persons=1))
+            with self.assertRaises(ValueError):
+                collector.to_video_pose_result(fps=10, frame_width=64, frame_height=48)
+
+    def test_frame_offset_does_not_match_previous_chunk(self):
+        with ChunkResultCollector() as collector:
+            collector.add(create_chunk_result(0, 0, 9, num_persons=1))  # e.g. a frame missing in the API response
+            collector.add(create_chunk_result(1, 10, 10, num_persons=1))
+            with self.assertRaises(ValueError):
+                collector.to_video_pose_result(fps=10, frame_width=64, frame_height=48)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""Tests for the input scaling of decoded frames."""
+import unittest
+
+import numpy as np
+
+from inference.frame_scaler import FrameScaler
+
+
+class TestFrameScaler(unittest.TestCase):
+    """Test cases for downscaling frames and rescaling keypoints."""
+
+    def test_scale_from_config(self):
+        self.assertEqual(FrameScaler.from_config({"input_max_side": 1224}).get_scale(2448, 2048), 0.5)
+        self.assertEqual(FrameScaler.from_config({"input_max_side": 4000}).get_scale(2448, 2048), 1.0)  # never upscale
+        self.assertEqual(FrameScaler.from_config({"input_scale": 0.25}).get_scale(2448, 2048), 0.25)
+        self.assertFalse(FrameScaler.from_config({}).enabled)
+        with self.assertRaises(ValueError):
+            FrameScaler.from_config({"input_max_side": 1224, "input_scale": 0.5})
+
+    def test_frames_are_resized_into_reused_buffers(self):
+        video_frame_scaler = FrameScaler(max_side=64).for_video(128, 96, num_buffers=2)
+        frames = [np.full((96, 128, 3), value, dtype=np.uint8) for value in range(3)]
+        scaled_frames = [video_frame_scaler.resize(frame) for frame in frames[:2]]
+
+        self.assertEqual(scaled_frames[0].shape, (48, 64, 3))
+        self.assertIsNot(scaled_frames[0], scaled_frames[1])  # a batch of two frames uses both buffers
+        self.assertIs(video_frame_scaler.resize(frames[2]), scaled_frames[0])
+        self.assertEqual(scaled_frames[0][0, 0, 0], 2)
+        self.assertEqual(frames[0][0, 0, 0], 0)  # the original frames are not modified
+
+    def test_keypoints_are_mapped_to_original_coordinates(self):
+        video_frame_scaler = FrameScaler(scale=0.5).for_video(128, 96)
+        keypoints = np.array([[[10, 20, 0.9], [0, 0, np.nan]]], dtype=np.float32)
+
+        np.testing.assert_array_equal(video_frame_scaler.to_original_coordinates(keypoints)[0, :, :2], [[20, 40], [0, 0]])
+
+    def test_no_scaling(self):
+        video_frame_scaler = FrameScaler().for_video(128, 96)
+        frame = np.zeros((96, 128, 3), dtype=np.uint8)
+
+        self.assertIs(video_frame_scaler.resize(frame), frame)
+        self.assertIn("no input scaling", video_frame_scaler.describe_timing(1.0, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Tests for the shared frame source."""
+import os
+import tempfile
+import threading
+import unittest
+
+import cv2
+import numpy as np
+
+from inference.frame_source import FrameSource
+
+
+class TestFrameSource(unittest.TestCase):
+    """Test cases for decoding a video once and sharing the frames."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.temp_dir.name, "video.avi")
+        self.num_frames = 20
+        writer = cv2.VideoWriter(self.video_path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+        for frame_idx in range(self.num_frames):
+            writer.write(np.full((48, 64, 3), frame_idx * 10, dtype=np.uint8))
+        writer.release()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def consume(self, subscription, received, max_frames=None):
+        for frame, frame_idx, timestamp in subscription:
+            received.append((frame_idx, timestamp, frame.shape))
+            if max_frames is not None and len(received) == max_frames:
+                subscription.close()
+                return
+
+    def test_all_subscribers_receive_all_frames(self):
+        """Test that every subscriber receives every frame in order and the frame count is set at the end."""
+        frame_source = FrameSource(self.video_path, max_queued_frames=2)
+        subscriptions = [frame_source.subscribe(), frame_source.subscribe()]
+        received = [[], []]
+        threads = [threading.Thread(target=self.consume, args=(subscription, frames)) for subscription, frames in zip(subscriptions, received)]
+        for thread in threads:
+            thread.start()
+        frame_source.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        frame_source.join()
+
+        for frames in received:
+            self.assertEqual([frame_idx for frame_idx, _, _ in frames], list(range(self.num_frames)))
+            self.assertAlmostEqual(frames[1][1], 0.1)
+            self.assertEqual(frames[0][2], (48, 64, 3))
+        self.assertEqual(frame_source.metadata["frame_count"], self.num_frames)
+        self.assertEqual(frame_source.metadata["width"], 64)
+
+    def test_exact_frame_count_is_passed_to_subscribers(self):
+        """Test that the exact frame count is reported instead of the number of decoded frames, so dropped frames are detected."""
+        frame_source = FrameSource(self.video_path, max_queued_frames=4, frame_count=self.num_frames + 1)
+        subscription = frame_source.subscribe()
+        frame_source.start()
+        received = []
+        self.consume(subscription, received)
+        frame_source.join()
+
+        self.assertEqual(len(received), self.num_frames)
+        self.assertEqual(frame_source.num_decoded_frames, self.num_frames)
+        self.assertEqual(frame_source.metadata["frame_count"], self.num_frames + 1)
+
+    def test_closed_subscriber_does_not_block(self):
+        """Test that a subscriber that stops early does not block the other subscribers."""
+        frame_source = FrameSource(self.video_path, max_queued_frames=1)
+        early, full = frame_source.subscribe(), frame_source.subscribe()
+        received_early, received_full = [], []
+        threads = [
+            threading.Thread(target=self.consume, args=(early, received_early, 3)),
+            threading.Thread(target=self.consume, args=(full, received_full)),
+        ]
+        for thread in threads:
+            thread.start()
+        frame_source.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        frame_source.join()
+
+        self.assertEqual(len(received_early), 3)
+        self.assertEqual(len(received_full), self.num_frames)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Tests for running pose estimators with a frame stride."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import utils
+from evaluation.metrics.velocity import VelocityMetric
+from inference.frame_stride import estimate_pose_with_frame_stride, interpolate_strided_result
+from inference.pose_result import VideoPoseResult
+
+
+def create_strided_result(frame_keypoints, fps=10):
+    return VideoPoseResult.from_frame_keypoints(
+        [np.array(keypoints, dtype=np.float32) for keypoints in frame_keypoints],
+        fps=fps, frame_width=100, frame_height=100, video_name="video",
+    )
+
+
+class FakeFrameEstimator:
+    """Estimator with the per-frame API that puts a single person at (frame_idx + 1, frame_idx + 1)."""
+    def __init__(self, frame_stride):
+        self.frame_stride = frame_stride
+        self.config = {}
+        self.processed_frames = []
+
+    def supports_frame_processing(self):
+        return True
+
+    def start_video(self, video_path, video_metadata):
+        return {"metadata": video_metadata, "frame_keypoints": []}
+
+    def process_frame(self, video_context, frame, frame_idx, timestamp):
+        self.processed_frames.append((frame_idx, timestamp))
+        video_context["frame_keypoints"].append(np.full((1, 2, 3), frame_idx + 1, dtype=np.float32))
+
+    def finish_video(self, video_context):
+        assert len(video_context["frame_keypoints"]) == video_context["metadata"]["frame_count"]
+        return VideoPoseResult.from_frame_keypoints(video_context["frame_keypoints"], fps=video_context["metadata"]["fps"], frame_width=64, frame_height=48, video_name="video")
+
+    def abort_video(self, video_context):
+        pass
+
+
+class TestFrameStride(unittest.TestCase):
+    """Test cases for the interpolation of skipped frames."""
+
+    def test_matched_persons_are_interpolated(self):
+        """Test that persons are matched by position, not by index, and interpolated linearly."""
+        strided_result = create_strided_result([
+            [[(10, 10, 0.8), (20, 20, 0.8)], [[50, 50, 0.4], [60, 60, 0.4]]],
+            [[(54, 54, 0.6), (64, 64, 0.6)], [[14, 14, 0.4], [0, 0, 0.4]]],  # persons swapped, one keypoint undetected
+        ])
+        result = interpolate_strided_result(strided_result, frame_stride=4, num_frames=5, fps=10, max_distance=20)
+
+        self.assertEqual(result.num_frames, 5)
+        np.testing.assert_array_equal(result.interpolated_frames, [False, True, True, True, False])
+        np.testing.assert_allclose(result.pose_array[2, 0, 0], (12, 12, 0.6))
+        np.testing.assert_allclose(result.pose_array[2, 1, 0], (52, 52, 0.5))
+        np.testing.assert_array_equal(result.pose_array[2, 0, 1, :2], (0, 0))  # undetected in the second estimated frame
+        self.assertTrue(np.isnan(result.pose_array[2, 0, 1, 2]))
+        np.testing.assert_array_equal(result.person_counts, [2, 2, 2, 2, 2])
+
+    def test_unmatched_persons_and_last_frames(self):
+        """Test that persons detected in only one estimated frame are not interpolated and the last poses are repeated."""
+        strided_result = create_strided_result([
+            [[(10, 10, 1)]],
+            [[(90, 90, 1)]],  # too far away, a different person
+        ])
+        result = interpolate_strided_result(strided_result, frame_stride=2, num_frames=4, fps=10, max_distance=20)
+
+        np.testing.assert_array_equal(result.person_counts, [1, 0, 1, 1])
+        np.testing.assert_array_equal(result.pose_array[3, 0, 0], (90, 90, 1))
+        np.testing.assert_array_equal(result.interpolated_frames, [False, True, False, True])
+
+    def test_interpolated_frames_are_saved(self):
+        strided_result = create_strided_result([[[(10, 10, 1)]], [[(12, 12, 1)]]])
+        result = interpolate_strided_result(strided_result, frame_stride=2, num_frames=3, fps=10, max_distance=20)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            npy_path = os.path.join(temp_dir, "video.npy")
+            result.to_npy(npy_path)
+            np.testing.assert_array_equal(VideoPoseResult.from_npy(npy_path).interpolated_frames, [False, True, False])
+        loaded = VideoPoseResult(fps=10, frame_width=100, frame_height=100, frames=result.frames)
+        self.assertEqual(result.to_json()["interpolated_frames"], [1])
+        self.assertFalse(loaded.interpolated_frames.any())
+
+    def test_velocity_excludes_interpolated_frames(self):
+        """Test that the velocity is only computed between the estimated frames if interpolated frames are excluded."""
+        strided_result = create_strided_result([[[(10, 10, 1)]], [[(20, 20, 1)]], [[(40, 40, 1)]]])
+        result = interpolate_strided_result(strided_result, frame_stride=2, num_frames=5, fps=10, max_distance=30)
+
+        velocity = VelocityMetric({"exclude_interpolated_frames": True}).compute(result, model_name="model").values
+        np.testing.assert_allclose(velocity[:, 0, 0, 0], [5, 10])  # pixels per frame
+        velocity = VelocityMetric().compute(result, model_name="model").values
+        np.testing.assert_allclose(velocity[:, 0, 0, 0], [5, 5, 10, 10])
+
+    def test_frame_estimator_receives_sampled_frames(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            video_path = os.path.join(temp_dir, "video.avi")
+            writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+            for _ in range(7):
+                writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+            writer.release()
+
+            estimator = FakeFrameEstimator(frame_stride=3)
+            metadata = {"width": 64, "height": 48, "fps": 10, "frame_count": 7, "duration": 0.7}
+            with mock.patch.object(utils.video_metadata_cache, "get", return_value=metadata):
+                result = estimate_pose_with_frame_stride(estimator, video_path)
+
+        self.assertEqual([frame_idx for frame_idx, _ in estimator.processed_frames], [0, 1, 2])
+        self.assertAlmostEqual(estimator.processed_frames[1][1], 0.3)
+        self.assertEqual(result.num_frames, 7)
+        self.assertEqual(result.fps, 10)
+        np.testing.assert_allclose(result.pose_array[1:3, 0, 0, 0], [4 / 3, 5 / 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""Tests for the person tracker used with batched inference."""
+import unittest
+
+import numpy as np
+
+from inference.person_tracker import PersonTracker
+
+
+def create_frame(person_positions):
+    """Keypoints of shape (persons, 2, 3) with two keypoints per person."""
+    return np.array([[(x, y, 1.0), (x + 2, y + 2, 1.0)] for x, y in person_positions], dtype=np.float32).reshape(-1, 2, 3)
+
+
+class TestPersonTracker(unittest.TestCase):
+    """Test cases for associating persons across frames."""
+
+    def test_person_order_is_stable(self):
+        """Test that persons keep their order although the detections are returned in a different order."""
+        tracker = PersonTracker(max_distance=20)
+        _, first_track_ids = tracker.update(create_frame([(10, 10), (100, 100)]))
+        second_frame, second_track_ids = tracker.update(create_frame([(105, 102), (12, 11)]))
+
+        self.assertEqual(first_track_ids.tolist(), [0, 1])
+        self.assertEqual(second_track_ids.tolist(), [0, 1])
+        self.assertEqual(second_frame[0, 0, 0], 12)
+        self.assertEqual(second_frame[1, 0, 0], 105)
+
+    def test_new_and_lost_persons(self):
+        """Test that far away persons start a new track and lost tracks are dropped after max_missing_frames."""
+        tracker = PersonTracker(max_distance=20, max_missing_frames=1)
+        tracker.update(create_frame([(10, 10)]))
+        self.assertEqual(tracker.update(create_frame([(200, 200)]))[1].tolist(), [1])
+        tracker.update(create_frame([]))
+        tracker.update(create_frame([]))
+        self.assertEqual(tracker.update(create_frame([(10, 10)]))[1].tolist(), [2])
+
+    def test_person_without_keypoints(self):
+        """Test that a person without detected keypoints gets its own track."""
+        tracker = PersonTracker(max_distance=20)
+        frame = create_frame([(0, 0), (10, 10)])
+        frame[0] = 0  # the first person has no detected keypoints
+
+        self.assertEqual(tracker.update(frame)[1].tolist(), [0, 1])
+        self.assertEqual(tracker.update(create_frame([(11, 11)]))[1].tolist(), [1])  # matched to the person with keypoints
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,12 @@
 """Tests for pose result functionality."""
+import json
+import os
+import tempfile
 import unittest
 import numpy as np
 import numpy.ma as ma
 
-from inference.pose_result import PoseKeypoint, PersonPoseResult, FramePoseResult, VideoPoseResult
+from inference.pose_result import PoseKeypoint, PersonPoseResult, FramePoseResult, VideoPoseResult, LazyVideoPoseResult, compute_file_sha256
 
 
 class TestPoseResult(unittest.TestCase):
@@ -137,5 +140,209 @@ class TestPoseResult(unittest.TestCase):
         )
 
 
+    def test_from_arrays_without_copy(self):
+        """Test that a float32 pose array is used directly and the frames view is built from it."""
+        pose_array = np.zeros((2, 2, 3, 3), dtype=np.float32)
+        pose_array[:, 0, :, 0] = 10.0
+        pose_array[:, 0, :, 1] = 20.0
+        pose_array[:, 0, :, 2] = 0.5
+        person_counts = np.array([1, 2])
+
+        video = VideoPoseResult(
+            fps=30,
+            frame_width=1920,
+            frame_height=1080,
+            video_name="array_video",
+            pose_array=pose_array,
+            person_counts=person_counts,
+        )
+
+        self.assertIs(video.pose_array, pose_array)
+        self.assertEqual(video.num_frames, 2)
+        self.assertTrue(video.valid_mask[1, 1].all())
+        self.assertFalse(video.valid_mask[0, 1].any())
+
+        result = video.to_numpy_ma()
+        self.assertEqual(result.shape, (2, 2, 3, 2))
+        self.assertTrue(result.mask[0, 1].all())
+        self.assertFalse(result.mask[1].any())
+
+        frames = video.frames
+        self.assertEqual(len(frames[0].persons), 1)
+        self.assertEqual(len(frames[1].persons), 2)
+        self.assertEqual(frames[0].persons[0].keypoints[0], PoseKeypoint(x=10.0, y=20.0, confidence=0.5))
+
+    def test_frames_mutation_updates_arrays(self):
+        """Test that reading the frames view keeps the arrays and that in-place changes to it update them."""
+        person = PersonPoseResult(keypoints=[PoseKeypoint(x=1.0, y=2.0), PoseKeypoint(x=3.0, y=4.0, confidence=0.9)])
+        video = VideoPoseResult(
+            fps=30,
+            frame_width=1920,
+            frame_height=1080,
+            frames=[FramePoseResult(persons=[person], frame_idx=0), FramePoseResult(persons=[], frame_idx=1)],
+            video_name="mutated_video",
+        )
+        self.assertEqual(video.pose_array.shape, (2, 1, 2, 3))
+        self.assertTrue(np.isnan(video.pose_array[0, 0, 0, 2]))
+        self.assertEqual(video.person_counts.tolist(), [1, 0])
+
+        pose_array = video.pose_array
+        self.assertEqual(len(video.frames[0].persons), 1)
+        self.assertIs(video.pose_array, pose_array)  # reading the frames does not replace the arrays
+
+        video.frames[0].persons[0].keypoints[0].x = 5.0
+        self.assertEqual(video.pose_array[0, 0, 0, 0], 5.0)
+
+        video.frames[1].persons.append(PersonPoseResult(keypoints=[PoseKeypoint(x=7.0, y=8.0)]))
+        self.assertEqual(video.person_counts.tolist(), [1, 1])
+        self.assertEqual(video.pose_array[1, 0, 0, 0], 7.0)
+
+    def test_json_round_trip(self):
+        """Test that saving and loading a video pose result preserves persons, keypoints and confidences."""
+        person = PersonPoseResult(keypoints=[PoseKeypoint(x=1.5, y=2.5, confidence=0.75), PoseKeypoint(x=0, y=0)])
+        video = VideoPoseResult(
+            fps=25,
+            frame_width=640,
+            frame_height=480,
+            frames=[FramePoseResult(persons=[person, PersonPoseResult(keypoints=[])], frame_idx=0)],
+            video_name="json_video",
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "json_video_poses.json")
+            with open(json_path, "w") as f:
+                json.dump(video.to_json(), f)
+            loaded = VideoPoseResult.from_json(json_path)
+
+        self.assertEqual(loaded.video_name, "json_video")
+        self.assertEqual(loaded.fps, 25)
+        self.assertEqual(loaded.person_counts.tolist(), [2])
+        self.assertEqual(loaded.frames[0].persons[0].keypoints, person.keypoints)
+        self.assertEqual(loaded.frames[0].persons[1].keypoints, [])
+
+
+    def test_to_numpy_ma_is_cached_and_read_only(self):
+        """Test that the masked array is computed once, returned read-only and rebuilt after mutation."""
+        person = PersonPoseResult(keypoints=[PoseKeypoint(x=1.0, y=2.0), PoseKeypoint(x=3.0, y=4.0)])
+        video = VideoPoseResult(
+            fps=30,
+            frame_width=1920,
+            frame_height=1080,
+            frames=[FramePoseResult(persons=[person], frame_idx=0)],
+            video_name="cached_video",
+        )
+
+        first = video.to_numpy_ma()
+        second = video.to_numpy_ma()
+        self.assertTrue(np.shares_memory(first.data, second.data))
+        with self.assertRaises(ValueError):
+            first[0, 0, 0, 0] = 10.0
+        self.assertEqual(video.frames[0].persons[0].keypoints[0].x, 1.0)
+        self.assertTrue(np.shares_memory(video.to_numpy_ma().data, first.data))  # unchanged frames keep the cache
+
+        video.frames[0].persons[0].keypoints[0].x = 10.0
+        self.assertEqual(video.to_numpy_ma()[0, 0, 0, 0], 10.0)
+        self.assertEqual(first[0, 0, 0, 0], 1.0)
+
+        video.pose_array[0, 0, 1, 0] = 30.0
+        video.invalidate_cache()
+        self.assertEqual(video.to_numpy_ma()[0, 0, 1, 0], 30.0)
+
+
+    def test_npy_round_trip(self):
+        """Test that the binary pose format preserves the arrays and is memory-mapped when loading."""
+        person = PersonPoseResult(keypoints=[PoseKeypoint(x=1.5, y=2.5, confidence=0.75), PoseKeypoint(x=0, y=0)])
+        video = VideoPoseResult(
+            fps=25,
+            frame_width=640,
+            frame_height=480,
+            frames=[
+                FramePoseResult(persons=[person, PersonPoseResult(keypoints=[])], frame_idx=0),
+                FramePoseResult(persons=[], frame_idx=1),
+            ],
+            video_name="npy_video",
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            npy_path = os.path.join(tmp_dir, "npy_video_poses.npy")
+            video.to_npy(npy_path)
+            loaded = VideoPoseResult.from_npy(npy_path)
+
+            self.assertFalse(loaded.pose_array.flags.writeable)  # read-only memory map
+            self.assertEqual(loaded.video_name, "npy_video")
+            self.assertEqual(loaded.frame_width, 640)
+            self.assertEqual(loaded.person_counts.tolist(), [2, 0])
+            np.testing.assert_array_equal(loaded.valid_mask, video.valid_mask)
+            np.testing.assert_array_equal(loaded.to_numpy_ma(), video.to_numpy_ma())
+            self.assertEqual(loaded.frames[0].persons[0].keypoints, person.keypoints)
+            del loaded
+
+
+    def test_from_frame_keypoints(self):
+        """Test building a video pose result from raw per-frame keypoint arrays."""
+        frame_keypoints = [
+            np.array([[[10, 20, 0.9], [0, 0, 0.5]]], dtype=np.float32),  # one person with an undetected keypoint
+            None,  # no person detected
+            np.array([[[1, 2]], [[3, 4]]], dtype=np.float32),  # two persons without confidences and fewer keypoints
+        ]
+        video = VideoPoseResult.from_frame_keypoints(frame_keypoints, fps=30, frame_width=640, frame_height=480, video_name="video")
+
+        self.assertEqual(video.pose_array.shape, (3, 2, 2, 3))
+        self.assertEqual(video.person_counts.tolist(), [1, 0, 2])
+        self.assertAlmostEqual(float(video.pose_array[0, 0, 0, 2]), 0.9, places=5)
+        self.assertTrue(np.isnan(video.pose_array[0, 0, 1, 2]))  # (0, 0) has no confidence
+        self.assertTrue(np.isnan(video.pose_array[2, 1, 0, 2]))
+        self.assertEqual(video.valid_mask[2].tolist(), [[True, False], [True, False]])
+
+        frames = video.frames
+        self.assertEqual(len(frames[1].persons), 0)
+        self.assertIsNone(frames[0].persons[0].keypoints[1].confidence)
+        self.assertEqual((frames[2].persons[1].keypoints[0].x, frames[2].persons[1].keypoints[0].y), (3, 4))
+
+    def test_lazy_pose_result_loads_on_first_access(self):
+        """Test that a lazy pose result only reads its file when the poses are accessed."""
+        person = PersonPoseResult(keypoints=[PoseKeypoint(x=1.0, y=2.0), PoseKeypoint(x=3.0, y=4.0)])
+        video = VideoPoseResult(
+            fps=30,
+            frame_width=1920,
+            frame_height=1080,
+            frames=[FramePoseResult(persons=[person], frame_idx=i) for i in range(3)],
+            video_name="lazy_video",
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "lazy_video_poses.json")
+            with open(json_path, "w") as f:
+                json.dump(video.to_json(), f)
+
+            lazy = LazyVideoPoseResult(json_path, "lazy_video", fps=30, num_frames=3)
+            self.assertEqual(lazy.num_frames, 3)
+            self.assertEqual(lazy.fps, 30)
+            self.assertFalse(lazy.is_loaded)
+
+            self.assertEqual(lazy.frame_width, 1920)  # unknown metadata is read from the file
+            self.assertTrue(lazy.is_loaded)
+            np.testing.assert_array_equal(lazy.to_numpy_ma(), video.to_numpy_ma())
+
+    def test_lazy_pose_result_verifies_hash(self):
+        """Test that stale metadata of a lazy pose result is discarded if the file content does not match its hash."""
+        video = VideoPoseResult.from_frame_keypoints([np.ones((1, 2, 3), dtype=np.float32)] * 4, fps=25, frame_width=64, frame_height=48, video_name="video")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "video_poses.json")
+            with open(json_path, "w") as f:
+                json.dump(video.to_json(), f)
+            sha256 = compute_file_sha256(json_path)
+
+            lazy = LazyVideoPoseResult(json_path, "video", fps=25, num_frames=4, sha256=sha256)
+            self.assertEqual(lazy.pose_array.shape, (4, 1, 2, 3))
+            self.assertEqual(lazy.fps, 25)
+
+            stale = LazyVideoPoseResult(json_path, "video", fps=30, num_frames=5, sha256="0" * 64)
+            self.assertEqual(stale.num_frames, 5)  # not loaded yet
+            stale.pose_array
+            self.assertEqual((stale.num_frames, stale.fps), (4, 25))
+
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
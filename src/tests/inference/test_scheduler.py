@@ -0,0 +1,66 @@
+"""Tests for the longest-job-first inference scheduler."""
+import unittest
+from types import SimpleNamespace
+
+from inference.scheduler import InferenceJob, estimate_seconds_per_frame, estimator_config_key, order_longest_job_first, simulate_schedule
+
+
+class TestScheduler(unittest.TestCase):
+    """Test cases for the inference job scheduling."""
+
+    def create_job(self, estimator_name, video_name, predicted_cost):
+        estimator = SimpleNamespace(name=estimator_name)
+        video = SimpleNamespace(get_filename=lambda: video_name, metadata=None)
+        return InferenceJob(estimator, video, num_frames=int(predicted_cost), predicted_cost=predicted_cost)
+
+    def test_seconds_per_frame_from_history(self):
+        """Test per-frame times from logged records, records without a frame count and the fallback for unknown estimators."""
+        records = [
+            {"estimator": "A", "video": "v1", "inference_time": 10.0, "num_frames": 100, "estimator_config": "a"},
+            {"estimator": "A", "video": "v2", "inference_time": 30.0, "num_frames": None, "estimator_config": "a"},
+            {"estimator": "A", "video": "v1", "inference_time": 90.0, "num_frames": 100, "estimator_config": "other"},  # other configuration
+            {"estimator": "A", "video": "v1", "inference_time": 90.0, "num_frames": 100},  # unknown configuration
+            {"estimator": "B", "video": "v1", "inference_time": 50.0, "num_frames": 100, "estimator_config": "b"},
+            {"estimator": "Other", "video": "v1", "inference_time": 1.0, "num_frames": 100, "estimator_config": "c"},
+        ]
+        seconds_per_frame = estimate_seconds_per_frame(records, {"A": "a", "B": "b", "C": "c"}, {"v2": 300})
+
+        self.assertAlmostEqual(seconds_per_frame["A"], 0.1)
+        self.assertAlmostEqual(seconds_per_frame["B"], 0.5)
+        self.assertAlmostEqual(seconds_per_frame["C"], 0.3)  # median of A and B
+
+    def test_estimator_config_key(self):
+        """Test that the configuration key changes with the configuration, but not with the order of the keys."""
+        estimator = SimpleNamespace(config={"frame_stride": 1, "batch_size": 4})
+        same_estimator = SimpleNamespace(config={"batch_size": 4, "frame_stride": 1})
+        strided_estimator = SimpleNamespace(config={"frame_stride": 2, "batch_size": 4})
+
+        self.assertEqual(estimator_config_key(estimator), estimator_config_key(same_estimator))
+        self.assertNotEqual(estimator_config_key(estimator), estimator_config_key(strided_estimator))
+
+    def test_longest_job_first_reduces_makespan(self):
+        """Test that a long job at the end of the dataset is started first."""
+        jobs = [self.create_job("A", f"short{i}", 1.0) for i in range(4)] + [self.create_job("A", "long", 4.0)]
+        limits = {"A": 2}
+
+        in_dataset_order = simulate_schedule([self.create_job("A", j.video.get_filename(), j.predicted_cost) for j in jobs], limits, 2)
+        ordered_jobs = order_longest_job_first(jobs)
+        longest_first = simulate_schedule(ordered_jobs, limits, 2)
+
+        self.assertEqual(ordered_jobs[0].video.get_filename(), "long")
+        self.assertAlmostEqual(in_dataset_order, 6.0)
+        self.assertAlmostEqual(longest_first, 4.0)
+
+    def test_simulation_respects_concurrency_limits(self):
+        """Test that an estimator limited to one video runs its jobs one after another."""
+        jobs = order_longest_job_first([self.create_job("A", "v1", 2.0), self.create_job("A", "v2", 1.0), self.create_job("B", "v1", 1.0)])
+        makespan = simulate_schedule(jobs, {"A": 1, "B": 1}, max_workers=3)
+
+        self.assertAlmostEqual(makespan, 3.0)
+        job_starts = {(job.estimator.name, job.video.get_filename()): job.predicted_start for job in jobs}
+        self.assertAlmostEqual(job_starts[("B", "v1")], 0.0)  # B starts immediately although A is at its limit
+        self.assertAlmostEqual(job_starts[("A", "v2")], 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
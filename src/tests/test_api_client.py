@@ -0,0 +1,93 @@
+"""Tests for the HTTP client of the model containers, against a local stand-in server."""
+import io
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from api_client import ApiClient
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers with the uploaded body. The server attributes control failures and delays."""
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with server.lock:
+            server.num_requests += 1
+            server.inflight += 1
+            server.max_inflight = max(server.max_inflight, server.inflight)
+            fail = server.num_failures > 0
+            server.num_failures -= 1 if fail else 0
+        time.sleep(server.delay)
+        with server.lock:
+            server.inflight -= 1
+
+        try:
+            self.send_response(503 if fail else 200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up waiting (timeout test)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestApiClient(unittest.TestCase):
+    """Test cases for retries, timeouts and the bound on requests in flight."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.server.lock = threading.Lock()
+        self.server.num_requests = self.server.inflight = self.server.max_inflight = self.server.num_failures = 0
+        self.server.delay = 0
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/mask-video"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_temporary_errors_are_retried_with_rewound_files(self):
+        self.server.num_failures = 2
+        client = ApiClient("test", max_retries=2, retry_backoff=0.01)
+        response = client.post(self.url, files={"video": ("video.mp4", io.BytesIO(b"frame-data"), "video/mp4")})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"frame-data", response.content)
+        self.assertEqual(self.server.num_requests, 3)
+        client.close()
+
+    def test_error_response_is_returned_after_last_retry(self):
+        self.server.num_failures = 5
+        client = ApiClient("test", max_retries=1, retry_backoff=0.01)
+        self.assertEqual(client.post(self.url, data={"options": "{}"}).status_code, 503)
+        self.assertEqual(self.server.num_requests, 2)
+        client.close()
+
+    def test_requests_in_flight_are_bounded(self):
+        self.server.delay = 0.1
+        client = ApiClient("test", max_inflight_requests=2)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            responses = list(executor.map(lambda _: client.post(self.url, data={"options": "{}"}), range(6)))
+
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertEqual(self.server.max_inflight, 2)
+        client.close()
+
+    def test_timeout(self):
+        self.server.delay = 0.5
+        client = ApiClient("test", read_timeout=0.05, max_retries=0)
+        with self.assertRaises(requests.exceptions.Timeout):
+            client.post(self.url, data={"options": "{}"})
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
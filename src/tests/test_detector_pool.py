@@ -0,0 +1,105 @@
+"""Tests for the pool of pre-loaded detectors."""
+import itertools
+import threading
+import time
+import unittest
+
+from detector_pool import DetectorPool
+
+
+class FakeDetector:
+    def __init__(self, detector_id):
+        self.detector_id = detector_id
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestDetectorPool(unittest.TestCase):
+    """Test cases for checking out and replacing detectors."""
+
+    def setUp(self):
+        self.detector_ids = itertools.count()
+        self.created = []
+
+    def create_detector(self):
+        detector = FakeDetector(next(self.detector_ids))
+        self.created.append(detector)
+        return detector
+
+    def test_detectors_are_preloaded(self):
+        pool = DetectorPool(self.create_detector, size=2)
+        self.assertEqual(len(self.created), 2)
+        self.assertEqual(len(pool.load_times), 2)
+        pool.close()
+        self.assertTrue(all(detector.closed for detector in self.created))
+
+    def test_checked_in_detector_is_replaced(self):
+        """Test that a detector is never reused for a second video, but replaced by a fresh one."""
+        pool = DetectorPool(self.create_detector, size=1)
+        first = pool.checkout()
+        pool.checkin(first)
+        second = pool.checkout()
+
+        self.assertTrue(first.closed)
+        self.assertIsNot(first, second)
+        self.assertFalse(second.closed)
+        pool.checkin(second)
+        pool.close()
+
+    def test_checkout_blocks_until_detector_is_available(self):
+        pool = DetectorPool(self.create_detector, size=1)
+        first = pool.checkout()
+        checked_out = []
+        thread = threading.Thread(target=lambda: checked_out.append(pool.checkout()))
+        thread.start()
+        thread.join(timeout=0.2)
+        self.assertEqual(checked_out, [])
+
+        pool.checkin(first)
+        thread.join(timeout=5)
+        self.assertEqual(len(checked_out), 1)
+        pool.close()
+
+    def test_checked_in_detectors_are_refilled_concurrently(self):
+        """Test that the replacements of detectors checked in together are loaded at the same time."""
+        pool = DetectorPool(self.create_detector, size=2)
+        detectors = [pool.checkout(), pool.checkout()]
+        pool.create_detector = lambda: (time.sleep(0.2), self.create_detector())[1]
+        start_time = time.perf_counter()
+        for detector in detectors:
+            pool.checkin(detector)
+        refilled = [pool.checkout(), pool.checkout()]
+
+        self.assertLess(time.perf_counter() - start_time, 0.35)
+        self.assertGreaterEqual(pool.get_load_time(refilled[0]), 0.2)
+        self.assertEqual(len(pool.load_times), 4)
+        pool.close()
+
+    def test_checkin_after_close_does_not_refill(self):
+        """Test that a detector checked in after the pool is closed is closed without loading a replacement."""
+        pool = DetectorPool(self.create_detector, size=1)
+        detector = pool.checkout()
+        pool.close()
+        pool.checkin(detector)
+
+        self.assertTrue(detector.closed)
+        self.assertEqual(len(self.created), 1)
+
+    def test_failed_background_load_is_retried_on_checkout(self):
+        pool = DetectorPool(self.create_detector, size=1)
+        detector = pool.checkout()
+        create_detector = pool.create_detector
+        pool.create_detector = lambda: (_ for _ in ()).throw(RuntimeError("model not available"))
+        pool.checkin(detector)
+        pool._refill_executor.shutdown(wait=True)  # wait for the failed background load
+
+        with self.assertRaises(RuntimeError):
+            pool.checkout()
+        pool.create_detector = create_detector
+        self.assertFalse(pool.checkout().closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""Tests for converting keypoints between keypoint formats."""
+import unittest
+import numpy as np
+
+from keypoint_pairs import get_keypoint_format_mapping
+from utils import convert_keypoint_format
+from tests.utils import create_example_video_pose_result
+
+
+class TestKeypointFormats(unittest.TestCase):
+    """Test cases for the keypoint format registry and the array based conversion."""
+
+    def setUp(self):
+        # two frames, the second frame has two persons with 25 keypoints each
+        self.keypoints_data = [
+            [[(i + 1, i + 2) for i in range(25)]],
+            [[(i + 10, i + 20) for i in range(25)], [(i + 100, i + 200) for i in range(25)]],
+        ]
+        self.video = create_example_video_pose_result(self.keypoints_data)
+
+    def test_conversion_to_coco(self):
+        """Test that the conversion picks the BODY_25 keypoint of every COCO keypoint for all persons."""
+        # index of every COCO keypoint in BODY_25: nose, eyes, ears, shoulders, elbows, wrists, hips, knees, ankles
+        body25_indices = [0, 16, 15, 18, 17, 5, 2, 6, 3, 7, 4, 12, 9, 13, 10, 14, 11]
+        expected_keypoints = [
+            [[(i + 1, i + 2) for i in body25_indices]],
+            [[(i + 10, i + 20) for i in body25_indices], [(i + 100, i + 200) for i in body25_indices]],
+        ]
+
+        converted = convert_keypoint_format(self.video, "openpose_body25", "coco")
+        converted_keypoints = [[[(kp.x, kp.y) for kp in person.keypoints] for person in frame.persons] for frame in converted.frames]
+
+        self.assertEqual(converted_keypoints, expected_keypoints)
+        self.assertEqual(converted.to_numpy_ma().shape, (2, 2, 17, 2))
+
+    def test_conversion_between_formats_goes_through_coco(self):
+        """Test that keypoints which do not exist in COCO are undetected after the conversion."""
+        mapping = get_keypoint_format_mapping("coco", "openpose_body25")
+        self.assertEqual(len(mapping), 25)
+
+        coco_video = convert_keypoint_format(self.video, "openpose_body25", "coco")
+        round_trip = convert_keypoint_format(coco_video, "coco", "openpose_body25")
+        pose_array = round_trip.pose_array
+        is_coco_keypoint = mapping >= 0
+
+        np.testing.assert_array_equal(pose_array[:, :, is_coco_keypoint, :2], self.video.pose_array[:, :, is_coco_keypoint, :2])
+        self.assertTrue(np.all(pose_array[:, :, ~is_coco_keypoint, :2] == 0))
+        np.testing.assert_array_equal(round_trip.valid_mask, self.video.valid_mask)  # padded person stays invalid
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            get_keypoint_format_mapping("unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Tests for parsing MaskAnyone pose files into pose arrays."""
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import utils
+from inference import VideoPoseResult
+from scripts.benchmark_maskanyone_parser import convert_pose_data_to_nested_arrays
+
+
+def nested_reference(data, overlay_strategy):
+    frames = convert_pose_data_to_nested_arrays(data, overlay_strategy)
+    return VideoPoseResult(fps=10, frame_width=64, frame_height=48, frames=frames)
+
+
+class TestMaskAnyoneParser(unittest.TestCase):
+    """Test that the array parser gives the same result as the nested parser."""
+
+    def assert_same_as_nested(self, data, overlay_strategy):
+        pose_array, valid_mask, person_counts = utils.maskanyone_pose_data_to_arrays(data, overlay_strategy)
+        reference = nested_reference(data, overlay_strategy)
+        np.testing.assert_array_equal(pose_array, reference.pose_array)
+        np.testing.assert_array_equal(valid_mask, reference.valid_mask)
+        np.testing.assert_array_equal(person_counts, reference.person_counts)
+        return pose_array, valid_mask, person_counts
+
+    def test_mediapipe(self):
+        data = {
+            "0": [[[float(frame_idx), 1.0, 0.5, 0.9]] * 3 for frame_idx in range(4)],
+            "1": [None, [[5.0, 6.0, 0.5, 0.9]] * 3, None, [[7.0, 8.0, 0.5, 0.9]] * 3],
+        }
+        pose_array, _, person_counts = self.assert_same_as_nested(data, "mp_pose")
+        np.testing.assert_array_equal(person_counts, [1, 2, 1, 2])
+        self.assertEqual(pose_array[3, 1, 0, 0], 7.0)
+        self.assertTrue(np.isnan(pose_array[..., 2]).all())
+
+    def test_openpose(self):
+        data = {
+            "0": [{"pose_keypoints": [[1, 2, 0.8]] * 25, "face_keypoints": []}, None, {"pose_keypoints": None}],
+            "1": [None, {"pose_keypoints": [[3, 4, 0.8]] * 25}, {"pose_keypoints": [[5, 6, 0.8]] * 25}],
+        }
+        _, _, person_counts = self.assert_same_as_nested(data, "openpose")
+        np.testing.assert_array_equal(person_counts, [1, 1, 1])
+
+    def test_empty_keypoints(self):
+        """Empty keypoints are stored as (0, 0), empty keypoint lists still count as a person."""
+        data = {
+            "0": [[[1, 2], [], [3, 4]], [], [[1, 2], [3, 4], [5, 6]]],
+            "1": [[[7, 8]], None, None],
+        }
+        pose_array, valid_mask, person_counts = self.assert_same_as_nested(data, "mp_pose")
+        np.testing.assert_array_equal(pose_array[0, 0, 1, :2], [0, 0])
+        np.testing.assert_array_equal(person_counts, [2, 1, 1])
+        self.assertFalse(valid_mask[1].any())
+
+    def test_no_persons(self):
+        pose_array, _, person_counts = utils.maskanyone_pose_data_to_arrays({"0": [None, None]}, "mp_pose")
+        self.assertEqual(pose_array.shape, (2, 0, 0, 3))
+        np.testing.assert_array_equal(person_counts, [0, 0])
+
+    def test_invalid_overlay_strategy(self):
+        with self.assertRaises(ValueError):
+            utils.maskanyone_pose_data_to_arrays({"0": [None]}, "yolo")
+
+    def test_combine_json_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for chunk_num, num_frames in [(2, 3), (10, 2), (1, 4)]:  # sorted by the chunk number, not the file name
+                data = {"0": [[[float(chunk_num), float(frame_idx)]] * 2 for frame_idx in range(num_frames)]}
+                with open(os.path.join(temp_dir, f"chunk_{chunk_num}.json"), "w") as f:
+                    json.dump(data, f)
+
+            pose_array, valid_mask, person_counts = utils.maskanyone_combine_json_files(temp_dir, "mp_pose")
+
+        np.testing.assert_array_equal(pose_array[:, 0, 0, 0], [1, 1, 1, 1, 2, 2, 2, 10, 10])
+        np.testing.assert_array_equal(person_counts, [1] * 9)
+        self.assertTrue(valid_mask.all())
+
+
+if __name__ == '__main__':
+    unittest.main()
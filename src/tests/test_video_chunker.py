@@ -0,0 +1,100 @@
+"""Tests for splitting videos into chunks."""
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from video_chunker import ChunkPlan, VideoChunker, plan_chunks
+
+
+class TestVideoChunker(unittest.TestCase):
+    """Test cases for chunking a video into time windows."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.video_path = os.path.join(self.temp_dir.name, "video.avi")
+        writer = cv2.VideoWriter(self.video_path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+        for _ in range(25):
+            writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+        writer.release()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def count_frames(self, video_path):
+        cap = cv2.VideoCapture(video_path)
+        num_frames = 0
+        while cap.read()[0]:
+            num_frames += 1
+        cap.release()
+        return num_frames
+
+    def test_chunks_are_yielded_when_written(self):
+        """Test that every yielded chunk is complete before the next chunk is written."""
+        output_dir = os.path.join(self.temp_dir.name, "chunks")
+        chunk_frame_counts = []
+        for chunk in VideoChunker(chunk_length=1).iter_chunks_using_opencv(self.video_path, output_dir):
+            chunk_frame_counts.append(self.count_frames(chunk.path))
+            self.assertEqual(len(os.listdir(output_dir)), len(chunk_frame_counts))
+            self.assertEqual(chunk.chunk_index, len(chunk_frame_counts) - 1)
+            self.assertEqual(chunk.num_frames, chunk_frame_counts[-1])
+            self.assertEqual(chunk.start_frame, sum(chunk_frame_counts[:-1]))
+
+        self.assertEqual(chunk_frame_counts, [10, 10, 5])
+
+    def test_iter_chunks_returns_all_chunks(self):
+        chunks = VideoChunker(chunk_length=1).iter_chunks(self.video_path, os.path.join(self.temp_dir.name, "chunks"))
+        self.assertEqual([os.path.basename(chunk.path) for chunk in chunks], ["chunk_1.mp4", "chunk_2.mp4", "chunk_3.mp4"])
+
+    @unittest.skipUnless(shutil.which("ffmpeg") and shutil.which("ffprobe"), "ffmpeg is not installed")
+    def test_ffmpeg_chunks_contain_all_frames(self):
+        """Test that stream copied chunks contain every frame exactly once (MJPG frames are all keyframes)."""
+        chunks = list(VideoChunker(chunk_length=1, backend="ffmpeg").iter_chunks(self.video_path, os.path.join(self.temp_dir.name, "chunks")))
+        self.assertEqual([self.count_frames(chunk.path) for chunk in chunks], [10, 10, 5])
+        self.assertEqual([chunk.start_frame for chunk in chunks], [0, 10, 20])
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            VideoChunker(chunk_length=1, backend="gstreamer")
+
+
+class TestPlanChunks(unittest.TestCase):
+    """Test cases for splitting a video into chunks at keyframes."""
+
+    def test_groups_of_pictures_are_merged_up_to_chunk_length(self):
+        chunks = plan_chunks([0, 4, 8, 12, 16], num_frames=20, num_chunk_frames=10)
+        self.assertEqual(chunks, [ChunkPlan(0, 8, True), ChunkPlan(8, 16, True), ChunkPlan(16, 20, True)])
+
+    def test_keyframes_at_chunk_length(self):
+        chunks = plan_chunks(list(range(0, 25, 5)), num_frames=25, num_chunk_frames=10)
+        self.assertEqual(chunks, [ChunkPlan(0, 10, True), ChunkPlan(10, 20, True), ChunkPlan(20, 25, True)])
+
+    def test_long_group_of_pictures_is_cut_frame_exactly(self):
+        """Only the group of pictures that is longer than a chunk is re-encoded."""
+        chunks = plan_chunks([0, 3, 28], num_frames=30, num_chunk_frames=10)
+        self.assertEqual(chunks, [
+            ChunkPlan(0, 3, True),
+            ChunkPlan(3, 13, False), ChunkPlan(13, 23, False), ChunkPlan(23, 28, False),
+            ChunkPlan(28, 30, True),
+        ])
+
+    def test_frames_before_first_keyframe_are_re_encoded(self):
+        chunks = plan_chunks([2, 6], num_frames=8, num_chunk_frames=10)
+        self.assertEqual(chunks, [ChunkPlan(0, 2, False), ChunkPlan(2, 8, True)])
+
+    def test_chunks_cover_all_frames(self):
+        keyframes = [0, 7, 9, 31, 33, 34, 60, 95]
+        chunks = plan_chunks(keyframes, num_frames=100, num_chunk_frames=12)
+        self.assertEqual(chunks[0].start_frame, 0)
+        self.assertEqual(chunks[-1].end_frame, 100)
+        for chunk, next_chunk in zip(chunks[:-1], chunks[1:]):
+            self.assertEqual(chunk.end_frame, next_chunk.start_frame)
+        self.assertTrue(all(0 < chunk.num_frames <= 12 for chunk in chunks))
+        self.assertTrue(all(chunk.start_frame in keyframes for chunk in chunks if chunk.stream_copy))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Tests for the persistent video metadata cache."""
+import os
+import tempfile
+import unittest
+
+from video_metadata_cache import VideoMetadataCache
+
+
+class TestVideoMetadataCache(unittest.TestCase):
+    """Test cases for caching video metadata across runs."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "video_metadata_cache.jsonl")
+        self.video_paths = []
+        for video_idx in range(3):
+            video_path = os.path.join(self.temp_dir.name, f"video_{video_idx}.mp4")
+            with open(video_path, "wb") as f:
+                f.write(b"0" * (video_idx + 1))
+            self.video_paths.append(video_path)
+        self.probed_paths = []
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def probe(self, video_path):
+        self.probed_paths.append(video_path)
+        return {"width": 1920, "height": 1080, "fps": 30, "frame_count": 300, "duration": 10.0}
+
+    def test_metadata_is_persisted(self):
+        """Test that a video is only probed once, also by a new cache instance reading the same file."""
+        cache = VideoMetadataCache(self.cache_path, self.probe)
+        metadata = cache.get(self.video_paths[0])
+        cache.get(self.video_paths[0])
+
+        reloaded_cache = VideoMetadataCache(self.cache_path, self.probe)
+        reloaded_metadata = reloaded_cache.get(self.video_paths[0])
+
+        self.assertEqual(self.probed_paths, [self.video_paths[0]])
+        self.assertEqual(metadata, reloaded_metadata)
+        self.assertEqual(metadata["frame_count"], 300)
+
+    def test_changed_video_is_probed_again(self):
+        """Test that the cache entry is invalidated when the size or modification time of the video changes."""
+        cache = VideoMetadataCache(self.cache_path, self.probe)
+        cache.get(self.video_paths[0])
+        with open(self.video_paths[0], "ab") as f:
+            f.write(b"more data")
+
+        self.assertIsNone(cache.peek(self.video_paths[0]))
+        cache.get(self.video_paths[0])
+        self.assertEqual(len(self.probed_paths), 2)
+
+    def test_fill_probes_missing_videos(self):
+        """Test that filling the cache probes every missing video once."""
+        cache = VideoMetadataCache(self.cache_path, self.probe)
+        cache.get(self.video_paths[0])
+        all_metadata = cache.fill(self.video_paths, max_workers=2)
+
+        self.assertEqual(sorted(self.probed_paths), sorted(self.video_paths))
+        self.assertEqual(list(all_metadata), self.video_paths)
+        with open(self.cache_path, "r") as f:
+            self.assertEqual(len(f.readlines()), 3)  # one line per video, the cache file is appended to and not rewritten
+
+    def test_entries_of_other_processes_are_read(self):
+        """Test that entries appended by another cache instance after the first read are found without probing."""
+        cache = VideoMetadataCache(self.cache_path, self.probe)
+        other_cache = VideoMetadataCache(self.cache_path, self.probe)
+        cache.get(self.video_paths[0])
+        other_cache.get(self.video_paths[1])
+        cache.get(self.video_paths[1])
+
+        self.assertEqual(self.probed_paths, self.video_paths[:2])
+
+    def test_transient_video_is_not_probed_or_persisted(self):
+        """Test that the registered metadata of a temporary video is returned without probing or writing it."""
+        cache = VideoMetadataCache(self.cache_path, self.probe)
+        metadata = {"width": 64, "height": 48, "fps": 5, "frame_count": 4, "duration": 0.8}
+        cache.add_transient(self.video_paths[0], metadata)
+
+        self.assertEqual(cache.get(self.video_paths[0]), metadata)
+        self.assertEqual(self.probed_paths, [])
+        self.assertFalse(os.path.exists(self.cache_path))
+
+        cache.remove_transient(self.video_paths[0])
+        self.assertIsNone(cache.peek(self.video_paths[0]))
+
+    def test_unwritable_cache_is_kept_in_memory(self):
+        """Test that a cache file in a missing directory does not break probing."""
+        cache = VideoMetadataCache(os.path.join(self.temp_dir.name, "missing", "cache.jsonl"), self.probe)
+        cache.get(self.video_paths[0])
+        cache.get(self.video_paths[0])
+
+        self.assertEqual(len(self.probed_paths), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
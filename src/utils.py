@@ -3,8 +3,18 @@ import cv2
 import glob
 import os
 import json
-from typing import List
-from inference import FramePoseResult, PersonPoseResult, PoseKeypoint
+from typing import Optional, Tuple
+import numpy as np
+from inference import VideoPoseResult
+from inference.chunk_result import ChunkResult, ChunkResultCollector
+from keypoint_pairs import get_keypoint_format_mapping
+from video_metadata_cache import VideoMetadataCache
+
+try:
+    import orjson  # optional, parses the large pose files of MaskAnyone several times faster than the json module
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 def get_color_palette() -> list:
     return [
@@ -18,15 +28,46 @@ def get_color_palette() -> list:
         '#DDAA33', # yellow
     ]
 
-def convert_keypoints_to_coco_format(frame_results: List[FramePoseResult], model_to_coco_mapping: list) -> List[FramePoseResult]:
-    for frame in frame_results: 
-        if frame and frame.persons: # ensuring they are not None
-            for person in frame.persons:
-                if len(person.keypoints): # person is either [] or contains all keypoints
-                    coco_keypoints = [person.keypoints[idx] for idx in model_to_coco_mapping]
-                    person.keypoints = coco_keypoints 
-    
-    return frame_results
+def convert_keypoint_format(video_pose_result: VideoPoseResult, source_format: str, target_format: str = "coco") -> VideoPoseResult:
+    """
+    Convert the keypoints of a video pose result between two keypoint formats registered in keypoint_pairs.py.
+    The conversion is a single gather over the pose array. Keypoints of the target format that do not exist in COCO
+    are set to undetected (x=0, y=0, confidence=None).
+
+    Args:
+        video_pose_result (VideoPoseResult): The pose result in the source format.
+        source_format (str): Name of the keypoint format of the pose result (e.g. "mediapipe", "openpose_body25").
+        target_format (str): Name of the keypoint format to convert to. Defaults to "coco".
+
+    Returns:
+        VideoPoseResult: A new pose result in the target format.
+    """
+    mapping = get_keypoint_format_mapping(source_format, target_format)
+    pose_array = video_pose_result.pose_array
+    valid_mask = video_pose_result.valid_mask
+
+    if pose_array.shape[2] == 0:  # no person in the whole video
+        converted_pose_array = np.zeros(pose_array.shape[:2] + (len(mapping), 3), dtype=np.float32)
+        converted_pose_array[..., 2] = np.nan
+        converted_valid_mask = np.zeros(converted_pose_array.shape[:3], dtype=bool)
+    else:
+        is_missing = mapping < 0
+        gather_indices = np.where(is_missing, 0, mapping)
+        converted_pose_array = pose_array[:, :, gather_indices]
+        converted_pose_array[:, :, is_missing] = (0, 0, np.nan)
+        converted_valid_mask = valid_mask[:, :, gather_indices]
+        converted_valid_mask[:, :, is_missing] = valid_mask.any(axis=-1)[:, :, np.newaxis]  # persons keep all keypoints
+
+    return VideoPoseResult(
+        fps=video_pose_result.fps,
+        frame_width=video_pose_result.frame_width,
+        frame_height=video_pose_result.frame_height,
+        video_name=video_pose_result.video_name,
+        pose_array=converted_pose_array,
+        valid_mask=converted_valid_mask,
+        person_counts=video_pose_result.person_counts,
+        interpolated_frames=video_pose_result.interpolated_frames,
+    )
 
 def maskanyone_get_config(options: dict):
         """"Ensures MaskAnyone overlay strategy is valid. Sets hiding strategy to 'none', because it is not used by MaskBench."""
@@ -42,66 +83,117 @@ def maskanyone_get_config(options: dict):
         
         return options
 
-def maskanyone_combine_json_files(processed_chunks_dir: str, overlay_strategy: str) -> list:
+def maskanyone_combine_json_files(processed_chunks_dir: str, overlay_strategy: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
             Combine JSON files from Mask Anyone Ui dataset into a standardized format.
             processed_chunks_dir: Directory containing Json file for video chunks
+            Returns the pose array, valid mask and person counts of all chunks (see maskanyone_pose_data_to_arrays).
         """
         json_file_paths = glob.glob(os.path.join(processed_chunks_dir, "*.json"))
         # Expected chunk file path dataset/video_name/chunk_x.json where x is chunk number
         json_file_paths = sorted(json_file_paths, key=lambda x: int(os.path.basename(x).split('_')[1].split('.')[0])) # sort them by chunk number
-        all_chunks_keypoints = []  # combined keypoints for all frames all persons
-
-        for chunk_file in json_file_paths:
-            frame_results = maskanyone_convert_json_to_nested_arrays(chunk_file, overlay_strategy)
-            all_chunks_keypoints.extend(frame_results)
-
-        return all_chunks_keypoints
-
-def maskanyone_convert_json_to_nested_arrays(json_pose_file: str, overlay_strategy: str) -> list:
-        with open(json_pose_file, 'r') as f: 
-            data = json.load(f)
-            first_person_data = next(iter(data.values()))
-            number_of_frames = len(first_person_data)
-            
-            frame_results = [FramePoseResult(persons=[], frame_idx=i) for i in range(number_of_frames)]
-            
-            for person_idx, data_person_keypoints in data.items():
-                frames = []
-                for frame_idx, data_frame_keypoints in enumerate(data_person_keypoints):
-                    keypoints = []
-                    if data_frame_keypoints is None:
-                         frames.append(keypoints)
-                         continue
-
-                    # The output of MaskAnyone API for a frame is different for MediaPipe and OpenPose:
-                    # For Openpose, the frame output is a dictionary with a key "pose_keypoints" (and other keys like "face_keypoints", "hand_keypoints")
-                    # For MediaPipe, the frame output is a list of keypoints
-                    if overlay_strategy == "openpose_body25b" or overlay_strategy == "openpose":
-                        data_pose_keypoints = data_frame_keypoints.get("pose_keypoints", None)
-                    elif overlay_strategy == "mp_pose": 
-                        data_pose_keypoints = data_frame_keypoints
-                    else:
-                         raise ValueError(f"Invalid overlay strategy provided to maskanyone_combine_json_files in utils.py") 
-
-                    if data_pose_keypoints is None:
-                        continue
-
-                    for keypoint in data_pose_keypoints:
-                        if not keypoint:
-                            keypoints.append(PoseKeypoint(x=0, y=0))
-                            continue
-
-                        keypoints.append(PoseKeypoint(x=keypoint[0], y=keypoint[1]))
-                    
-                    frame_results[frame_idx].persons.append(PersonPoseResult(keypoints=keypoints))
-            
-            return frame_results
 
+        with ChunkResultCollector() as chunk_results:
+            frame_offset = 0
+            for chunk_index, chunk_file in enumerate(json_file_paths):
+                chunk_result = ChunkResult(chunk_index, frame_offset, *maskanyone_read_pose_arrays(chunk_file, overlay_strategy))
+                chunk_results.add(chunk_result)
+                frame_offset += chunk_result.num_frames
+            combined_result = chunk_results.to_video_pose_result(fps=0, frame_width=0, frame_height=0)
+
+        return combined_result.pose_array, combined_result.valid_mask, combined_result.person_counts
+
+def maskanyone_load_pose_data(content) -> dict:
+        """Parse the content (bytes or str) of a MaskAnyone pose file, with orjson if it is installed."""
+        return _json_loads(content)
+
+def maskanyone_read_pose_arrays(json_pose_file: str, overlay_strategy: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with open(json_pose_file, 'rb') as f:
+            data = maskanyone_load_pose_data(f.read())
+        return maskanyone_pose_data_to_arrays(data, overlay_strategy)
+
+def maskanyone_pose_data_to_arrays(data: dict, overlay_strategy: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Convert the parsed content of a MaskAnyone pose file (persons mapped to per-frame keypoints) directly to the pose
+        arrays of a VideoPoseResult, without creating PoseKeypoint objects. The result is the same as building a
+        VideoPoseResult from nested PoseKeypoint objects (see scripts/benchmark_maskanyone_parser.py): in every frame, the persons that are present
+        (frame data and pose keypoints not None) fill the person slots in file order, empty keypoints are stored as (0, 0)
+        and all confidences are NaN. The keypoints of a person are converted with one numpy call for all frames. If the
+        keypoints of a person are irregular, they are converted per frame, and only frames with an irregular number of
+        keypoints or empty keypoints are filled keypoint by keypoint.
+
+        Args:
+            data (dict): The parsed pose file.
+            overlay_strategy (str): One of "mp_pose", "openpose_body25b" and "openpose".
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Pose array of shape (frames, persons, keypoints, 3), valid mask of
+                shape (frames, persons, keypoints) and person counts of shape (frames,).
+        """
+        # The output of MaskAnyone API for a frame is different for MediaPipe and OpenPose:
+        # For Openpose, the frame output is a dictionary with a key "pose_keypoints" (and other keys like "face_keypoints", "hand_keypoints")
+        # For MediaPipe, the frame output is a list of keypoints
+        if overlay_strategy == "openpose_body25b" or overlay_strategy == "openpose":
+            persons = [[None if frame_data is None else frame_data.get("pose_keypoints") for frame_data in person_frames] for person_frames in data.values()]
+        elif overlay_strategy == "mp_pose":
+            persons = list(data.values())
+        else:
+            raise ValueError(f"Invalid overlay strategy provided to maskanyone_pose_data_to_arrays in utils.py")
+
+        num_frames = len(persons[0]) if persons else 0
+        person_counts = np.zeros(num_frames, dtype=np.int32)
+        person_frames = []  # per person: indices of the frames the person is present in and its slot in these frames
+        num_keypoints = 0
+        for person_keypoints in persons:
+            if len(person_keypoints) > num_frames:
+                raise ValueError(f"MaskAnyone pose file has {len(person_keypoints)} frames for a person, but {num_frames} frames for the first person")
+            is_present = np.fromiter((keypoints is not None for keypoints in person_keypoints), dtype=bool, count=len(person_keypoints))
+            frame_indices = np.flatnonzero(is_present)
+            person_frames.append((frame_indices, person_counts[frame_indices].copy()))
+            person_counts[frame_indices] += 1
+            num_keypoints = max(num_keypoints, max((len(person_keypoints[frame_idx]) for frame_idx in frame_indices), default=0))
+
+        max_persons = int(person_counts.max()) if num_frames else 0
+        pose_array = np.zeros((num_frames, max_persons, num_keypoints, 3), dtype=np.float32)
+        pose_array[..., 2] = np.nan
+        valid_mask = np.zeros((num_frames, max_persons, num_keypoints), dtype=bool)
+
+        for person_keypoints, (frame_indices, slots) in zip(persons, person_frames):
+            if len(frame_indices) == 0:
+                continue
+            coordinates = _maskanyone_keypoint_coordinates([person_keypoints[frame_idx] for frame_idx in frame_indices])
+            if coordinates is not None:
+                pose_array[frame_indices, slots, :coordinates.shape[1], :2] = coordinates
+                valid_mask[frame_indices, slots, :coordinates.shape[1]] = True
+                continue
+
+            for frame_idx, slot in zip(frame_indices, slots):
+                keypoints = person_keypoints[frame_idx]
+                valid_mask[frame_idx, slot, :len(keypoints)] = True
+                coordinates = _maskanyone_keypoint_coordinates([keypoints])
+                if coordinates is not None:
+                    pose_array[frame_idx, slot, :coordinates.shape[1], :2] = coordinates[0]
+                    continue
+                for keypoint_idx, keypoint in enumerate(keypoints):
+                    if keypoint:
+                        pose_array[frame_idx, slot, keypoint_idx, :2] = keypoint[:2]
+
+        return pose_array, valid_mask, person_counts
+
+def _maskanyone_keypoint_coordinates(frame_keypoints: list) -> Optional[np.ndarray]:
+        """Returns the x and y coordinates of shape (frames, keypoints, 2), or None if the keypoints are not a regular array."""
+        try:
+            coordinates = np.array(frame_keypoints, dtype=np.float32)
+        except (ValueError, TypeError):
+            return None  # irregular number of keypoints or empty keypoints
+        if coordinates.ndim != 3 or coordinates.shape[2] < 2 or np.isnan(coordinates[..., :2]).any():
+            return None
+        return coordinates[..., :2]
 
 def get_video_metadata(video_path: str) -> tuple[cv2.VideoCapture, dict]:
     """
     Get metadata of a video capture object.
+    The metadata is read from the video metadata cache, so the video is only decoded to count its frames the first time.
 
     Args:
         video_path (str): The path to the video file.
@@ -112,18 +204,68 @@ def get_video_metadata(video_path: str) -> tuple[cv2.VideoCapture, dict]:
     """
     cap = cv2.VideoCapture(video_path)
 
+    if not cap.isOpened():
+        raise ValueError("Video capture is not opened.")
+
+    metadata = video_metadata_cache.get(video_path)
+
+    return cap, metadata
+
+def probe_video_metadata(video_path: str) -> dict:
+    """
+    Read the metadata of a video without using the cache. Counting the frames decodes the whole video.
+
+    Args:
+        video_path (str): The path to the video file.
+
+    Returns:
+        dict: A dictionary containing the video's width, height, fps, duration and frame_count.
+    """
+    cap = cv2.VideoCapture(video_path)
+
     if not cap.isOpened():
         raise ValueError("Video capture is not opened.")
 
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = int(cap.get(cv2.CAP_PROP_FPS))
+    cap.release()
     frame_count = get_frame_count_ffprobe(video_path)
     duration = frame_count / fps if fps > 0 else 0
 
-    metadata = {"width": width, "height": height, "fps": fps, "duration": duration, "frame_count": frame_count}
+    return {"width": width, "height": height, "fps": fps, "duration": duration, "frame_count": frame_count}
 
-    return cap, metadata
+def read_video_header(video_path: str) -> dict:
+    """
+    Read the metadata of a video from the container header without decoding it.
+    The frame count of the header can be inaccurate for some videos (see get_frame_count_ffprobe), it is only
+    used for estimates like scheduling and the dataset summary.
+
+    Args:
+        video_path (str): The path to the video file.
+
+    Returns:
+        dict: A dictionary containing the video's width, height, fps, duration and frame_count.
+    """
+    cap = cv2.VideoCapture(video_path)
+
+    if not cap.isOpened():
+        raise ValueError(f"Video capture is not opened: {video_path}")
+
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    frame_count = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+    cap.release()
+    duration = frame_count / fps if fps > 0 else 0
+
+    return {"width": width, "height": height, "fps": fps, "duration": duration, "frame_count": frame_count}
+
+# Shared cache of the video metadata, the location can be changed with video_metadata_cache.set_cache_path
+video_metadata_cache = VideoMetadataCache(
+    os.getenv("MASKBENCH_VIDEO_METADATA_CACHE", "/output/video_metadata_cache.jsonl"),
+    probe_video_metadata,
+)
 
 def get_frame_count_ffprobe(video_path: str) -> int:
     """
@@ -153,3 +295,21 @@ def get_frame_count_ffprobe(video_path: str) -> int:
         raise RuntimeError(f"ffprobe failed: {e.stderr.strip()}")
     except ValueError:
         raise RuntimeError("Could not parse frame count from ffprobe output.")
+
+def append_json_line(path: str, record: dict, cls: Optional[type] = None):
+    """
+    Appends the record as a single line to a JSON-lines file, creating the file if it does not exist.
+    The line is written with a single write to a file opened with O_APPEND, which moves the offset to the end of the
+    file atomically, so that threads and processes appending to the same file do not overwrite each other's lines.
+
+    Args:
+        path (str): Path to the JSON-lines file.
+        record (dict): The record to append.
+        cls (type, optional): JSON encoder class used to serialize the record (e.g. `checkpointer.NumpyEncoder`).
+    """
+    line = (json.dumps(record, cls=cls) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
@@ -1,33 +1,113 @@
+import logging
 import os
+import shutil
+import subprocess
+import tempfile
+from typing import Iterator, List, NamedTuple
+
 import cv2
 
+CHUNKING_BACKENDS = ["opencv", "ffmpeg"]
+
+
+class VideoChunk(NamedTuple):
+    """A chunk file written by the VideoChunker, with its position in the video."""
+    chunk_index: int  # starting at 0
+    path: str
+    start_frame: int
+    num_frames: int
+
+
+class ChunkPlan(NamedTuple):
+    """Frames [start_frame, end_frame) of a chunk. Stream copied chunks start at a keyframe, the others are re-encoded."""
+    start_frame: int
+    end_frame: int
+    stream_copy: bool
+
+    @property
+    def num_frames(self) -> int:
+        return self.end_frame - self.start_frame
+
+
+def plan_chunks(keyframe_indices: List[int], num_frames: int, num_chunk_frames: int) -> List[ChunkPlan]:
+    """
+    Split a video into chunks at keyframes, so that the chunks can be cut without re-encoding.
+    Consecutive groups of pictures (the frames from one keyframe up to the next) are merged as long as the chunk
+    has at most `num_chunk_frames` frames, so the chunks are at most as long as requested. Only groups of pictures
+    that are longer than a chunk (and frames before the first keyframe) cannot be stream copied. They are cut
+    frame-exactly into chunks of `num_chunk_frames` frames, which have to be re-encoded.
+
+    Args:
+        keyframe_indices (List[int]): Indices of the keyframes in presentation order.
+        num_frames (int): Number of frames in the video.
+        num_chunk_frames (int): Maximum number of frames of a chunk.
+
+    Returns:
+        List[ChunkPlan]: The chunks in order, covering all frames of the video.
+    """
+    num_chunk_frames = max(1, num_chunk_frames)
+    boundaries = sorted({0, num_frames} | {idx for idx in keyframe_indices if 0 < idx < num_frames})
+    keyframes = set(keyframe_indices)
+
+    chunks = []
+    current_start = None  # start of the stream copied chunk that is being extended
+    for gop_start, gop_end in zip(boundaries[:-1], boundaries[1:]):
+        if current_start is not None and gop_end - current_start <= num_chunk_frames:
+            continue  # extend the current chunk by this group of pictures
+        if current_start is not None:
+            chunks.append(ChunkPlan(current_start, gop_start, True))
+            current_start = None
+
+        if gop_start in keyframes and gop_end - gop_start <= num_chunk_frames:
+            current_start = gop_start
+        else:
+            chunks.extend(
+                ChunkPlan(start, min(start + num_chunk_frames, gop_end), False)
+                for start in range(gop_start, gop_end, num_chunk_frames)
+            )
+
+    if current_start is not None:
+        chunks.append(ChunkPlan(current_start, num_frames, True))
+    return chunks
+
 
 class VideoChunker:
-    def __init__(self, chunk_length: int):
+    def __init__(self, chunk_length: int, backend: str = "opencv"):
         """
         Initialize the VideoChunker with a specified chunk length.
 
         Args:
             chunk_length (int): The length of each video chunk in seconds.
-            slide (int): The overlap duration of chunks in seconds. Default is 0.
+            backend (str): "opencv" (default) re-encodes all frames into chunks of exactly chunk_length seconds.
+                "ffmpeg" cuts the video at keyframes without re-encoding (see `iter_chunks_using_ffmpeg`).
         """
+        if backend not in CHUNKING_BACKENDS:
+            raise ValueError(f"Invalid chunking backend: {backend}. Valid options are: {CHUNKING_BACKENDS}")
         self.chunk_length = chunk_length
+        self.backend = backend
+
+    def iter_chunks(self, video_path: str, output_path: str) -> Iterator[VideoChunk]:
+        """Yields the chunks in order, using the configured backend."""
+        if self.backend == "ffmpeg":
+            if shutil.which("ffmpeg") and shutil.which("ffprobe"):
+                return self.iter_chunks_using_ffmpeg(video_path, output_path)
+            print("Warning: ffmpeg is not installed, chunking the video with OpenCV instead.")
+            logging.warning("ffmpeg is not installed, falling back to the OpenCV chunking backend")
+        return self.iter_chunks_using_opencv(video_path, output_path)
 
-    def chunk_video_using_opencv(self, video_path: str, output_path: str) -> list:
+    def iter_chunks_using_opencv(self, video_path: str, output_path: str) -> Iterator[VideoChunk]:
         """
         Chunk the video into smaller segments of specified length using OpenCV.
         For videos shorter than chunk_length, the entire video will be kept as one chunk.
         For videos longer than chunk_length, they will be split into chunks of chunk_length seconds.
+        Every chunk is yielded as soon as it is completely written, so that chunks can be processed while the next
+        chunks are still being written.
 
         Args:
             video_path (str): The path to the video file relative to the datasets directory.
             output_path (str): The directory to save the video chunks.
-
-        Returns:
-            list: A list of video file chunks.
         """
         os.makedirs(output_path, exist_ok=True)
-        chunk_paths = []
 
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
@@ -43,30 +123,186 @@ class VideoChunker:
         chunk_num = 1
         video_writer = None
         frame_idx = 0
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+
+                if video_writer is None:
+                    chunk_path = os.path.join(output_path, f"chunk_{chunk_num}.mp4")
+                    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+                    video_writer = cv2.VideoWriter(chunk_path, fourcc, fps, (width, height))
 
-            if video_writer is None:
-                chunk_path = os.path.join(output_path, f"chunk_{chunk_num}.mp4")
-                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-                video_writer = cv2.VideoWriter(chunk_path, fourcc, fps, (width, height))
-                chunk_paths.append(chunk_path)
+                video_writer.write(frame)
+                frames_written_in_current_chunk += 1
 
-            video_writer.write(frame)
-            frames_written_in_current_chunk += 1
+                if frames_written_in_current_chunk >= num_chunk_frames:
+                    video_writer.release()
+                    video_writer = None
+                    yield VideoChunk(chunk_num - 1, chunk_path, frame_idx + 1 - frames_written_in_current_chunk, frames_written_in_current_chunk)
+                    frames_written_in_current_chunk = 0
+                    chunk_num += 1
 
-            if frames_written_in_current_chunk >= num_chunk_frames:
+                frame_idx += 1
+
+            if video_writer is not None:
                 video_writer.release()
                 video_writer = None
-                frames_written_in_current_chunk = 0
-                chunk_num += 1
+                yield VideoChunk(chunk_num - 1, chunk_path, frame_idx - frames_written_in_current_chunk, frames_written_in_current_chunk)
+        finally:  # also runs if the consumer stops early
+            cap.release()
+            if video_writer is not None:
+                video_writer.release()
 
-            frame_idx += 1
+    def iter_chunks_using_ffmpeg(self, video_path: str, output_path: str) -> Iterator[VideoChunk]:
+        """
+        Chunk the video without re-encoding, using the ffmpeg segment muxer with stream copy.
+        The chunks are cut at keyframes, so they are at most chunk_length seconds long, but usually shorter
+        (see `plan_chunks`). Only where the keyframes are further apart than chunk_length, the frames are cut
+        frame-exactly and re-encoded with OpenCV. The frame count of every chunk is verified against the plan, a stream
+        copied chunk with missing or additional frames (e.g. due to broken timestamps) is re-encoded as well.
+        Stream copied chunks keep the container format of the video, re-encoded chunks are mp4 files.
 
-        if video_writer is not None:
-            video_writer.release()
+        Args:
+            video_path (str): The path to the video file.
+            output_path (str): The directory to save the video chunks.
 
+        Yields:
+            VideoChunk: Every chunk, once it is completely written and verified.
+        """
+        os.makedirs(output_path, exist_ok=True)
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_path}")
+        fps = int(cap.get(cv2.CAP_PROP_FPS))
         cap.release()
-        return chunk_paths
+
+        keyframe_indices, num_frames = _probe_keyframes(video_path)
+        chunks = plan_chunks(keyframe_indices, num_frames, int(self.chunk_length * fps))
+        extension = os.path.splitext(video_path)[1] or ".mp4"
+
+        with tempfile.TemporaryDirectory(dir=output_path) as segment_dir:
+            # every stream copied chunk and every group of pictures that is re-encoded starts at a keyframe,
+            # so the segment muxer creates exactly one segment for each of them
+            split_frames = sorted({chunk.start_frame for chunk in chunks if chunk.start_frame in set(keyframe_indices)} - {0})
+            segment_pattern = os.path.join(segment_dir, f"segment_%05d{extension}")
+            _split_into_segments(video_path, split_frames, segment_pattern)
+            segment_starts = [0] + split_frames
+
+            num_verified_frames = 0
+            for chunk_num, chunk in enumerate(chunks, start=1):
+                chunk_path = None
+                if chunk.stream_copy:
+                    chunk_path = os.path.join(output_path, f"chunk_{chunk_num}{extension}")
+                    os.replace(segment_pattern % segment_starts.index(chunk.start_frame), chunk_path)
+                    num_chunk_frames = _count_frames(chunk_path)
+                    if num_chunk_frames != chunk.num_frames:
+                        print(f"Warning: Stream copied chunk {chunk_num} of {video_path} has {num_chunk_frames} instead of {chunk.num_frames} frames, re-encoding it.")
+                        logging.warning(f"Stream copied chunk {chunk_num} of {video_path} has {num_chunk_frames} instead of {chunk.num_frames} frames")
+                        os.remove(chunk_path)
+                        chunk_path = None
+
+                if chunk_path is None:
+                    chunk_path = os.path.join(output_path, f"chunk_{chunk_num}.mp4")
+                    self._write_frames_using_opencv(video_path, chunk.start_frame, chunk.num_frames, chunk_path)
+                    num_chunk_frames = _count_frames(chunk_path)
+                    if num_chunk_frames != chunk.num_frames:
+                        raise RuntimeError(f"Chunk {chunk_num} of {video_path} has {num_chunk_frames} instead of {chunk.num_frames} frames")
+
+                num_verified_frames += num_chunk_frames
+                yield VideoChunk(chunk_num - 1, chunk_path, chunk.start_frame, chunk.num_frames)
+
+        if num_verified_frames != num_frames:
+            raise RuntimeError(f"The chunks of {video_path} have {num_verified_frames} frames, but the video has {num_frames} frames")
+
+    def _write_frames_using_opencv(self, video_path: str, start_frame: int, num_frames: int, chunk_path: str):
+        """Re-encode the frames [start_frame, start_frame + num_frames) of the video into a chunk."""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_path}")
+        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        video_writer = cv2.VideoWriter(chunk_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        try:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            for _ in range(num_frames):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                video_writer.write(frame)
+        finally:
+            cap.release()
+            video_writer.release()
+
+
+def _probe_keyframes(video_path: str):
+    """
+    Returns the indices of the keyframes (in presentation order) and the number of frames of the first video stream.
+    Only the packet headers are read, the video is not decoded.
+    """
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts,dts,flags",
+        "-of", "csv=p=0",
+        video_path
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffprobe failed: {e.stderr.strip()}")
+
+    packets = []  # (presentation timestamp, decode order, is keyframe)
+    for decode_idx, line in enumerate(line for line in result.stdout.splitlines() if line.strip()):
+        pts, dts, flags = line.split(",")[:3]
+        timestamp = pts if pts != "N/A" else dts
+        packets.append((int(timestamp) if timestamp != "N/A" else decode_idx, decode_idx, "K" in flags))
+
+    packets.sort()
+    keyframe_indices = [frame_idx for frame_idx, (_, _, is_keyframe) in enumerate(packets) if is_keyframe]
+    return keyframe_indices, len(packets)
+
+
+def _split_into_segments(video_path: str, split_frames: List[int], segment_pattern: str):
+    """Split the first video stream into segments at the given frame indices with stream copy (audio is dropped)."""
+    cmd = [
+        "ffmpeg",
+        "-v", "error",
+        "-i", video_path,
+        "-map", "0:v:0",
+        "-c", "copy",
+        "-f", "segment",
+        "-reset_timestamps", "1",
+    ]
+    if split_frames:
+        cmd += ["-segment_frames", ",".join(str(frame_idx) for frame_idx in split_frames)]
+    else:
+        cmd += ["-segment_time", str(10 ** 9)]  # a single segment
+    cmd.append(segment_pattern)
+    try:
+        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg failed: {e.stderr.strip()}")
+
+
+def _count_frames(video_path: str) -> int:
+    """Number of video packets of a chunk. Unlike counting decoded frames, this does not decode the chunk."""
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-count_packets",
+        "-show_entries", "stream=nb_read_packets",
+        "-of", "default=nokey=1:noprint_wrappers=1",
+        video_path
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+        return int(result.stdout.strip())
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffprobe failed: {e.stderr.strip()}")
+    except ValueError:
+        raise RuntimeError("Could not parse packet count from ffprobe output.")
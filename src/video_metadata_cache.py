@@ -0,0 +1,156 @@
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+VIDEO_METADATA_KEYS = ["width", "height", "fps", "frame_count", "duration"]
+
+
+class VideoMetadataCache:
+    """
+    Persistent cache for video metadata (width, height, fps, frame_count, duration).
+    Counting the frames of a video requires decoding it completely, so the metadata is computed once and stored in a
+    JSON lines file. Entries are keyed on the absolute video path and are only valid as long as the size and
+    modification time of the video file do not change.
+    Like the inference time log, every entry is appended as one JSON line with a single write, so that concurrent
+    threads and processes never need to lock, merge or rewrite the file. Later lines replace earlier entries of the
+    same video. Entries appended by other processes are read when a video is not found in the cache.
+    If the cache file cannot be written (e.g. the output folder does not exist), the cache is kept in memory only.
+    """
+    def __init__(self, cache_path: Optional[str], probe: Callable[[str], dict]):
+        """
+        Args:
+            cache_path (Optional[str]): Path of the JSON lines cache file. If None, the cache is kept in memory only.
+            probe (Callable[[str], dict]): Function that computes the metadata of a video path on a cache miss.
+        """
+        self.cache_path = cache_path
+        self.probe = probe
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        self._read_offset = 0  # position in the cache file up to which the entries are read
+        self._write_failed = False
+        self._transient_entries: Dict[str, dict] = {}  # metadata of temporary videos, never written to the cache file
+
+    def set_cache_path(self, cache_path: Optional[str]):
+        with self._lock:
+            self.cache_path = cache_path
+            self._entries = {}
+            self._read_offset = 0
+            self._write_failed = False
+
+    def get(self, video_path: str) -> dict:
+        """Returns the metadata of a video, probing the video if it is not cached yet or has changed."""
+        metadata = self.peek(video_path)
+        if metadata is not None:
+            return metadata
+
+        key, entry = self._probe_entry(video_path)
+        self._add_entries({key: entry})
+        return dict(entry["metadata"])
+
+    def add_transient(self, video_path: str, metadata: dict):
+        """
+        Register the known metadata of a temporary video (e.g. a video written by the inference engine), so that it is
+        neither probed nor written to the cache file. Remove it with `remove_transient` when the video is deleted.
+        """
+        with self._lock:
+            self._transient_entries[os.path.abspath(video_path)] = {key_name: metadata.get(key_name) for key_name in VIDEO_METADATA_KEYS}
+
+    def remove_transient(self, video_path: str):
+        with self._lock:
+            self._transient_entries.pop(os.path.abspath(video_path), None)
+
+    def peek(self, video_path: str) -> Optional[dict]:
+        """Returns the cached metadata of a video without probing it, or None if there is no valid cache entry."""
+        with self._lock:
+            transient_metadata = self._transient_entries.get(os.path.abspath(video_path))
+        if transient_metadata is not None:
+            return dict(transient_metadata)
+
+        key, file_stat = self._get_key_and_stat(video_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not self._is_valid(entry, file_stat):
+                self._read_cache_file()  # the video may have been probed by another process in the meantime
+                entry = self._entries.get(key)
+        if not self._is_valid(entry, file_stat):
+            return None
+        return dict(entry["metadata"])
+
+    def fill(self, video_paths: List[str], max_workers: Optional[int] = None) -> Dict[str, dict]:
+        """
+        Probe all videos that are not cached yet in parallel. Probing runs ffprobe in a subprocess,
+        so threads are sufficient to use multiple cores. The new entries are written to the cache file at once.
+
+        Returns:
+            Dict[str, dict]: Dictionary mapping the video paths to their metadata.
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+
+        missing_paths = [video_path for video_path in video_paths if self.peek(video_path) is None]
+        if missing_paths:
+            print(f"Probing metadata of {len(missing_paths)} videos with {max_workers} workers")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                self._add_entries(dict(executor.map(self._probe_entry, missing_paths)))
+        return {video_path: self.get(video_path) for video_path in video_paths}
+
+    def _get_key_and_stat(self, video_path: str):
+        return os.path.abspath(video_path), os.stat(video_path)
+
+    @staticmethod
+    def _is_valid(entry: Optional[dict], file_stat: os.stat_result) -> bool:
+        return entry is not None and entry.get("size") == file_stat.st_size and entry.get("mtime_ns") == file_stat.st_mtime_ns
+
+    def _probe_entry(self, video_path: str):
+        key, file_stat = self._get_key_and_stat(video_path)
+        metadata = self.probe(video_path)
+        return key, {
+            "path": key,
+            "size": file_stat.st_size,
+            "mtime_ns": file_stat.st_mtime_ns,
+            "metadata": {key_name: metadata.get(key_name) for key_name in VIDEO_METADATA_KEYS},
+        }
+
+    def _read_cache_file(self):
+        """Read the entries appended to the cache file since the last read. Must be called with the lock held."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "rb") as f:
+                f.seek(self._read_offset)
+                data = f.read()
+        except OSError as e:
+            logging.warning(f"Ignoring unreadable video metadata cache {self.cache_path}: {e}")
+            return
+
+        complete_length = data.rfind(b"\n") + 1  # a line without newline may still be written by another process
+        self._read_offset += complete_length
+        num_corrupt_lines = 0
+        for line in data[:complete_length].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                self._entries[entry["path"]] = entry
+            except (json.JSONDecodeError, KeyError, TypeError):
+                num_corrupt_lines += 1
+        if num_corrupt_lines:
+            logging.warning(f"Skipped {num_corrupt_lines} corrupt lines in video metadata cache {self.cache_path}")
+
+    def _add_entries(self, entries: Dict[str, dict]):
+        with self._lock:
+            self._entries.update(entries)
+            if not self.cache_path or self._write_failed or not entries:
+                return
+            import utils  # imported here, utils imports this module
+
+            try:
+                for entry in entries.values():
+                    utils.append_json_line(self.cache_path, entry)
+            except OSError as e:
+                self._write_failed = True
+                print(f"Warning: Could not write video metadata cache {self.cache_path}, keeping it in memory: {e}")
+                logging.warning(f"Could not write video metadata cache {self.cache_path}: {e}")